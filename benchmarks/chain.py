@@ -0,0 +1,122 @@
+"""
+Processes started for one command going through SSH -> LXD -> virtualenv chain: wrappers with nested shells
+and directories, environment and virtualenv set up in shell (before) vs. context passed to 'lxc exec' (after).
+
+ssh and lxc are local stand-ins, all processes are counted by logging shims of ssh, lxc, bash and sh.
+
+usage: python -m benchmarks.chain [number]
+"""
+import sys
+from os import chmod, environ, makedirs, pathsep
+from os.path import join
+from shutil import rmtree, which
+from tempfile import mkdtemp
+
+from codev.core.executor import Command
+from codev.core.providers.executors.ssh import SSHExecutor
+from codev.core.providers.machines import lxd
+from codev.core.providers.machines.lxd import LXDMachine
+from codev.core.utils import Ident
+
+from benchmarks.utils import measure, report
+
+SHIM = '''#!{sh}
+echo {name} >> {log}
+{body}
+'''
+
+# remote sshd runs the joined arguments by the shell of user
+FAKE_SSH = '''while [ "$1" != -- ]; do shift; done
+shift
+exec sh -c "$*"'''
+
+FAKE_LXC = '''shift
+set -- "$@" --
+options=
+while [ "$1" != -- ]; do
+    case "$1" in
+        --cwd) options="$options -C $2"; shift 2 ;;
+        --env) options="$options $2"; shift 2 ;;
+        *) shift ;;
+    esac
+done
+shift
+exec env $options "$@"'''
+
+COMMANDS = (
+    ('shell command', 'echo $VIRTUAL_ENV > /dev/null'),
+    ('argv command', ['true']),
+)
+
+
+class BeforeSSHExecutor(SSHExecutor):
+    def _ssh_command(self, command):
+        return command.wrap('ssh -A {username}@{hostname} -p {port} -- {{quoted_command}}'.format(
+            username=self.settings.username, hostname=self.settings.hostname, port=self.settings.port
+        ))
+
+
+class BeforeLXDMachine(LXDMachine):
+    def wrap_command(self, command):
+        return command.wrap('lxc exec {env} {container_name} -- {{command}}'.format(
+            env=' '.join('--env {name}={value}'.format(name=name, value=value) for name, value in lxd.LXD_ENV.items()),
+            container_name=self._container_name
+        ))
+
+
+def install_shims(directory, log):
+    sh = which('sh')
+    for name, body in (
+            ('ssh', FAKE_SSH),
+            ('lxc', FAKE_LXC),
+            ('bash', 'exec {bash} "$@"'.format(bash=which('bash'))),
+            ('sh', 'exec {sh} "$@"'.format(sh=sh))):
+        shim = join(directory, name)
+        with open(shim, 'w') as shim_file:
+            shim_file.write(SHIM.format(sh=sh, name=name, log=log, body=body))
+        chmod(shim, 0o755)
+
+
+def main(number=50):
+    directory = mkdtemp(prefix='codev-chain-')
+    log = join(directory, 'processes.log')
+    install_shims(directory, log)
+    virtualenv = join(directory, 'env')
+    makedirs(join(virtualenv, 'bin'))
+    with open(join(virtualenv, 'bin', 'activate'), 'w') as activate:
+        activate.write('VIRTUAL_ENV={virtualenv}; export VIRTUAL_ENV\n'.format(virtualenv=virtualenv))
+
+    path = environ['PATH']
+    environ['PATH'] = '{directory}{pathsep}{path}'.format(directory=directory, pathsep=pathsep, path=path)
+    # PATH in the container has the shims too
+    lxd.LXD_PATH = '{directory}:{path}'.format(directory=directory, path=lxd.LXD_PATH)
+
+    settings_data = dict(hostname='host', username='user', multiplexing=False)
+    chains = (
+        ('before', BeforeLXDMachine(executor=BeforeSSHExecutor(settings_data=settings_data), ident=Ident('chain'))),
+        ('after', LXDMachine(executor=SSHExecutor(settings_data=settings_data), ident=Ident('chain'))),
+    )
+    try:
+        for name, command_str in COMMANDS:
+            for variant, machine in chains:
+                def execute():
+                    with machine.change_directory(directory):
+                        machine.execute_command(
+                            machine.process_command(Command(command_str, env={'A': 'a'}).activate_virtualenv('env'))
+                        )
+
+                open(log, 'w').close()
+                execute()
+                with open(log) as log_file:
+                    processes = log_file.read().split()
+                print('{variant} {name}: {count} processes ({processes})'.format(
+                    variant=variant, name=name, count=len(processes), processes=' '.join(processes)
+                ))
+                report('{variant} {name}'.format(variant=variant, name=name), measure(execute, number))
+    finally:
+        environ['PATH'] = path
+        rmtree(directory)
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
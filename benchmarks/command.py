@@ -0,0 +1,52 @@
+"""
+Rendering of commands nested in 1 to 5 levels of executors.
+
+Every level changes directory, activates virtualenv and wraps the command by another process.
+Legacy activation wraps the command by a new shell (as every context did), structured one uses a prefix
+collapsed into the shell of the level.
+
+usage: python -m benchmarks.command [number]
+"""
+import sys
+
+from codev.core.executor import Command
+
+from benchmarks.utils import measure, report
+
+COMMAND = 'echo "$HOME" && ls -la \'/tmp\''
+
+
+def nested(levels, activate):
+    command = Command(COMMAND)
+    for level in range(levels):
+        command = command.change_directory('/level{level}'.format(level=level))
+        command = activate(command)
+        command = command.wrap('lxc exec container{level} -- {{command}}'.format(level=level))
+    return command
+
+
+def legacy_activate(command):
+    return command.wrap('source env/bin/activate && {command}')
+
+
+def structured_activate(command):
+    return command.prefix('. env/bin/activate')
+
+
+def main(number=2000):
+    for levels in range(1, 6):
+        for name, activate in (('legacy', legacy_activate), ('structured', structured_activate)):
+            command_str = str(nested(levels, activate))
+            report(
+                '{name:<10} levels {levels} shells {shells:>2} length {length:>5}'.format(
+                    name=name,
+                    levels=levels,
+                    shells=command_str.count('bash -c'),
+                    length=len(command_str)
+                ),
+                measure(lambda: nested(levels, activate).render(), number)
+            )
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
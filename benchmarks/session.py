@@ -0,0 +1,31 @@
+"""
+Per-command latency of LocalExecutor: process per command vs. long-lived shell session.
+
+usage: python -m benchmarks.session [number]
+"""
+import sys
+
+from codev.core.providers.executors.local import LocalExecutor
+
+from benchmarks.utils import measure, report
+
+COMMANDS = (
+    ('probe', '[ -f /etc/hostname ]'),
+    ('echo', 'echo test'),
+    ('output 1000 lines', 'seq 1000'),
+)
+
+
+def main(number=200):
+    spawn_executor = LocalExecutor()
+    session_executor = LocalExecutor(settings_data=dict(session=True))
+
+    for name, command in COMMANDS:
+        report('spawn   {name}'.format(name=name), measure(lambda: spawn_executor.execute(command), number))
+        report('session {name}'.format(name=name), measure(lambda: session_executor.execute(command), number))
+
+    session_executor.close()
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,36 @@
+"""
+Per-command latency of SSHExecutor: new connection per command (cold) vs. shared master connection (warm).
+
+The host has to accept the key from ssh-agent.
+
+usage: python -m benchmarks.ssh [user@]host [port] [number]
+"""
+import sys
+
+from codev.core.providers.executors.ssh import SSHExecutor, close_control_masters
+
+from benchmarks.utils import measure, report
+
+COMMANDS = (
+    ('probe', '[ -f /etc/hostname ]'),
+    ('echo', 'echo test'),
+    ('output 1000 lines', 'seq 1000'),
+)
+
+
+def main(destination, port=22, number=20):
+    username, _, hostname = destination.rpartition('@')
+    settings_data = dict(hostname=hostname, username=username or None, port=port)
+    cold_executor = SSHExecutor(settings_data=dict(settings_data, multiplexing=False))
+    warm_executor = SSHExecutor(settings_data=settings_data)
+
+    try:
+        for name, command in COMMANDS:
+            report('cold {name}'.format(name=name), measure(lambda: cold_executor.execute(command), number))
+            report('warm {name}'.format(name=name), measure(lambda: warm_executor.execute(command), number))
+    finally:
+        close_control_masters()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1], *map(int, sys.argv[2:]))
@@ -0,0 +1,156 @@
+"""
+Micro-benchmarks of the executor stack with machine-readable baseline.
+
+Results are compared by median latency, a benchmark regresses if it is slower than the baseline
+by more than the threshold. Baselines are comparable only if measured on the same machine.
+
+usage: python -m benchmarks.suite [--number N] [--save baseline.json] [--compare baseline.json] [--threshold 1.25]
+       [benchmark ...]
+"""
+import argparse
+import json
+import platform
+import sys
+from collections import OrderedDict
+
+from codev import __version__
+from codev.core.executor import BackgroundExecutor, BareExecutor, Command, ProxyExecutor
+from codev.core.providers.executors.local import LocalExecutor
+
+from benchmarks.utils import measure, report
+
+COMMAND = 'echo "$HOME" && ls -la \'/tmp\''
+
+
+class NoopExecutor(BareExecutor):
+    """
+    Root executor which only renders the command, so only the overhead of the stack is measured.
+    """
+    def execute_command(self, command):
+        return str(command)
+
+
+def command_include(depth):
+    def run():
+        command = Command(COMMAND)
+        for _ in range(depth):
+            command = command.include()
+        return command.render()
+    return run
+
+
+def command_wrap(depth):
+    def run():
+        command = Command(COMMAND)
+        for level in range(depth):
+            command = command.wrap('lxc exec container{level} -- {{command}}'.format(level=level))
+        return command.render()
+    return run
+
+
+def proxy_chain(depth):
+    executor = NoopExecutor()
+    for _ in range(depth):
+        executor = ProxyExecutor(executor=executor)
+    return lambda: executor.execute(COMMAND)
+
+
+def change_directory(depth):
+    executor = ProxyExecutor(executor=NoopExecutor())
+
+    def run():
+        directories = [executor.change_directory('/level{level}'.format(level=level)) for level in range(depth)]
+        for directory in directories:
+            directory.__enter__()
+        executor.execute(COMMAND)
+        for directory in reversed(directories):
+            directory.__exit__(None, None, None)
+    return run
+
+
+def local(command):
+    executor = LocalExecutor()
+    return lambda: executor.execute(command)
+
+
+def background():
+    executor = BackgroundExecutor(executor=LocalExecutor(), ident='benchmark')
+    return lambda: executor.execute('echo test')
+
+
+# name, factory of measured function, relative number of calls
+BENCHMARKS = (
+    ('command.include.1', lambda: command_include(1), 10),
+    ('command.include.5', lambda: command_include(5), 10),
+    ('command.wrap.1', lambda: command_wrap(1), 10),
+    ('command.wrap.5', lambda: command_wrap(5), 10),
+    ('proxy_chain.1', lambda: proxy_chain(1), 10),
+    ('proxy_chain.3', lambda: proxy_chain(3), 10),
+    ('proxy_chain.5', lambda: proxy_chain(5), 10),
+    ('change_directory.1', lambda: change_directory(1), 10),
+    ('change_directory.5', lambda: change_directory(5), 10),
+    ('local.tiny', lambda: local('true'), 1),
+    ('local.huge', lambda: local('seq 200000'), 0.1),
+    ('background.echo', background, 0.02),
+)
+
+
+def run(names=None, number=100):
+    results = OrderedDict()
+    for name, factory, relative_number in BENCHMARKS:
+        if names and not any(name.startswith(prefix) for prefix in names):
+            continue
+        results[name] = measure(factory(), max(1, int(number * relative_number)))
+        report(name, results[name])
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    :return: names of regressed benchmarks
+    :rtype: list
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        ratio = result['median'] / baseline[name]['median']
+        print('{name:<40} {ratio:6.2f}x baseline{regression}'.format(
+            name=name, ratio=ratio, regression='   REGRESSION' if ratio > threshold else ''
+        ))
+        if ratio > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Micro-benchmarks of the executor stack.')
+    parser.add_argument('names', nargs='*', help='prefixes of names of benchmarks to run')
+    parser.add_argument('--number', type=int, default=100, help='base number of measured calls')
+    parser.add_argument('--save', help='write results as a baseline')
+    parser.add_argument('--compare', help='compare results with the baseline')
+    parser.add_argument('--threshold', type=float, default=1.25, help='allowed slowdown against the baseline')
+    args = parser.parse_args(argv)
+
+    results = run(args.names, args.number)
+
+    if args.save:
+        with open(args.save, 'w') as baseline_file:
+            json.dump(OrderedDict((
+                ('version', __version__),
+                ('python', platform.python_version()),
+                ('platform', platform.platform()),
+                ('results', results),
+            )), baseline_file, indent=2)
+            baseline_file.write('\n')
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        if compare(results, baseline['results'], args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""
+Throughput and peak memory of file transfers: streamed through pipes vs. copied via temporary file
+(the way machines transferred files before).
+
+Peak memory is the peak of Python allocations during the transfer.
+
+usage: python -m benchmarks.transfer [size in MB] [directory]
+"""
+import sys
+import tracemalloc
+from os import remove
+from os.path import join
+from shutil import rmtree
+from tempfile import mkdtemp
+from time import perf_counter
+
+from codev.core.executor import TRANSFER_CHUNK_SIZE, ProxyExecutor
+from codev.core.providers.executors.local import LocalExecutor
+
+
+def create_file(filepath, size):
+    chunk = bytes(range(256)) * (TRANSFER_CHUNK_SIZE // 256)
+    with open(filepath, 'wb') as fo:
+        for _ in range(size * 1048576 // len(chunk)):
+            fo.write(chunk)
+
+
+def read_all(fo):
+    while fo.read(TRANSFER_CHUNK_SIZE):
+        pass
+
+
+def send_temporary(executor, source, target):
+    temporary = target + '.tmp'
+    executor.send_file(source, temporary)
+    executor.execute('cp {temporary} {target}'.format(temporary=temporary, target=target))
+    executor.execute('rm {temporary}'.format(temporary=temporary))
+
+
+def send_stream(executor, source, target):
+    with open(source, 'rb') as source_file:
+        executor.send_stream(source_file, target)
+
+
+def open_temporary(executor, source, target):
+    temporary = target + '.tmp'
+    executor.execute('cp {source} {temporary}'.format(source=source, temporary=temporary))
+    with open(temporary, 'rb') as fo:
+        read_all(fo)
+    executor.execute('rm {temporary}'.format(temporary=temporary))
+
+
+def open_stream(executor, source, target):
+    with executor.open_stream(source) as fo:
+        read_all(fo)
+
+
+def measure_transfer(name, transfer, executor, source, target, size):
+    tracemalloc.start()
+    start = perf_counter()
+    transfer(executor, source, target)
+    duration = perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print('{name:<24} {throughput:10.1f} MB/s   peak memory {peak:8.1f} MB'.format(
+        name=name,
+        throughput=size / duration,
+        peak=peak / 1048576
+    ))
+
+
+def main(size=1024, directory=None):
+    directory = mkdtemp(dir=directory)
+    try:
+        source = join(directory, 'source')
+        target = join(directory, 'target')
+        create_file(source, size)
+
+        executor = ProxyExecutor(executor=LocalExecutor())
+        for name, transfer in (
+                ('send via temporary file', send_temporary),
+                ('send stream', send_stream),
+                ('open via temporary file', open_temporary),
+                ('open stream', open_stream)):
+            measure_transfer(name, transfer, executor, source, target, size)
+            if name.startswith('send'):
+                remove(target)
+    finally:
+        rmtree(directory)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1024, *sys.argv[2:])
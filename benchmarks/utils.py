@@ -0,0 +1,40 @@
+from time import perf_counter
+
+
+def measure(func, number=100, warmup=1):
+    """
+    Call function repeatedly and measure latency of calls.
+
+    :param func: function without arguments
+    :param number: number of measured calls
+    :param warmup: number of calls which are not measured
+    :return: dict with mean, min, max and median latency in seconds
+    """
+    for _ in range(warmup):
+        func()
+
+    timings = []
+    for _ in range(number):
+        start = perf_counter()
+        func()
+        timings.append(perf_counter() - start)
+
+    timings.sort()
+    return dict(
+        number=number,
+        mean=sum(timings) / number,
+        min=timings[0],
+        max=timings[-1],
+        median=timings[number // 2],
+    )
+
+
+def report(name, result):
+    print(
+        '{name:<40} mean {mean_ms:8.3f} ms   median {median_ms:8.3f} ms   min {min_ms:8.3f} ms'.format(
+            name=name,
+            mean_ms=result['mean'] * 1000,
+            median_ms=result['median'] * 1000,
+            min_ms=result['min'] * 1000,
+        )
+    )
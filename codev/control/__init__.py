@@ -1,8 +1,9 @@
 from logging import getLogger
 
 from codev.control.configuration import ConfigurationControl
-from codev.core import Codev
+from codev.core import Codev, metrics
 from codev.core.debug import DebugSettings
+from codev.core.transfer import transfer_stats
 from codev.core.utils import Ident
 from .isolation import Isolation
 from .log import logging_config
@@ -29,6 +30,8 @@ class CodevControl(Codev):
             **kwargs
     ):
         logging_config(DebugSettings.settings.loglevel)
+        if DebugSettings.settings.metrics:
+            metrics.enable(DebugSettings.settings.metrics)
 
         super().__init__(*args, **kwargs)
 
@@ -77,7 +80,10 @@ class CodevControl(Codev):
             current_source = self.next_source
 
         codev = self.isolation.install_codev(current_source)
-        return self.isolation.perform(codev, input_vars)
+        try:
+            return self.isolation.perform(codev, input_vars)
+        finally:
+            logger.debug('Transfers: {stats}'.format(stats=transfer_stats))
 
 
     # FIXME
@@ -1,7 +1,11 @@
 from codev.control.isolation import Isolation
+from codev.core import governor
+from codev.core.cache import CachingExecutor
 from codev.core.configuration import ConfigurationSettings, Configuration
+from codev.core.debug import DebugSettings
 from codev.core.executor import Executor
-from codev.core.settings import ListDictSettings, ProviderSettings, IsolationSettings
+from codev.core.replay import traced_executor
+from codev.core.settings import ListDictSettings, ExecutorSettings, IsolationSettings
 from codev.core.source import Source
 
 
@@ -14,7 +18,7 @@ class ConfigurationControlSettings(ConfigurationSettings):
 
     @property
     def executor(self):
-        return ProviderSettings(self.data.get('executor', {}))
+        return ExecutorSettings(self.data.get('executor', {}))
 
     @property
     def isolation(self):
@@ -29,11 +33,17 @@ class ConfigurationControl(Configuration):
         executor_provider = self.settings.executor.provider
         executor_settings_data = self.settings.executor.settings_data
 
-        return Executor(
+        executor = Executor(
             executor_provider,
             settings_data=executor_settings_data
         )
 
+        if self.settings.executor.governor is not None and governor.governor is None:
+            governor.configure(**self.settings.executor.governor)
+        if self.settings.executor.cache is not None:
+            executor = CachingExecutor(executor=executor, **self.settings.executor.cache)
+        return traced_executor(executor, DebugSettings.settings)
+
     def get_source(self, name, option):
         return Source.get(name, self.settings.sources, option)
 
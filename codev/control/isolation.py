@@ -116,7 +116,7 @@ class PrivilegedIsolation(Isolation):
             from os.path import basename
             remote_distfile = '/tmp/{distfile}'.format(distfile=basename(distfile))
 
-            self.send_file(distfile, remote_distfile)
+            self.send_file_cached(distfile, remote_distfile)
             self.execute('pip3 install --upgrade {distfile}'.format(distfile=remote_distfile))
 
     def perform(self, source, input_vars):
@@ -0,0 +1,191 @@
+"""
+asyncio twin of executors from codev.core.executor
+"""
+from asyncio import get_event_loop, new_event_loop, run_coroutine_threadsafe, set_event_loop
+from contextlib import asynccontextmanager, contextmanager
+from os import path
+from os.path import expanduser
+from threading import Thread
+
+from codev.core.executor import BareExecutor, Command, CommandError, HasExecutor
+from codev.core.provider import Provider
+from codev.core.settings import HasSettings
+
+
+class AsyncBareExecutor(object):
+    async def execute_command(self, command):
+        raise NotImplementedError()
+
+    def open_file(self, remote_path):
+        """
+        :return: asynchronous context manager
+        """
+        raise NotImplementedError()
+
+    async def send_file(self, source, target):
+        raise NotImplementedError()
+
+    async def check_execute(self, command_str, output_logger=None, writein=None):
+        try:
+            await self.execute(command_str, output_logger=output_logger, writein=writein)
+            return True
+        except CommandError:
+            return False
+
+    async def execute(self, command_str, output_logger=None, writein=None):
+        command = Command(command_str, output_logger=output_logger, writein=writein)
+
+        command = self.process_command(command)
+
+        return await self.execute_command(command)
+
+    def process_command(self, command):
+        return command
+
+
+class AsyncBareProxyExecutor(HasExecutor, AsyncBareExecutor):
+    executor_class = None
+    executor_class_forward = []
+
+    def __init__(self, executor, **kwargs):
+        if self.executor_class:
+            executor_kwargs = {key: kwargs.get(key) for key in self.executor_class_forward}
+            executor = self.executor_class(executor=executor, **executor_kwargs)
+
+        super().__init__(executor=executor, **kwargs)
+
+    @property
+    def effective_executor(self):
+        return self.executor
+
+    def wrap_command(self, command):
+        return command
+
+    async def execute_command(self, command):
+        return await self.effective_executor.execute_command(self.wrap_command(command))
+
+    @asynccontextmanager
+    async def open_file(self, remote_path):
+        async with self.effective_executor.open_file(remote_path) as fo:
+            yield fo
+
+    async def send_file(self, source, target):
+        return await self.effective_executor.send_file(source, target)
+
+
+class AsyncBaseProxyExecutor(AsyncBareProxyExecutor):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.directories = []
+
+    async def send_file(self, source, target):
+        expanduser_source = expanduser(source)
+        return await super().send_file(expanduser_source, target)
+
+    @asynccontextmanager
+    async def open_file(self, remote_path):
+        remote_path = path.join(*[directory for directory in reversed(self.directories)], remote_path)
+        async with super().open_file(remote_path) as fo:
+            yield fo
+
+    async def exists_directory(self, directory):
+        return await self.check_execute(
+            '[ -d {directory} ]'.format(
+                directory=directory
+            )
+        )
+
+    async def exists_file(self, filepath):
+        return await self.check_execute(
+            '[ -f {filepath} ]'.format(
+                filepath=filepath
+            )
+        )
+
+    async def create_directory(self, directory):
+        await self.execute('mkdir -p {directory}'.format(directory=directory))
+
+    @contextmanager
+    def change_directory(self, directory):
+        # directory stack is shared by all coroutines using this executor
+        assert directory
+        self.directories.append(directory)
+        yield
+        self.directories.pop()
+
+    def process_command(self, command):
+        for directory in reversed(self.directories):
+            command = command.change_directory(directory)
+        return command
+
+
+class AsyncProxyExecutor(AsyncBaseProxyExecutor):
+    executor_class = AsyncBaseProxyExecutor
+
+
+class AsyncExecutor(Provider, HasSettings, AsyncBareExecutor):
+    pass
+
+
+class AsyncExecutorAdapter(HasExecutor, AsyncBareExecutor):
+    """
+    Asynchronous interface of synchronous executor, commands are executed in threads of default loop executor.
+    """
+    async def _call(self, func, *args):
+        return await get_event_loop().run_in_executor(None, func, *args)
+
+    async def execute_command(self, command):
+        return await self._call(self.executor.execute_command, command)
+
+    @asynccontextmanager
+    async def open_file(self, remote_path):
+        file_context = self.executor.open_file(remote_path)
+        fo = await self._call(file_context.__enter__)
+        try:
+            yield fo
+        finally:
+            await self._call(file_context.__exit__, None, None, None)
+
+    async def send_file(self, source, target):
+        return await self._call(self.executor.send_file, source, target)
+
+
+class SyncExecutor(HasExecutor, BareExecutor):
+    """
+    Synchronous interface of asynchronous executor, so it can be used by current providers.
+
+    Coroutines are run in an event loop running in a background thread shared by all instances.
+    """
+    _loop = None
+
+    @classmethod
+    def _get_loop(cls):
+        if SyncExecutor._loop is None:
+            loop = new_event_loop()
+
+            def run_loop():
+                set_event_loop(loop)
+                loop.run_forever()
+
+            Thread(target=run_loop, name='codev-async-executor', daemon=True).start()
+            SyncExecutor._loop = loop
+        return SyncExecutor._loop
+
+    def _run(self, coroutine):
+        return run_coroutine_threadsafe(coroutine, self._get_loop()).result()
+
+    def execute_command(self, command):
+        return self._run(self.executor.execute_command(command))
+
+    @contextmanager
+    def open_file(self, remote_path):
+        file_context = self.executor.open_file(remote_path)
+        fo = self._run(file_context.__aenter__())
+        try:
+            yield fo
+        finally:
+            self._run(file_context.__aexit__(None, None, None))
+
+    def send_file(self, source, target):
+        return self._run(self.executor.send_file(source, target))
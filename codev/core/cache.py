@@ -0,0 +1,134 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+from logging import getLogger
+from threading import Lock
+from time import monotonic
+
+from .executor import BareExecutor, CommandError, CommandResult, CommandTimeoutError, HasExecutor
+
+logger = getLogger(__name__)
+
+
+class CommandCache(object):
+    """
+    Results of idempotent commands kept per target with TTL and size-bounded LRU eviction.
+
+    Target is identified by targets of wrappers of the command (ie. 'ssh user@host', 'lxc exec container'),
+    so all commands executed in the same machine share the target, whatever directory or environment they have.
+    """
+    def __init__(self, ttl=60, size=1000):
+        self.ttl = ttl
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+        self._results = OrderedDict()
+        self._lock = Lock()
+
+    @staticmethod
+    def _key(command):
+        return command.targets, str(command), command.writein
+
+    def get(self, command):
+        key = self._key(command)
+        with self._lock:
+            try:
+                timestamp, result = self._results[key]
+            except KeyError:
+                self.misses += 1
+                return None
+
+            if monotonic() - timestamp > self.ttl:
+                del self._results[key]
+                self.misses += 1
+                return None
+
+            self._results.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def set(self, command, result):
+        key = self._key(command)
+        with self._lock:
+            self._results[key] = monotonic(), result
+            self._results.move_to_end(key)
+            while len(self._results) > self.size:
+                self._results.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, target=None):
+        """
+        :param target: targets of command (see Command.targets), all targets are invalidated if it is None
+        """
+        with self._lock:
+            keys = [key for key in self._results if target is None or key[0] == target]
+            for key in keys:
+                del self._results[key]
+            if keys:
+                self.invalidations += 1
+
+    @property
+    def stats(self):
+        return dict(
+            hits=self.hits,
+            misses=self.misses,
+            invalidations=self.invalidations,
+            evictions=self.evictions,
+            size=len(self._results)
+        )
+
+
+class CachingExecutor(HasExecutor, BareExecutor):
+    """
+    Opt-in caching layer on top of the root executor (ie. LocalExecutor).
+
+    Results of commands marked as idempotent are served from cache, any other command invalidates results
+    of its target.
+    """
+    def __init__(self, *args, ttl=60, size=1000, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache = CommandCache(ttl=ttl, size=size)
+
+    def execute_command(self, command):
+        if not command.idempotent:
+            self.cache.invalidate(command.targets)
+            return self.executor.execute_command(command)
+
+        result = self.cache.get(command)
+        if result is None:
+            try:
+                output = self.executor.execute_command(command)
+            except CommandTimeoutError:
+                # timeout is not a result of the command
+                raise
+            except CommandError as e:
+                result = CommandResult(e.exit_code, e.output, e.error)
+            else:
+                result = CommandResult(0, output, '')
+            self.cache.set(command, result)
+        else:
+            logger.debug("Cached command: '{command}'".format(command=command))
+
+        if result.exit_code:
+            raise CommandError(command, result.exit_code, result.error, result.output)
+        return result.output
+
+    def execute_command_stream(self, command):
+        if not command.idempotent:
+            self.cache.invalidate(command.targets)
+        return self.executor.execute_command_stream(command)
+
+    def pipe_command(self, command):
+        self.cache.invalidate(command.targets)
+        return self.executor.pipe_command(command)
+
+    @contextmanager
+    def open_file(self, remote_path):
+        with self.executor.open_file(remote_path) as fo:
+            yield fo
+
+    def send_file(self, source, target):
+        # target of file is unknown here
+        self.cache.invalidate()
+        return self.executor.send_file(source, target)
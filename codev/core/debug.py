@@ -24,6 +24,34 @@ class DebugSettings(BaseSettings):
     def show_exception(self):
         return literal_eval(self.data.get('show_exception', 'False'))
 
+    @property
+    def metrics(self):
+        """
+        :return: path of file with metrics of executed commands ('.prom' for Prometheus text format, JSON otherwise)
+        """
+        return self.data.get('metrics', '')
+
+    @property
+    def record(self):
+        """
+        :return: path of trace file of executed commands (gzipped if it ends with '.gz'), see RecordingExecutor
+        """
+        return self.data.get('record', '')
+
+    @property
+    def replay(self):
+        """
+        :return: path of trace file served instead of executing commands, see ReplayExecutor
+        """
+        return self.data.get('replay', '')
+
+    @property
+    def replay_speed(self):
+        """
+        :return: speed of replay relative to recorded durations, None for full speed
+        """
+        return float(self.data.get('replay_speed', 0)) or None
+
     @property
     def load_vars(self):
         return json.loads(self.data.get('load_vars', '{}'))
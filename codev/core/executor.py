@@ -1,10 +1,19 @@
+import posixpath
+from collections import OrderedDict, deque, namedtuple
 from contextlib import contextmanager
-from os.path import expanduser
-
+from io import TextIOWrapper
+from os import environ, getcwd, makedirs, pathsep
+from os.path import expanduser, isdir, isfile
+from shlex import quote
+from time import perf_counter
+from uuid import uuid4
+
+from codev.core import metrics, transfer, tree
 from codev.core.provider import Provider
 from os import path
 
-from codev.core.settings import HasSettings
+from codev.core.settings import BaseSettings, HasSettings
+from codev.core.utils import shell_path
 
 
 class CommandError(Exception):
@@ -21,68 +30,672 @@ class CommandError(Exception):
         )
 
 
+class CommandTimeoutError(CommandError):
+    """
+    Command has not finished in time, it has been killed (with all processes of its group).
+    Output and error contain what the command produced until then.
+    """
+    # the same as coreutils 'timeout' uses
+    exit_code = 124
+
+    def __init__(self, command, timeout, error, output=None):
+        self.command = command
+        self.timeout = timeout
+        self.error = error
+        self.output = output
+
+        Exception.__init__(
+            self,
+            "Command '{command}' timed out after {timeout}s with error:\n{error}".format(
+                command=command, timeout=timeout, error=error
+            )
+        )
+
+
+# target is the identity of the process of a wrapper (ie. container) independent of its per command options
+CommandLayer = namedtuple('CommandLayer', ['kind', 'value', 'target'])
+
+# change of working directory
+LAYER_DIRECTORY = 'directory'
+# environment variables
+LAYER_ENV = 'env'
+# shell code executed in the same shell just before the command (ie. 'source env/bin/activate')
+LAYER_PREFIX = 'prefix'
+# activation of virtualenv
+LAYER_VIRTUALENV = 'virtualenv'
+# another process which executes the command (ie. 'lxc exec container -- {command}'), it requires a new shell,
+# '{quoted_command}' is the command as one shell word (ie. 'ssh host -- {quoted_command}')
+LAYER_WRAP = 'wrap'
+# wrapper which is a simple command (program and its arguments), so the next wrapper executes it without a new shell
+LAYER_EXEC = 'exec'
+
+WRAPPER_LAYERS = (LAYER_WRAP, LAYER_EXEC)
+
+# characters which prevent to resolve directory without shell
+SHELL_SPECIAL_CHARS = set('$`\\"\'*?[]{}()<>|&;!# \t\n')
+
+
 class Command(object):
+    """
+    Structured command - base command (string or argv) with layers of contexts (directories, environment,
+    prefixes and wrappers) added by executors from the innermost to the outermost one.
+
+    Command is immutable, every change returns a new command. It is rendered to string just once,
+    when the outermost executor needs it. Consecutive directories, environment and prefixes are collapsed
+    into one shell, only wrappers start a new one.
+    """
     def __new__(cls, command_or_str, *args, **kwargs):
         if isinstance(command_or_str, Command):
             return command_or_str
         else:
             return super().__new__(cls)
 
-    def __init__(self, command_str, output_logger=None, writein=None):
-        self.command_str = command_str
+    def __init__(
+            self, command_str, output_logger=None, writein=None, env=None, cwd=None, idempotent=False, timeout=None
+    ):
+        if command_str is self:
+            # already initialized command, see __new__
+            return
+
+        if isinstance(command_str, (list, tuple)):
+            self.argv = tuple(command_str)
+            self.base = ' '.join(map(quote, self.argv))
+        else:
+            self.argv = None
+            self.base = command_str
+
         self.output_logger = output_logger
         self.writein = writein
+        # command does not change the target, so its result could be cached
+        self.idempotent = idempotent
+        # seconds after which the command is killed, default is given by the executor which runs it
+        self.timeout = timeout
+        self.layers = ()
+        self._rendered = None
+
+        if env:
+            self.layers += (CommandLayer(LAYER_ENV, tuple(env.items()), None),)
+        if cwd:
+            self.layers += (CommandLayer(LAYER_DIRECTORY, cwd, None),)
+
+    @property
+    def command_str(self):
+        return self.render()
 
     def __str__(self):
-        return self.command_str
+        return self.render()
 
-    def include(self):
-        return self._copy(
-            'bash -c "{command_str}"'.format(
-                command_str=self.command_str.replace('\\', '\\\\').replace('$', '\$').replace('"', '\\"')
-            )
+    @staticmethod
+    def _include(command_str):
+        return 'bash -c "{command_str}"'.format(
+            command_str=command_str.replace('\\', '\\\\').replace('$', '\\$').replace('"', '\\"')
         )
 
-    def _copy(self, command_or_str):
-        return self.__class__(command_or_str, output_logger=self.output_logger, writein=self.writein)
+    def render(self):
+        if self._rendered is None:
+            command_str = self.base
+            # command_str is a simple command, it does not need a shell
+            simple = self.argv is not None
+            for kind, value, _ in self.layers:
+                if kind in WRAPPER_LAYERS:
+                    included = command_str if simple else self._include(command_str)
+                    # quoted_command is for wrappers which join their arguments (ie. ssh)
+                    command_str = value.format(command=included, quoted_command=quote(included))
+                    simple = kind == LAYER_EXEC
+                    continue
+
+                simple = False
+                if kind == LAYER_DIRECTORY:
+                    command_str = 'cd {directory} && {command_str}'.format(
+                        directory=value,
+                        command_str=command_str
+                    )
+                elif kind == LAYER_ENV:
+                    command_str = 'export {variables} && {command_str}'.format(
+                        variables=' '.join(
+                            '{name}={value}'.format(name=name, value=quote(str(value))) for name, value in value
+                        ),
+                        command_str=command_str
+                    )
+                elif kind == LAYER_PREFIX:
+                    command_str = '{prefix} && {command_str}'.format(
+                        prefix=value,
+                        command_str=command_str
+                    )
+                elif kind == LAYER_VIRTUALENV:
+                    command_str = '. {virtualenv}/bin/activate && {command_str}'.format(
+                        virtualenv=value,
+                        command_str=command_str
+                    )
+            self._rendered = command_str
+        return self._rendered
+
+    @property
+    def wrappers(self):
+        """
+        :return: wrapper layers - processes which the command goes through
+        """
+        return tuple(value for kind, value, _ in self.layers if kind in WRAPPER_LAYERS)
+
+    @property
+    def targets(self):
+        """
+        :return: identities of wrappers - the same machine is the same target whatever options the command has
+        """
+        return tuple(target or value for kind, value, target in self.layers if kind in WRAPPER_LAYERS)
+
+    def local_context(self):
+        """
+        Working directory and environment of the command resolved without shell, it is possible only
+        if the command consists of directories, environment and virtualenv layers.
+
+        :return: tuple (cwd, env) or None
+        """
+        cwd = getcwd()
+        env = None
+        for kind, value, _ in reversed(self.layers):
+            if kind == LAYER_DIRECTORY:
+                if SHELL_SPECIAL_CHARS.intersection(value):
+                    return None
+                cwd = path.join(cwd, expanduser(value))
+                if not isdir(cwd):
+                    # let shell report the error
+                    return None
+            elif kind == LAYER_ENV:
+                env = dict(environ) if env is None else env
+                env.update((name, str(value)) for name, value in value)
+            elif kind == LAYER_VIRTUALENV:
+                if SHELL_SPECIAL_CHARS.intersection(value):
+                    return None
+                virtualenv = path.normpath(path.join(cwd, expanduser(value)))
+                if not isfile(path.join(virtualenv, 'bin', 'activate')):
+                    return None
+                # the same as bin/activate does
+                env = dict(environ) if env is None else env
+                env['VIRTUAL_ENV'] = virtualenv
+                env['PATH'] = '{bin}{pathsep}{path}'.format(
+                    bin=path.join(virtualenv, 'bin'),
+                    pathsep=pathsep,
+                    path=env.get('PATH', '')
+                )
+                env.pop('PYTHONHOME', None)
+            else:
+                return None
+        return cwd, env
+
+    def split_context(self, home=None, path=None):
+        """
+        Split the outermost directories, environment and virtualenv layers (added after the last wrapper),
+        so the wrapper could set them up itself (ie. 'lxc exec --cwd') instead of a shell.
+        Layers which could not be resolved without shell stay in the command.
+
+        :param home: home directory of the wrapped command ('~' is not resolved without it)
+        :param path: PATH of the wrapped command (virtualenvs are not resolved without it)
+        :return: tuple (command, cwd, env) - cwd is absolute path or None
+        """
+        cwd = None
+        env = OrderedDict()
+        index = len(self.layers)
+        for kind, value, _ in reversed(self.layers):
+            base = cwd or home
+            if kind == LAYER_DIRECTORY:
+                if SHELL_SPECIAL_CHARS.intersection(value):
+                    break
+                if value.startswith('~'):
+                    if home is None or not (value == '~' or value.startswith('~/')):
+                        break
+                    value = home + value[1:]
+                if not posixpath.isabs(value) and base is None:
+                    break
+                cwd = posixpath.normpath(posixpath.join(base or '', value))
+            elif kind == LAYER_ENV:
+                env.update((name, str(value)) for name, value in value)
+            elif kind == LAYER_VIRTUALENV:
+                if SHELL_SPECIAL_CHARS.intersection(value) or path is None or base is None:
+                    break
+                # the same as bin/activate does (see local_context)
+                virtualenv = posixpath.normpath(posixpath.join(base, value))
+                env['VIRTUAL_ENV'] = virtualenv
+                env['PATH'] = '{bin}:{path}'.format(bin=posixpath.join(virtualenv, 'bin'), path=env.get('PATH', path))
+            else:
+                break
+            index -= 1
+
+        if index == len(self.layers):
+            return self, None, env
+        return self._with_layers(self.layers[:index]), cwd, env
+
+    def _with_layers(self, layers):
+        command = self.__class__.__new__(self.__class__, None)
+        command.argv = self.argv
+        command.base = self.base
+        command.output_logger = self.output_logger
+        command.writein = self.writein
+        command.idempotent = self.idempotent
+        command.timeout = self.timeout
+        command.layers = layers
+        command._rendered = None
+        return command
+
+    def _copy(self, layer):
+        return self._with_layers(self.layers + (layer,))
+
+    def include(self):
+        return self.wrap('{command}')
 
     def change_directory(self, directory):
-        return self._copy('cd {directory} && {command_str}'.format(
-            directory=directory,
-            command_str=self.command_str
-        ))
-
-    def wrap(self, command_str):
-        return self._copy(
-            command_str.format(
-                command=self.include()
+        return self._copy(CommandLayer(LAYER_DIRECTORY, directory, None))
+
+    def set_env(self, env):
+        return self._copy(CommandLayer(LAYER_ENV, tuple(env.items()), None))
+
+    def prefix(self, prefix_str):
+        return self._copy(CommandLayer(LAYER_PREFIX, prefix_str, None))
+
+    def activate_virtualenv(self, virtualenv):
+        return self._copy(CommandLayer(LAYER_VIRTUALENV, virtualenv, None))
+
+    def wrap(self, command_str, simple=False, target=None):
+        """
+        :param simple: wrapper is a simple command (program and its arguments)
+        :param target: identity of the wrapper if command_str contains options of the command (see targets)
+        """
+        return self._copy(CommandLayer(LAYER_EXEC if simple else LAYER_WRAP, command_str, target))
+
+
+CommandResult = namedtuple('CommandResult', ['exit_code', 'output', 'error'])
+
+PathStat = namedtuple('PathStat', ['exists', 'type', 'size', 'mtime', 'checksum'])
+
+MISSING_PATH = PathStat(False, None, None, None, None)
+
+
+# size of chunks of streamed file transfers
+TRANSFER_CHUNK_SIZE = 1048576
+
+
+def copy_stream(source, target):
+    """
+    Copy source to binary target in chunks, source is never read at once.
+
+    :param source: file-like object (binary or text), bytes-like object or str
+    :param target: binary file-like object
+    :return: number of copied bytes
+    """
+    if isinstance(source, str):
+        source = source.encode()
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = memoryview(source)
+        for offset in range(0, len(source), TRANSFER_CHUNK_SIZE):
+            target.write(source[offset:offset + TRANSFER_CHUNK_SIZE])
+        return len(source)
+
+    copied = 0
+    while True:
+        chunk = source.read(TRANSFER_CHUNK_SIZE)
+        if not chunk:
+            return copied
+        if isinstance(chunk, str):
+            chunk = chunk.encode()
+        target.write(chunk)
+        copied += len(chunk)
+
+
+class CommandBatch(object):
+    """
+    Several commands executed by one shell invocation.
+
+    Every command runs in its own subshell, its result is framed by sentinels in the output of the whole batch.
+    If check is set, the batch stops at the first failed command.
+    """
+    def __init__(self, commands, check=False):
+        self.commands = commands
+        self.check = check
+        self.token = 'codev-{uuid}'.format(uuid=uuid4().hex)
+
+    def _command_script(self, index, command):
+        if command.writein:
+            stdin = 'printf %s {writein} | '.format(writein=quote(command.writein))
+            redirect = ''
+        else:
+            stdin = ''
+            redirect = ' < /dev/null'
+
+        return (
+            '{stdin}( eval {command}\n){redirect} 2> "$codev_error"\n'
+            'codev_exit_code=$?\n'
+            "printf '\\n{token} {index} %d\\n' $codev_exit_code\n"
+            'cat "$codev_error"\n'
+            "printf '\\n{token}\\n'\n"
+            '{check}'
+        ).format(
+            stdin=stdin,
+            command=quote(str(command)),
+            redirect=redirect,
+            token=self.token,
+            index=index,
+            check='[ $codev_exit_code -eq 0 ] || { rm -f "$codev_error"; exit 0; }\n' if self.check else ''
+        )
+
+    def script(self):
+        return 'codev_error=$(mktemp)\n{commands}rm -f "$codev_error"'.format(
+            commands=''.join(
+                self._command_script(index, command) for index, command in enumerate(self.commands)
             )
         )
 
+    def results(self, output):
+        """
+        :param output: output of the script
+        :return: list of results of executed commands
+        """
+        results = []
+        lines = []
+        exit_code = None
+        for line in output.splitlines():
+            if not line.startswith(self.token):
+                lines.append(line)
+                continue
+
+            # the last empty line before sentinel belongs to the frame
+            if lines and not lines[-1]:
+                lines.pop()
+
+            if exit_code is None:
+                exit_code = int(line.split()[2])
+                command_output = '\n'.join(lines)
+            else:
+                results.append(CommandResult(exit_code, command_output, '\n'.join(lines)))
+                exit_code = None
+            lines = []
+
+        return results
+
+
+class CommandStream(object):
+    """
+    Iterator over output lines of a command, lines are produced lazily by executor.
+
+    Exit code is available when the iteration is finished. Failed command raises CommandError
+    which carries only the last 'tail' lines of output.
+    """
+    def __init__(self, command, lines, tail):
+        self.command = command
+        self.exit_code = None
+        self._lines = lines
+        self._tail = deque(maxlen=tail)
+
+    def __iter__(self):
+        while True:
+            try:
+                line = self._next()
+            except StopIteration as e:
+                exit_code, error = e.value
+                break
+            self._tail.append(line)
+            yield line
+
+        self.exit_code = exit_code
+        if exit_code:
+            raise CommandError(self.command, exit_code, error, '\n'.join(self._tail))
+
+    def _next(self):
+        try:
+            return next(self._lines)
+        except CommandTimeoutError as e:
+            if e.output is None:
+                e.output = '\n'.join(self._tail)
+            raise
+
 
 class BareExecutor(object):
+    # number of lines of streamed output (and error) kept for CommandError
+    output_tail = 100
+
     def execute_command(self, command):
         raise NotImplementedError()
 
+    def execute_command_stream(self, command):
+        """
+        Generator of output lines, executors which are not able to stream the output yield it at once.
+
+        :return: exit code and error (as a value of StopIteration)
+        """
+        try:
+            output = self.execute_command(command)
+        except CommandError as e:
+            yield from (e.output or '').splitlines()
+            return e.exit_code, e.error
+
+        yield from output.splitlines()
+        return 0, ''
+
     def open_file(self, remote_path):
         raise NotImplementedError()
 
     def send_file(self, source, target):
         raise NotImplementedError()
 
-    def check_execute(self, command_str, output_logger=None, writein=None):
+    def send_file_cached(self, source, target):
+        """
+        Send file only if it differs from the target (see codev.core.transfer.send_file_cached).
+
+        :return: True if the file has been sent
+        """
+        return transfer.send_file_cached(self, source, target)
+
+    def pipe_command(self, command):
+        """
+        Context of running command with binary pipes 'stdin' and 'stdout', CommandError is raised at the exit
+        of the context if the command fails. Not consumed output is discarded (the command is terminated).
+        """
+        raise NotImplementedError()
+
+    def write_command(self, command_str, source):
+        """
+        Execute command with stdin fed by source in chunks.
+
+        :param source: file-like object (binary or text), bytes-like object or str
+        :return: number of written bytes
+        """
+        command = self.process_command(Command(command_str))
+        with self.pipe_command(command) as pipe:
+            return copy_stream(source, pipe.stdin)
+
+    @contextmanager
+    def read_command(self, command_str, binary=True):
+        """
+        Execute command and read its output as a stream.
+
+        :param binary: binary or text (utf-8) file-like object is yielded
+        """
+        command = self.process_command(Command(command_str))
+        with self.pipe_command(command) as pipe:
+            pipe.stdin.close()
+            yield pipe.stdout if binary else TextIOWrapper(pipe.stdout, encoding='utf-8')
+
+    def send_stream(self, source, target):
+        """
+        Write source to target file through pipes of the executors (no intermediate files).
+
+        :param source: file-like object (binary or text), bytes-like object or str
+        :param target: path of target file
+        :return: number of sent bytes
+        """
+        return self.write_command('cat > {target}'.format(target=shell_path(target)), source)
+
+    def open_stream(self, remote_path, binary=True):
+        """
+        Read remote file through pipes of the executors (no intermediate files).
+
+        :param binary: binary or text (utf-8) file-like object is yielded
+        """
+        return self.read_command('cat -- {path}'.format(path=shell_path(remote_path)), binary=binary)
+
+    def send_tree(self, local_dir, remote_dir, codec='gzip', include=None, exclude=None):
+        """
+        Stream local directory as tar archive straight into remote 'tar -x' (no intermediate archives).
+
+        :param codec: compression of the stream ('none', 'gzip' or 'zstd' which requires 'zstandard' package)
+        :param include: patterns of included files, all files are included if it is not set
+        :param exclude: patterns of excluded files and directories
+        """
+        tree_codec = tree.get_codec(codec)
+        remote_dir = shell_path(remote_dir)
+        command = 'mkdir -p {directory} && {extract}'.format(
+            directory=remote_dir,
+            extract=tree_codec.extract_command.format(directory=remote_dir)
+        )
+        with self.pipe_command(self.process_command(Command(command))) as pipe:
+            tree.write_tree(pipe.stdin, expanduser(local_dir), codec, include=include, exclude=exclude)
+
+    def fetch_tree(self, remote_dir, local_dir, codec='gzip', include=None, exclude=None):
+        """
+        Extract tar archive streamed from remote 'tar -c' to local directory, see send_tree.
+
+        :return: number of extracted files and directories
+        """
+        tree_codec = tree.get_codec(codec)
+        local_dir = expanduser(local_dir)
+        if not isdir(local_dir):
+            makedirs(local_dir)
+        with self.read_command(tree_codec.create_command.format(directory=shell_path(remote_dir))) as stream:
+            return tree.read_tree(stream, local_dir, codec, include=include, exclude=exclude)
+
+    def check_execute(self, command_str, output_logger=None, writein=None, idempotent=False, timeout=None):
         try:
-            self.execute(command_str, output_logger=output_logger, writein=writein)
+            self.execute(
+                command_str, output_logger=output_logger, writein=writein, idempotent=idempotent, timeout=timeout
+            )
             return True
+        except CommandTimeoutError:
+            raise
         except CommandError:
             return False
 
-    def execute(self, command_str, output_logger=None, writein=None):
-        command = Command(command_str, output_logger=output_logger, writein=writein)
+    def execute(self, command_str, output_logger=None, writein=None, idempotent=False, timeout=None):
+        """
+        :param idempotent: command does not change anything, its result could be cached (see CachingExecutor)
+        :param timeout: seconds after which the command is killed and CommandTimeoutError is raised
+        """
+        command = Command(
+            command_str, output_logger=output_logger, writein=writein, idempotent=idempotent, timeout=timeout
+        )
 
         command = self.process_command(command)
 
-        return self.execute_command(command)
+        if metrics.recorder is None:
+            return self.execute_command(command)
+        return self._execute_recorded(command)
+
+    def _execute_recorded(self, command):
+        exit_code, output_size = None, 0
+        start = perf_counter()
+        try:
+            output = self.execute_command(command)
+            exit_code, output_size = 0, len(output or '')
+            return output
+        except CommandError as e:
+            exit_code, output_size = e.exit_code, len(e.output or '') + len(e.error or '')
+            raise
+        finally:
+            recorder = metrics.recorder
+            if recorder is not None:
+                recorder.record(
+                    command, metrics.executor_chain(self), perf_counter() - start, exit_code, output_size,
+                    metrics.call_site()
+                )
+
+    def execute_many(self, commands, check=False):
+        """
+        Execute several commands at once (in one round trip through the proxy executors).
+
+        :param commands: commands (str or Command)
+        :param check: stop at the first failed command and raise CommandError
+        :return: list of results of commands
+        :rtype: list of CommandResult
+        """
+        commands = [self.process_command(Command(command)) for command in commands]
+        if not commands:
+            return []
+
+        batch = CommandBatch(commands, check=check)
+        command = Command(batch.script(), idempotent=all(command.idempotent for command in commands))
+        if metrics.recorder is None:
+            results = batch.results(self.execute_command(command))
+        else:
+            results = batch.results(self._execute_recorded(command))
+
+        if check and results and results[-1].exit_code:
+            exit_code, output, error = results[-1]
+            raise CommandError(commands[len(results) - 1], exit_code, error, output)
+        return results
+
+    def execute_stream(self, command_str, output_logger=None, writein=None, tail=None, timeout=None):
+        """
+        :param tail: number of output lines kept for CommandError, default is 'output_tail'
+        :param timeout: seconds after which the command is killed and CommandTimeoutError is raised
+        :return: iterator over output lines
+        :rtype: CommandStream
+        """
+        command = Command(command_str, output_logger=output_logger, writein=writein, timeout=timeout)
+
+        command = self.process_command(command)
+
+        return CommandStream(
+            command,
+            self.execute_command_stream(command),
+            tail=self.output_tail if tail is None else tail
+        )
+
+    def stat_paths(self, paths, checksum=False):
+        """
+        Stat several paths at once (in one round trip through the proxy executors), symlinks are followed.
+
+        :param paths: paths (absolute, relative to current directory or starting with '~')
+        :param checksum: compute sha256 checksum of files
+        :return: stats of paths
+        :rtype: dict of PathStat
+        """
+        paths = list(paths)
+        if not paths:
+            return {}
+
+        probes = []
+        for filepath in paths:
+            quoted = shell_path(filepath)
+            probes.append("stat -L -c '%F|%s|%Y' -- {path} 2>/dev/null || echo".format(path=quoted))
+            if checksum:
+                probes.append("{{ [ -f {path} ] && sha256sum -- {path} 2>/dev/null || echo; }} | cut -d ' ' -f 1".format(
+                    path=quoted
+                ))
+
+        lines = self.execute('; '.join(probes), idempotent=True).split('\n')
+        # trailing empty lines could be stripped from the output
+        lines += [''] * (len(probes) - len(lines))
+        step = 2 if checksum else 1
+
+        stats = {}
+        for index, filepath in enumerate(paths):
+            stat_line = lines[index * step]
+            if not stat_line:
+                stats[filepath] = MISSING_PATH
+                continue
+
+            file_type, size, mtime = stat_line.rsplit('|', 2)
+            if file_type.startswith('regular'):
+                file_type = 'file'
+            elif file_type != 'directory':
+                file_type = 'other'
+
+            stats[filepath] = PathStat(
+                exists=True,
+                type=file_type,
+                size=int(size),
+                mtime=int(mtime),
+                checksum=(lines[index * step + 1] or None) if checksum else None
+            )
+        return stats
 
     def process_command(self, command):
         return command
@@ -109,8 +722,17 @@ class BareProxyExecutor(HasExecutor, BareExecutor):
     def effective_executor(self):
         return self.executor
 
+    def wrap_command(self, command):
+        return command
+
     def execute_command(self, command):
-        return self.effective_executor.execute_command(command)
+        return self.effective_executor.execute_command(self.wrap_command(command))
+
+    def execute_command_stream(self, command):
+        return self.effective_executor.execute_command_stream(self.wrap_command(command))
+
+    def pipe_command(self, command):
+        return self.effective_executor.pipe_command(self.wrap_command(command))
 
     @contextmanager
     def open_file(self, remote_path):
@@ -191,27 +813,80 @@ from time import sleep
 from logging import getLogger
 
 Isolation = namedtuple(
-    'Isolation', ['output_file', 'error_file', 'exitcode_file', 'command_file', 'pid_file', 'temp_file']
+    'Isolation', ['output_file', 'error_file', 'exitcode_file', 'command_file', 'pid_file', 'input_file']
 )
 
+# directory of isolations of background commands
+BACKGROUND_DIRECTORY = '/tmp/.codev'
+
 OUTPUT_FILE = 'codev.out'
 ERROR_FILE = 'codev.err'
 EXITCODE_FILE = 'codev.exit'
 COMMAND_FILE = 'codev.command'
 PID_FILE = 'codev.pid'
-TEMP_FILE = 'codev.temp'
+INPUT_FILE = 'codev.in'
+
+# exit code of launcher if another command of the same background executor is running
+BUSY_EXIT_CODE = 75
+
+# exit code of killed background command (the same as shell reports for SIGKILL)
+KILLED_EXIT_CODE = 128 + 9
+
+# launcher of background command - sets up isolation, checks a running command, starts the command in a new
+# process group (setsid) and reports its pid, all of it in one round trip
+LAUNCHER = '''mkdir -p {directory} || exit
+if [ ! -s {exitcode_file} ] && [ -s {pid_file} ] && ps -p "$(cat {pid_file})" -o stat= | grep -qv '^Z'; then
+    exit {busy_exit_code}
+fi
+: > {output_file} && : > {error_file} && : > {exitcode_file} && : > {pid_file} || exit
+cat > {input_file}
+cat > {command_file} << '{delimiter}'
+{script}
+{delimiter}
+chmod +x {command_file} || exit
+setsid nohup {command_file} < {input_file} > {output_file} 2> {error_file} &
+echo $! | tee {pid_file}'''
+
+# command file - the command runs in a subshell, so the exit code is saved even if it calls exit
+COMMAND_SCRIPT = '''(
+{command}
+)
+echo $? > {exitcode_file}'''
 
-from time import time
+# seconds between checks of the running command while its output is followed
+FOLLOW_INTERVAL = 0.1
 
+# mark of the end of polled output
+LOG_END = '.'
 
-class BackgroundExecutor(Executor):
+from time import monotonic, time
 
-    def __init__(self, *args, **kwargs):
+
+class BackgroundExecutorSettings(BaseSettings):
+    @property
+    def timeout(self):
+        """
+        :return: timeout of background commands in seconds or None
+        """
+        return self.data.get('timeout', None)
+
+    @property
+    def follow(self):
+        """
+        :return: output is followed by one streaming command (GNU tail) instead of polling
+        """
+        return self.data.get('follow', True)
+
+
+class BackgroundExecutor(HasExecutor, Executor):
+    settings_class = BackgroundExecutorSettings
+
+    def __init__(self, *args, ident=None, **kwargs):
         super().__init__(*args, **kwargs)
         self._isolation_cache = None
         self.__isolation_directory = None
         self.logger = getLogger(__name__)
-        self.ident = kwargs.pop('ident', str(time()))
+        self.ident = ident or str(time())
 
     @property
     def _isolation_directory(self):
@@ -223,18 +898,17 @@ class BackgroundExecutor(Executor):
             #         ip=ip, remote_port=remote_port, local_port=local_port
             #     )
 
-            self.__isolation_directory = '/tmp/.codev/{ident}'.format(
+            self.__isolation_directory = '{directory}/{ident}'.format(
+                directory=BACKGROUND_DIRECTORY,
                 ident=self.ident
             )
 
         return self.__isolation_directory
 
     def _create_isolation(self):
-        self.executor.execute('mkdir -p %s' % self._isolation_directory)
-
-        output_file, error_file, exitcode_file, command_file, pid_file, temp_file = map(
+        output_file, error_file, exitcode_file, command_file, pid_file, input_file = map(
             lambda f: '%s/%s' % (self._isolation_directory, f),
-            [OUTPUT_FILE, ERROR_FILE, EXITCODE_FILE, COMMAND_FILE, PID_FILE, TEMP_FILE]
+            [OUTPUT_FILE, ERROR_FILE, EXITCODE_FILE, COMMAND_FILE, PID_FILE, INPUT_FILE]
         )
 
         return Isolation(
@@ -243,7 +917,7 @@ class BackgroundExecutor(Executor):
             error_file=error_file,
             exitcode_file=exitcode_file,
             pid_file=pid_file,
-            temp_file=temp_file
+            input_file=input_file
         )
 
     @property
@@ -254,26 +928,44 @@ class BackgroundExecutor(Executor):
 
     def _clean(self):
         self.executor.execute('rm -rf %s' % self._isolation_directory)
+        self._isolation_cache = None
 
     def _file_exists(self, filepath):
         return self.executor.check_execute('[ -f %s ]' % filepath)
 
     def _bg_check(self, pid):
-        return self.executor.check_execute('ps -p %s -o pid=' % pid)
+        # finished process could stay as a zombie until its new parent reaps it
+        return self.executor.check_execute("ps -p %s -o stat= | grep -qv '^Z'" % pid)
 
-    def _bg_log(self, logger, skip_lines):
-        output = self.executor.execute('tail {output_file} -n+{skip_lines}'.format(
-            output_file=self._isolation.output_file,
-            skip_lines=skip_lines)
-        )
-        if not output:
-            return 0
+    def _bg_log(self, logger, offset, final=False):
+        """
+        Log output written after offset, only new bytes are read. A partial last line is read again
+        by the next call, unless the command is finished (final).
 
-        output_lines = output.splitlines()
+        :param offset: number of bytes of output already logged
+        :return: new offset
+        """
+        output = self.executor.execute(
+            # number of complete lines is counted first, the output only grows, so they are still complete
+            'tail -c +{start} {output_file}{complete}; echo {end}'.format(
+                start=offset + 1,
+                output_file=self._isolation.output_file,
+                complete='' if final else ' | head -n $(tail -c +{start} {output_file} | wc -l)'.format(
+                    start=offset + 1,
+                    output_file=self._isolation.output_file
+                ),
+                end=LOG_END
+            )
+        )
+        # the end mark keeps trailing newlines which tell whether the last line is complete
+        output = output[:-len(LOG_END)]
+        output_lines = output.split('\n')
+        if output_lines[-1] == '':
+            output_lines.pop()
 
         for line in output_lines:
-            (logger or self.output_logger).debug(line)
-        return len(output_lines)
+            (logger or self.logger).debug(line)
+        return offset + len(output.encode())
 
     def _bg_stop(self, pid):
         return self._bg_signal(pid)
@@ -283,20 +975,81 @@ class BackgroundExecutor(Executor):
         self._clean()
 
     def _bg_signal(self, pid, signal=None):
+        # the command is a descendant of the leader of its process group (see LAUNCHER), so the group is signalled
         return self.executor.execute(
-            'pkill {signal}-P {pid}'.format(
+            'kill -{signal} -{pid}'.format(
                 pid=pid,
-                signal='-%s ' % signal if signal else ''
+                signal=signal or 'TERM'
             )
         )
 
-    def _bg_wait(self, pid, logger=None):
-        skip_lines = 1
-        while self._bg_check(pid):
-            skip_lines += self._bg_log(logger, skip_lines)
-            sleep(0.25)
+    def _bg_kill_group(self, pid):
+        # background command is a leader of its own process group (see LAUNCHER)
+        self.executor.execute('kill -9 -{pid} 2>/dev/null; true'.format(pid=pid))
+
+    def _bg_follow(self, pid, offset, deadline):
+        """
+        Output of the command streamed until the command finishes.
+
+        tail --pid does not recognize a zombie as finished, so it waits for a watcher of the command instead.
+        The watcher does not hold the stream, so it ends as soon as tail fails (ie. tail without --pid).
+        """
+        return self.executor.execute_stream(
+            "while ps -p {pid} -o stat= | grep -qv '^Z'; do sleep {interval}; done >/dev/null 2>&1 & "
+            "tail --pid=$! -s {interval} -f -c +{start} {output_file} || "
+            "{{ status=$?; kill $!; exit $status; }}".format(
+                pid=pid,
+                start=offset + 1,
+                interval=FOLLOW_INTERVAL,
+                output_file=self._isolation.output_file
+            ),
+            timeout=None if deadline is None else max(deadline - monotonic(), 0)
+        )
+
+    def _bg_wait(self, pid, logger=None, timeout=None, command=None):
+        """
+        :param timeout: seconds after which the command is killed and CommandTimeoutError is raised
+        :param command: command for CommandTimeoutError, the command file if it is not known (see join)
+        :return: number of bytes of output already logged
+        """
+        deadline = None if timeout is None else monotonic() + timeout
+        offset = 0
+        running = self._bg_check(pid)
+        # short commands are finished before their output could be followed
+        if running and self.settings.follow:
+            try:
+                for line in self._bg_follow(pid, offset, deadline):
+                    (logger or self.logger).debug(line)
+                    offset += len(line.encode()) + 1
+                return offset
+            except CommandTimeoutError:
+                self._bg_kill_group(pid)
+                self._bg_timeout(command, timeout)
+            except CommandError as e:
+                self.logger.debug('Following of output failed, polling is used: {error}'.format(error=e.error))
 
-        self._bg_log(logger, skip_lines)
+        while running:
+            offset = self._bg_log(logger, offset)
+            if deadline is not None and monotonic() >= deadline:
+                self._bg_kill_group(pid)
+                self._bg_timeout(command, timeout)
+            sleep(0.25)
+            running = self._bg_check(pid)
+        return offset
+
+    def _bg_join(self, pid, logger=None, timeout=None):
+        offset = self._bg_wait(pid, logger=logger, timeout=timeout)
+        self._bg_log(logger, offset, final=True)
+
+    def _bg_timeout(self, command, timeout):
+        output_result, error_result = self.executor.execute_many([
+            'cat {output_file}'.format(**self._isolation._asdict()),
+            'cat {error_file}'.format(**self._isolation._asdict()),
+        ])
+        if command is None:
+            command = self._isolation.command_file
+        self._clean()
+        raise CommandTimeoutError(command, timeout, error_result.output, output_result.output)
 
     def _cat_file(self, catfile):
         return self.executor.execute('cat %s' % catfile)
@@ -304,55 +1057,77 @@ class BackgroundExecutor(Executor):
     def _get_bg_running_pid(self):
         return self._cat_file(self._isolation.pid_file)
 
-    def execute(self, command, logger=None, writein=None, wait=True):
-        self.logger.debug('Command: {command} wait: {wait}'.format(command=command, wait=wait))
-        isolation = self._isolation
+    def _command_script(self, command):
+        return COMMAND_SCRIPT.format(command=command, exitcode_file=self._isolation.exitcode_file)
+
+    def _launcher(self, command):
+        return LAUNCHER.format(
+            directory=self._isolation_directory,
+            busy_exit_code=BUSY_EXIT_CODE,
+            # random token, see replay.TOKEN_PATTERN
+            delimiter='codev-{uuid}'.format(uuid=uuid4().hex),
+            script=self._command_script(command),
+            **self._isolation._asdict()
+        )
 
-        if self._file_exists(isolation.exitcode_file) and self._cat_file(isolation.exitcode_file) == '':
-            if self._file_exists(isolation.pid_file):
-                pid = self._cat_file(isolation.pid_file)
-                if pid and self._bg_check(pid):
-                    raise CommandError('Another process is running.')
+    def execute(self, command, logger=None, writein=None, wait=True, timeout=None):
+        """
+        :param timeout: seconds after which the command is killed and CommandTimeoutError is raised,
+            default is 'timeout' setting
+        """
+        self.logger.debug('Command: {command} wait: {wait}'.format(command=command, wait=wait))
 
-        self.executor.execute('echo "" > {output_file} > {error_file} > {exitcode_file} > {pid_file}'.format(
-            **isolation._asdict()
-        ))
+        pid = self._bg_launch(command, writein)
 
-        self.executor.execute(
-            'tee {command_file} > /dev/null && chmod +x {command_file}'.format(
-                **isolation._asdict()
-            ),
-            writein='{command}; echo $? > {exitcode_file}\n'.format(
-                command=command,
-                exitcode_file=isolation.exitcode_file
-            )
-        )
+        if not wait:
+            return self.ident
 
-        bg_command = 'bash -c "nohup {command_file} > {output_file} 2> {error_file} & echo \$! | tee {pid_file}"'.format(
-            **isolation._asdict()
+        offset = self._bg_wait(
+            pid, logger=logger, timeout=self.settings.timeout if timeout is None else timeout, command=command
         )
+        return self._bg_collect(command, logger, offset)
 
-        # max lines against readline hang
-        pid = self.executor.execute(bg_command, writein=writein)
+    def _bg_launch(self, command, writein=None):
+        """
+        :return: pid of started command
+        """
+        try:
+            # writein is saved to input file of the command
+            pid = self.executor.execute(self._launcher(command), writein=writein)
+        except CommandError as e:
+            if e.exit_code == BUSY_EXIT_CODE:
+                raise CommandError(command, e.exit_code, 'Another process is running.') from None
+            raise
 
         if not pid.isdigit():
             raise ValueError('not a pid %s' % pid)
+        return pid
 
-        if not wait:
-            return self.ident
+    def _bg_collect(self, command, logger, offset):
+        """
+        Result of finished command collected in one round trip, isolation is cleaned.
 
-        self._bg_wait(pid, logger=logger)
+        :param offset: number of bytes of output already logged
+        """
+        isolation = self._isolation
+        exitcode_result, output_result, error_result, _ = self.executor.execute_many([
+            'cat {exitcode_file}'.format(**isolation._asdict()),
+            'cat {output_file}'.format(**isolation._asdict()),
+            'cat {error_file}'.format(**isolation._asdict()),
+            'rm -rf {directory}'.format(directory=self._isolation_directory),
+        ], check=True)
+        self._isolation_cache = None
 
-        exit_code = int(self._cat_file(isolation.exitcode_file))
+        # killed command does not save its exit code
+        exit_code = int(exitcode_result.output or KILLED_EXIT_CODE)
+        output = output_result.output
 
-        output = self._cat_file(isolation.output_file)
+        # the rest of output is logged from the collected one
+        for line in output.encode()[offset:].decode().splitlines():
+            (logger or self.logger).debug(line)
 
         if exit_code:
-            err = self._cat_file(isolation.error_file)
-            self._clean()
-            raise CommandError(command, exit_code, err, output)
-
-        self._clean()
+            raise CommandError(command, exit_code, error_result.output, output)
         return output
 
     def _control(self, method, *args, **kwargs):
@@ -377,8 +1152,8 @@ class BackgroundExecutor(Executor):
         else:
             return False
 
-    def join(self, logger=None):
-        return self._control(self._bg_wait, logger=logger)
+    def join(self, logger=None, timeout=None):
+        return self._control(self._bg_join, logger=logger, timeout=timeout)
 
     def stop(self):
         return self._control(self._bg_stop)
@@ -0,0 +1,128 @@
+from collections import namedtuple
+from concurrent.futures import ALL_COMPLETED, FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from contextlib import ExitStack, contextmanager
+from logging import getLogger
+
+from .executor import BareExecutor, Command, CommandError
+
+logger = getLogger(__name__)
+
+TargetResult = namedtuple('TargetResult', ['target', 'result', 'error'])
+
+
+class FanOutError(CommandError):
+    """
+    Failure of some targets, results of all targets (finished, failed or cancelled) are in 'results'.
+    """
+    def __init__(self, command, results):
+        self.results = results
+
+        exit_code = next(
+            (result.error.exit_code for result in self.failed if isinstance(result.error, CommandError)), 1
+        )
+        error = '\n'.join(
+            '{target}: {error}'.format(target=result.target, error=result.error) for result in self.failed
+        )
+        super().__init__(command, exit_code, error)
+
+    @property
+    def failed(self):
+        return [result for result in self.results if result.error is not None]
+
+
+class FanOutCancelled(Exception):
+    def __init__(self):
+        super().__init__('Cancelled after failure of another target.')
+
+
+class FanOutExecutor(BareExecutor):
+    """
+    Runs the same command (or file transfer) on several targets (ie. machines) concurrently.
+
+    Results of execute_all, execute_many and file operations are lists of TargetResult in order of targets,
+    execute returns output text as any other executor. If any target fails, FanOutError is raised when all
+    targets are finished, or as soon as possible with fail_fast (not started targets are cancelled).
+    """
+    def __init__(self, targets, *args, concurrency=None, fail_fast=False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.targets = list(targets)
+        self.concurrency = concurrency
+        self.fail_fast = fail_fast
+
+    def map(self, function, *args, command=None):
+        """
+        :param function: function called with target and args for every target
+        :param command: description of the operation for FanOutError
+        :return: results of the function for targets
+        :rtype: list of TargetResult
+        """
+        if not self.targets:
+            return []
+
+        with ThreadPoolExecutor(max_workers=self.concurrency or len(self.targets)) as pool:
+            futures = [pool.submit(function, target, *args) for target in self.targets]
+            wait(futures, return_when=FIRST_EXCEPTION if self.fail_fast else ALL_COMPLETED)
+            if self.fail_fast:
+                for future in futures:
+                    future.cancel()
+
+        results = []
+        for target, future in zip(self.targets, futures):
+            if future.cancelled():
+                results.append(TargetResult(target, None, FanOutCancelled()))
+            elif future.exception() is not None:
+                results.append(TargetResult(target, None, future.exception()))
+            else:
+                results.append(TargetResult(target, future.result(), None))
+
+        if any(result.error is not None for result in results):
+            raise FanOutError(command or function.__name__, results)
+        return results
+
+    def execute_all(self, command_str, output_logger=None, writein=None, idempotent=False, timeout=None):
+        """
+        Targets execute the command by their execute, so it is measured, recorded and cached as usual.
+
+        :return: outputs of the command for targets
+        :rtype: list of TargetResult
+        """
+        command = Command(
+            command_str, output_logger=output_logger, writein=writein, idempotent=idempotent, timeout=timeout
+        )
+        logger.debug("Fan out command: '{command}' to {count} targets".format(
+            command=command, count=len(self.targets)
+        ))
+        return self.map(lambda target: target.execute(command), command=command)
+
+    def execute_command(self, command):
+        """
+        :return: outputs of targets joined in order of targets, see execute_all for results of targets
+        """
+        return '\n'.join(result.result for result in self.execute_all(command))
+
+    def execute_many(self, commands, check=False):
+        """
+        :return: lists of results of commands for targets, see BareExecutor.execute_many
+        :rtype: list of TargetResult
+        """
+        return self.map(
+            lambda target: target.execute_many(commands, check=check),
+            command='; '.join(map(str, commands))
+        )
+
+    def execute_command_stream(self, command):
+        raise NotImplementedError('Output of several targets can not be streamed.')
+
+    @contextmanager
+    def open_file(self, remote_path):
+        with ExitStack() as stack:
+            yield self.map(
+                lambda target: stack.enter_context(target.open_file(remote_path)),
+                command='open {remote_path}'.format(remote_path=remote_path)
+            )
+
+    def send_file(self, source, target):
+        return self.map(
+            lambda target_executor: target_executor.send_file(source, target),
+            command='send {source} to {target}'.format(source=source, target=target)
+        )
@@ -0,0 +1,168 @@
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+from heapq import heappop, heappush
+from itertools import count
+from logging import getLogger
+from os.path import basename
+from threading import Condition, local
+from time import monotonic
+
+logger = getLogger(__name__)
+
+# lower value is served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_NORMAL = 10
+PRIORITY_BULK = 20
+
+# active governor, processes are not limited if it is None (see LocalExecutor)
+governor = None
+
+_context = local()
+
+
+def program(command):
+    """
+    :return: name of the program which is spawned for the command (the outermost wrapper), ie. 'lxc'
+    """
+    if command.wrappers:
+        command_str = command.wrappers[-1]
+    elif command.argv:
+        return basename(command.argv[0])
+    else:
+        command_str = command.base
+
+    for word in command_str.split():
+        # environment variables assignments
+        if '=' not in word:
+            return basename(word)
+    return ''
+
+
+@contextmanager
+def priority(value):
+    """
+    Priority of commands executed by the current thread in the context.
+    """
+    previous = getattr(_context, 'priority', None)
+    _context.priority = value
+    try:
+        yield
+    finally:
+        _context.priority = previous
+
+
+def current_priority(default):
+    value = getattr(_context, 'priority', None)
+    return default if value is None else value
+
+
+class QueueStats(object):
+    def __init__(self):
+        self.acquired = 0
+        self.waited = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.max_queued = 0
+        self.running = 0
+        self.queued = 0
+
+    def as_dict(self):
+        return OrderedDict((
+            ('acquired', self.acquired),
+            ('waited', self.waited),
+            ('wait_time', self.wait_time),
+            ('max_wait_time', self.max_wait_time),
+            ('max_queued', self.max_queued),
+            ('running', self.running),
+            ('queued', self.queued),
+        ))
+
+
+class Governor(object):
+    """
+    Limits the number of concurrently running processes per program (ie. at most 4 'lxc' and 2 'VBoxManage').
+
+    Waiting commands are served by priority, then in order of arrival.
+    """
+    def __init__(self, limits=None, default_limit=None):
+        """
+        :param limits: maximal number of concurrent processes per program
+        :param default_limit: limit of programs which are not in limits, None for unlimited
+        """
+        self.limits = dict(limits or {})
+        self.default_limit = default_limit
+        self.queues = defaultdict(QueueStats)
+        self._waiting = defaultdict(list)
+        self._sequence = count()
+        self._condition = Condition()
+
+    def limit(self, name):
+        return self.limits.get(name, self.default_limit)
+
+    @contextmanager
+    def slot(self, command, default_priority=PRIORITY_NORMAL):
+        """
+        Context in which the process of the command is running.
+
+        :param default_priority: priority of command if it is not set by context (see priority)
+        """
+        name = program(command)
+        limit = self.limit(name)
+        if limit is None:
+            yield
+            return
+
+        ticket = current_priority(default_priority), next(self._sequence)
+        stats = self.queues[name]
+        start = monotonic()
+
+        with self._condition:
+            heappush(self._waiting[name], ticket)
+            stats.queued += 1
+            stats.max_queued = max(stats.max_queued, stats.queued)
+            while stats.running >= limit or self._waiting[name][0] != ticket:
+                self._condition.wait()
+            heappop(self._waiting[name])
+            stats.queued -= 1
+            stats.running += 1
+            stats.acquired += 1
+
+            wait_time = monotonic() - start
+            if self._waiting[name]:
+                # the next one could be allowed too
+                self._condition.notify_all()
+
+        if wait_time > 0.001:
+            stats.waited += 1
+            stats.wait_time += wait_time
+            stats.max_wait_time = max(stats.max_wait_time, wait_time)
+            logger.debug("Command '{command}' waited {wait_time:.3f}s for '{name}'.".format(
+                command=command, wait_time=wait_time, name=name
+            ))
+
+        try:
+            yield
+        finally:
+            with self._condition:
+                stats.running -= 1
+                self._condition.notify_all()
+
+    def stats(self):
+        return OrderedDict((name, stats.as_dict()) for name, stats in sorted(self.queues.items()))
+
+
+def configure(limits=None, default_limit=None):
+    """
+    Set up process-wide governor.
+
+    :return: governor
+    :rtype: Governor
+    """
+    global governor
+    governor = Governor(limits=limits, default_limit=default_limit)
+    return governor
+
+
+def disable():
+    global governor
+    governor = None
@@ -44,7 +44,7 @@ class Installer(HasExecutor):
 
     def _distribution(self):
         if not self.__distribution:
-            issue = self.executor.execute('cat /etc/issue')
+            issue = self.executor.execute('cat /etc/issue', idempotent=True)
             for distribution, issue_start in DISTRIBUTION_ISSUES.items():
                 if issue.startswith(issue_start):
                     self.__distribution = distribution
@@ -65,8 +65,8 @@ class Installer(HasExecutor):
         try:
             if self._distribution() in ('debian', 'ubuntu'):
                 return 'install ok installed' == self.executor.execute(
-                    "dpkg-query -W -f='${{Status}}' {package}".format(package=package))
+                    "dpkg-query -W -f='${{Status}}' {package}".format(package=package), idempotent=True)
             elif self._distribution() == 'arch':
-                return self.executor.check_execute("pacman -Qi {package}".format(package=package))
+                return self.executor.check_execute("pacman -Qi {package}".format(package=package), idempotent=True)
         except CommandError:
             return False
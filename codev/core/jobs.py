@@ -0,0 +1,301 @@
+"""
+Jobs - background commands running side by side. Every submitted command gets its job id and its own isolation
+(see BackgroundExecutor), the number of running jobs is limited and the other jobs wait in FIFO queue.
+
+The job table is persistent - the launcher and the command itself append their state changes to a file
+on the target, so jobs are visible even to other processes (without any extra round trip).
+"""
+from collections import OrderedDict, deque, namedtuple
+from logging import getLogger
+from threading import Condition, Thread
+from time import time
+from uuid import uuid4
+
+from codev.core.executor import BACKGROUND_DIRECTORY, KILLED_EXIT_CODE, BackgroundExecutor, CommandError
+
+logger = getLogger(__name__)
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_FINISHED = 'finished'
+JOB_FAILED = 'failed'
+JOB_KILLED = 'killed'
+
+JOB_DONE = (JOB_FINISHED, JOB_FAILED, JOB_KILLED)
+
+# the job table - tab separated lines: job id, status, pid, time, exit code, size of output (offset of finished job)
+JOBS_FILE = 'codev.jobs'
+
+# default maximal number of running jobs
+DEFAULT_LIMIT = 4
+
+JobStatus = namedtuple('JobStatus', ['job_id', 'status', 'pid', 'started', 'finished', 'exit_code', 'offset'])
+
+
+class Job(object):
+    def __init__(self, job_id, command, logger=None, writein=None, timeout=None):
+        self.job_id = job_id
+        self.command = command
+        self.logger = logger
+        self.writein = writein
+        self.timeout = timeout
+        self.status = JOB_QUEUED
+        self.pid = None
+        self.started = None
+        self.finished = None
+        self.exit_code = None
+        # number of bytes of output already logged
+        self.offset = 0
+        self.output = None
+        self.failure = None
+        self.executor = None
+        self.killed = False
+
+    def debug(self, line):
+        # job is the logger of its output, so it knows its offset
+        self.offset += len(line.encode()) + 1
+        (self.logger or logger).debug(line)
+
+    def as_status(self):
+        return JobStatus(
+            self.job_id, self.status, self.pid, self.started, self.finished, self.exit_code, self.offset
+        )
+
+
+class JobExecutor(BackgroundExecutor):
+    """
+    Background executor of one job, its start and end are recorded to the job table.
+    """
+    def __init__(self, *args, job_id, table_file, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.job_id = job_id
+        self.table_file = table_file
+
+    def _command_script(self, command):
+        return (
+            '{script}\n'
+            'printf "%s\\t{status}\\t\\t%s\\t%s\\t%s\\n" {job_id} "$(date +%s)" "$(cat {exitcode_file})" '
+            '"$(wc -c < {output_file})" >> {table_file}'
+        ).format(
+            script=super()._command_script(command),
+            status=JOB_FINISHED,
+            job_id=self.job_id,
+            exitcode_file=self._isolation.exitcode_file,
+            output_file=self._isolation.output_file,
+            table_file=self.table_file
+        )
+
+    def _launcher(self, command):
+        return (
+            '{launcher}\n'
+            'printf "%s\\t{status}\\t%s\\t%s\\t\\t\\n" {job_id} "$!" "$(date +%s)" >> {table_file}'
+        ).format(
+            launcher=super()._launcher(command),
+            status=JOB_RUNNING,
+            job_id=self.job_id,
+            table_file=self.table_file
+        )
+
+    def run(self, job):
+        """
+        Execute job and wait for its result.
+
+        :return: output of job
+        """
+        job.pid = self._bg_launch(job.command, job.writein)
+        if job.killed:
+            # killed while it was launched
+            self.kill_job(job)
+        offset = self._bg_wait(
+            job.pid,
+            logger=job,
+            timeout=self.settings.timeout if job.timeout is None else job.timeout,
+            command=job.command
+        )
+        return self._bg_collect(job.command, job, offset)
+
+    def kill_job(self, job):
+        if job.pid:
+            self._bg_kill_group(job.pid)
+
+    def _bg_kill_group(self, pid):
+        # killed command does not record its end, so it is recorded with the kill (in the same round trip)
+        self.executor.execute((
+            'kill -9 -{pid} 2>/dev/null; '
+            'printf "%s\\t{status}\\t%s\\t%s\\t%s\\t\\n" {job_id} {pid} "$(date +%s)" {exit_code} >> {table_file}'
+        ).format(
+            pid=pid,
+            status=JOB_KILLED,
+            job_id=self.job_id,
+            exit_code=KILLED_EXIT_CODE,
+            table_file=self.table_file
+        ))
+
+
+class JobManager(object):
+    """
+    Jobs of one ident, jobs over the limit are queued and started in order of submission.
+    """
+    def __init__(self, executor, ident=None, limit=DEFAULT_LIMIT, settings_data=None):
+        """
+        :param limit: maximal number of running jobs, jobs are not limited if it is None
+        :param settings_data: settings of background executors of jobs
+        """
+        self.executor = executor
+        # random ident and job ids are tokens, so they are normalized in recordings (see replay.TOKEN_PATTERN)
+        self.ident = ident or 'codev-{uuid}'.format(uuid=uuid4().hex)
+        self.limit = limit
+        self.settings_data = settings_data
+        self.directory = '{directory}/{ident}'.format(directory=BACKGROUND_DIRECTORY, ident=self.ident)
+        self.table_file = '{directory}/{jobs_file}'.format(directory=self.directory, jobs_file=JOBS_FILE)
+        self._jobs = OrderedDict()
+        self._queue = deque()
+        self._running = 0
+        self._condition = Condition()
+
+    def submit(self, command, logger=None, writein=None, timeout=None):
+        """
+        :param timeout: seconds after which the job is killed, default is 'timeout' setting
+        :return: job id
+        """
+        job = Job('codev-{uuid}'.format(uuid=uuid4().hex), command, logger=logger, writein=writein, timeout=timeout)
+        with self._condition:
+            self._jobs[job.job_id] = job
+            self._queue.append(job)
+            self._dispatch()
+        return job.job_id
+
+    def _dispatch(self):
+        # called with the condition acquired
+        while self._queue and (self.limit is None or self._running < self.limit):
+            job = self._queue.popleft()
+            job.status = JOB_RUNNING
+            job.started = time()
+            job.executor = JobExecutor(
+                executor=self.executor,
+                ident='{ident}/{job_id}'.format(ident=self.ident, job_id=job.job_id),
+                job_id=job.job_id,
+                table_file=self.table_file,
+                settings_data=self.settings_data
+            )
+            self._running += 1
+            Thread(target=self._run, args=(job,), daemon=True).start()
+
+    def _run(self, job):
+        try:
+            job.output = job.executor.run(job)
+            job.exit_code = 0
+        except CommandError as e:
+            job.failure = e
+            job.exit_code = e.exit_code
+        except Exception as e:
+            job.failure = e
+
+        with self._condition:
+            if job.killed:
+                job.status = JOB_KILLED
+            else:
+                job.status = JOB_FAILED if job.failure else JOB_FINISHED
+            job.finished = time()
+            self._running -= 1
+            self._dispatch()
+            self._condition.notify_all()
+
+    def _job(self, job_id):
+        try:
+            return self._jobs[job_id]
+        except KeyError:
+            raise ValueError("Job '{job_id}' does not exist.".format(job_id=job_id))
+
+    def wait(self, job_id):
+        """
+        Wait for the job.
+
+        :return: output of the job
+        """
+        job = self._job(job_id)
+        with self._condition:
+            self._condition.wait_for(lambda: job.status in JOB_DONE)
+        if job.failure is not None:
+            raise job.failure
+        return job.output
+
+    def wait_all(self):
+        """
+        :return: outputs of all jobs (failed jobs have CommandError)
+        :rtype: OrderedDict
+        """
+        results = OrderedDict()
+        for job_id in list(self._jobs):
+            try:
+                results[job_id] = self.wait(job_id)
+            except CommandError as e:
+                results[job_id] = e
+        return results
+
+    def kill(self, job_id):
+        job = self._job(job_id)
+        with self._condition:
+            if job.status in JOB_DONE:
+                return False
+            job.killed = True
+            if job.status == JOB_QUEUED:
+                self._queue.remove(job)
+                job.status = JOB_KILLED
+                job.finished = time()
+                job.exit_code = KILLED_EXIT_CODE
+                job.failure = CommandError(job.command, KILLED_EXIT_CODE, 'Job has been killed before it started.')
+                self._condition.notify_all()
+                return True
+        job.executor.kill_job(job)
+        return True
+
+    def status(self, job_id):
+        """
+        :rtype: JobStatus
+        """
+        with self._condition:
+            return self._job(job_id).as_status()
+
+    def table(self):
+        """
+        Job table from the target, it includes jobs of other processes.
+
+        :return: statuses of jobs by job id
+        :rtype: OrderedDict of JobStatus
+        """
+        try:
+            output = self.executor.execute('cat {table_file}'.format(table_file=self.table_file))
+        except CommandError:
+            return OrderedDict()
+
+        table = OrderedDict()
+        for line in output.splitlines():
+            job_id, status, pid, timestamp, exit_code, offset = line.split('\t')
+            if status == JOB_RUNNING:
+                table[job_id] = JobStatus(job_id, status, int(pid), int(timestamp), None, None, None)
+            elif job_id in table and table[job_id].status == JOB_RUNNING:
+                exit_code = int(exit_code or 0)
+                if status == JOB_FINISHED and exit_code:
+                    status = JOB_FAILED
+                table[job_id] = table[job_id]._replace(
+                    status=status, finished=int(timestamp), exit_code=exit_code, offset=int(offset) if offset else None
+                )
+        return table
+
+    def jobs(self):
+        """
+        :return: statuses of jobs of this manager (including the queued ones) and jobs from the job table
+        :rtype: list of JobStatus
+        """
+        table = self.table()
+        with self._condition:
+            for job_id, job in self._jobs.items():
+                table[job_id] = job.as_status()
+        return list(table.values())
+
+    def clean(self):
+        """
+        Remove the job table and isolations of all jobs.
+        """
+        self.executor.execute('rm -rf {directory}'.format(directory=self.directory))
@@ -1,5 +1,8 @@
+from asyncio import gather, get_event_loop, sleep
+
 from codev.core.settings import HasSettings
 from codev.core.utils import HasIdent
+from .async_executor import AsyncProxyExecutor
 from .executor import ProxyExecutor
 from .provider import Provider
 
@@ -47,6 +50,66 @@ class BaseMachine(HasSettings, ProxyExecutor, HasIdent):
     #     raise NotImplementedError()
 
 
+class AsyncBaseMachine(HasSettings, AsyncProxyExecutor, HasIdent):
+    async def exists(self):
+        raise NotImplementedError()
+
+    async def create(self):
+        raise NotImplementedError()
+
+    async def destroy(self):
+        raise NotImplementedError()
+
+    async def is_started(self):
+        raise NotImplementedError()
+
+    async def start(self):
+        raise NotImplementedError()
+
+    async def stop(self):
+        raise NotImplementedError()
+
+    async def wait_for_start(self, interval=0.5):
+        while not await self.is_started():
+            await sleep(interval)
+
+    async def start_or_create(self):
+        if not await self.exists():
+            await self.create()
+            created = True
+        else:
+            created = False
+
+        if not await self.is_started():
+            await self.start()
+        return created
+
+
+class AsyncMachineAdapter(object):
+    """
+    Asynchronous lifecycle of synchronous machine, methods are called in threads of default loop executor.
+    """
+    def __init__(self, machine):
+        self.machine = machine
+
+    def __getattr__(self, name):
+        method = getattr(self.machine, name)
+
+        async def call(*args):
+            return await get_event_loop().run_in_executor(None, method, *args)
+        return call
+
+
+async def start_or_create_machines(machines):
+    """
+    Start or create all machines concurrently.
+
+    :param machines: asynchronous machines (or synchronous machines wrapped by AsyncMachineAdapter)
+    :return: list of flags if machine has been created
+    """
+    return await gather(*(machine.start_or_create() for machine in machines))
+
+
 class Machine(Provider, BaseMachine):
     # def clone(self):
     #     raise NotImplementedError()
@@ -0,0 +1,194 @@
+import atexit
+import json
+import sys
+from bisect import bisect_left
+from collections import OrderedDict
+from logging import getLogger
+from os.path import dirname
+from threading import Lock
+
+from . import governor
+
+logger = getLogger(__name__)
+
+# upper bounds of histogram buckets in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+# frames of these modules are skipped when call site is searched
+_INTERNAL_MODULES = {dirname(__file__) + '/executor.py', dirname(__file__) + '/cache.py', __file__}
+
+# active recorder, metrics are not collected if it is None (see BareExecutor.execute)
+recorder = None
+
+
+def executor_chain(executor):
+    """
+    :return: names of executors from the outermost to the root one (ie. ('lxd', 'local'))
+    :rtype: tuple
+    """
+    chain = []
+    executor_class = None
+    while executor is not None:
+        # helper executors created by proxy executors themselves (see BareProxyExecutor.executor_class) are skipped
+        if type(executor) is not executor_class:
+            chain.append(getattr(executor, 'provider_name', None) or type(executor).__name__)
+        executor_class = getattr(executor, 'executor_class', None)
+        executor = getattr(executor, 'executor', None)
+    return tuple(chain)
+
+
+def call_site(depth=1):
+    """
+    :return: first caller outside of executor internals as 'module:function'
+    """
+    frame = sys._getframe(depth)
+    while frame is not None and frame.f_code.co_filename in _INTERNAL_MODULES:
+        frame = frame.f_back
+    if frame is None:
+        return ''
+    return '{module}:{function}'.format(module=frame.f_globals.get('__name__', ''), function=frame.f_code.co_name)
+
+
+class Histogram(object):
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.errors = 0
+        self.output_size = 0
+
+    def observe(self, wall_time, exit_code, output_size):
+        self.counts[bisect_left(BUCKETS, wall_time)] += 1
+        self.count += 1
+        self.sum += wall_time
+        self.output_size += output_size
+        if exit_code:
+            self.errors += 1
+
+    def as_dict(self):
+        cumulative = 0
+        buckets = OrderedDict()
+        for bound, count in zip(BUCKETS + ('+Inf',), self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return OrderedDict((
+            ('count', self.count),
+            ('sum', self.sum),
+            ('errors', self.errors),
+            ('output_size', self.output_size),
+            ('buckets', buckets),
+        ))
+
+
+class MetricsRecorder(object):
+    """
+    Collects timing of executed commands and aggregates them to histograms per provider and call site.
+    """
+    def __init__(self, keep_records=True):
+        self.keep_records = keep_records
+        self.records = []
+        self.histograms = OrderedDict()
+        self._lock = Lock()
+
+    def record(self, command, chain, wall_time, exit_code, output_size, site):
+        provider = chain[0] if chain else ''
+        with self._lock:
+            if self.keep_records:
+                self.records.append(OrderedDict((
+                    ('command', str(command)),
+                    ('chain', list(chain)),
+                    ('wall_time', wall_time),
+                    ('exit_code', exit_code),
+                    ('output_size', output_size),
+                    ('call_site', site),
+                )))
+            key = provider, site
+            if key not in self.histograms:
+                self.histograms[key] = Histogram()
+            self.histograms[key].observe(wall_time, exit_code, output_size)
+
+    def as_dict(self):
+        histograms = []
+        for (provider, site), histogram in self.histograms.items():
+            data = OrderedDict((('provider', provider), ('call_site', site)))
+            data.update(histogram.as_dict())
+            histograms.append(data)
+        data = OrderedDict((('histograms', histograms), ('records', self.records)))
+        if governor.governor is not None:
+            data['queues'] = governor.governor.stats()
+        return data
+
+    def as_prometheus(self):
+        lines = [
+            '# HELP codev_command_duration_seconds Wall time of executed commands.',
+            '# TYPE codev_command_duration_seconds histogram',
+        ]
+        for (provider, site), histogram in self.histograms.items():
+            labels = 'provider="{provider}",call_site="{site}"'.format(provider=provider, site=site)
+            for bound, count in histogram.as_dict()['buckets'].items():
+                lines.append(
+                    'codev_command_duration_seconds_bucket{{{labels},le="{bound}"}} {count}'.format(
+                        labels=labels, bound=bound, count=count
+                    )
+                )
+            lines.append('codev_command_duration_seconds_sum{{{labels}}} {sum}'.format(labels=labels, sum=histogram.sum))
+            lines.append(
+                'codev_command_duration_seconds_count{{{labels}}} {count}'.format(labels=labels, count=histogram.count)
+            )
+
+        lines.append('# TYPE codev_command_errors_total counter')
+        for (provider, site), histogram in self.histograms.items():
+            lines.append('codev_command_errors_total{{provider="{provider}",call_site="{site}"}} {errors}'.format(
+                provider=provider, site=site, errors=histogram.errors
+            ))
+
+        lines.append('# TYPE codev_command_output_bytes_total counter')
+        for (provider, site), histogram in self.histograms.items():
+            lines.append('codev_command_output_bytes_total{{provider="{provider}",call_site="{site}"}} {size}'.format(
+                provider=provider, site=site, size=histogram.output_size
+            ))
+
+        if governor.governor is not None:
+            queues = governor.governor.stats()
+            for name, help_text in (
+                    ('waited', 'Processes which waited for a free slot.'),
+                    ('wait_time', 'Time spent waiting for a free slot.'),
+                    ('max_queued', 'Maximal number of processes waiting at once.')):
+                lines.append('# HELP codev_queue_{name} {help_text}'.format(name=name, help_text=help_text))
+                lines.append('# TYPE codev_queue_{name} gauge'.format(name=name))
+                for program, stats in queues.items():
+                    lines.append('codev_queue_{name}{{program="{program}"}} {value}'.format(
+                        name=name, program=program, value=stats[name]
+                    ))
+        return '\n'.join(lines) + '\n'
+
+    def export(self, filepath):
+        """
+        :param filepath: metrics are written in Prometheus text format if extension is '.prom', JSON otherwise
+        """
+        with open(filepath, 'w') as metrics_file:
+            if filepath.endswith('.prom'):
+                metrics_file.write(self.as_prometheus())
+            else:
+                json.dump(self.as_dict(), metrics_file, indent=2)
+        logger.debug("Metrics written to '{filepath}'.".format(filepath=filepath))
+
+
+def enable(filepath=None):
+    """
+    Start collecting metrics of executed commands.
+
+    :param filepath: metrics are exported to the file at exit
+    :return: recorder
+    :rtype: MetricsRecorder
+    """
+    global recorder
+    recorder = MetricsRecorder()
+    if filepath:
+        atexit.register(recorder.export, filepath)
+    return recorder
+
+
+def disable():
+    global recorder
+    recorder = None
@@ -1,2 +1,4 @@
 from .local import *
+from .async_local import *
+from .paramiko_ssh import *
 # from .ssh import *
@@ -0,0 +1,70 @@
+from asyncio import create_subprocess_exec, create_subprocess_shell, gather
+from asyncio.subprocess import PIPE
+from contextlib import asynccontextmanager
+from logging import getLogger
+from os.path import expanduser
+
+from codev.core.async_executor import AsyncExecutor
+from codev.core.executor import CommandError
+from .local import LineBuffer, PIPE_CHUNK_SIZE
+
+logger = getLogger(__name__)
+
+
+class AsyncLocalExecutor(AsyncExecutor):
+    provider_name = 'local'
+
+    async def execute_command(self, command):
+        logger.debug("Execute command: '{command}'".format(command=command))
+
+        process = await create_subprocess_shell(str(command), stdin=PIPE, stdout=PIPE, stderr=PIPE)
+
+        output, error, _ = await gather(
+            self._read(process.stdout, logger=command.output_logger),
+            self._read(process.stderr),
+            self._write(process.stdin, command.writein)
+        )
+
+        exit_code = await process.wait()
+
+        if exit_code:
+            raise CommandError(command, exit_code, error, output)
+        return output
+
+    async def _read(self, stream, logger=None):
+        line_buffer = LineBuffer()
+        output_lines = []
+        while True:
+            data = await stream.read(PIPE_CHUNK_SIZE)
+            lines = line_buffer.feed(data) if data else line_buffer.flush()
+            for line in lines:
+                output_lines.append(line)
+                if logger:
+                    logger.debug(line)
+            if not data:
+                return '\n'.join(output_lines)
+
+    async def _write(self, stdin, writein):
+        try:
+            if writein:
+                stdin.write(writein.encode())
+                await stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            stdin.close()
+
+    async def send_file(self, source, target):
+        if source == target:
+            return
+
+        process = await create_subprocess_exec('cp', source, target, stderr=PIPE)
+        _, error = await process.communicate()
+        if process.returncode:
+            raise CommandError('cp {source} {target}'.format(source=source, target=target), process.returncode, error.decode())
+
+    @asynccontextmanager
+    async def open_file(self, remote_path):
+        remote_path = expanduser(remote_path)
+        with open(remote_path) as fo:
+            yield fo
@@ -1,60 +1,241 @@
-from contextlib import contextmanager
+from collections import deque
+from contextlib import contextmanager, nullcontext
 from logging import getLogger
-from multiprocessing.pool import ThreadPool
-from os import fdopen, remove
+from os import killpg, read, write, set_blocking
 from os.path import expanduser
-from subprocess import Popen, PIPE, check_call
-from tempfile import mkstemp
-from time import sleep
-
-from codev.core.executor import Executor, CommandError
+from selectors import DefaultSelector, EVENT_READ, EVENT_WRITE
+from shlex import quote
+from signal import SIGKILL
+from subprocess import Popen, PIPE, TimeoutExpired, check_call
+from threading import Lock, Thread, get_ident
+from time import monotonic
+from uuid import uuid4
+
+from codev.core import governor
+from codev.core.executor import Executor, CommandError, CommandTimeoutError
+from codev.core.settings import BaseSettings
 
 logger = getLogger(__name__)
 
+PIPE_CHUNK_SIZE = 65536
+
+# time for which failed command of pipe is awaited before it is killed
+PIPE_FAILURE_TIMEOUT = 0.1
+
+# interval in which the end of process is checked while its streams are silent
+EXIT_POLL_INTERVAL = 0.05
+
+OUTPUT = 'output'
+ERROR = 'error'
+
+
+def kill_process_group(process):
+    """
+    Kill process started in a new session with all its descendants (unless they left its process group).
+    """
+    try:
+        killpg(process.pid, SIGKILL)
+    except ProcessLookupError:
+        # the whole group is gone
+        pass
+
+
+class LocalExecutorSettings(BaseSettings):
+    @property
+    def session(self):
+        return self.data.get('session', False)
+
+    @property
+    def timeout(self):
+        """
+        :return: default timeout of commands in seconds or None
+        """
+        return self.data.get('timeout', None)
+
 
 class LocalExecutor(Executor):
     provider_name = 'local'
+    settings_class = LocalExecutorSettings
 
-    def execute_command(self, command):
-        logger.debug("Execute command: '{command}'".format(command=command))
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._session = None
 
-        outtempfd, outtemppath = mkstemp()
-        errtempfd, errtemppath = mkstemp()
-
-        with fdopen(outtempfd, 'w+b') as outfile,\
-            open(outtemppath, 'r+b') as outfileread,\
-            fdopen(errtempfd, 'w+b') as errfile,\
-            open(errtemppath, 'r+b') as errfileread:
-            process = Popen(str(command), stdout=outfile, stderr=errfile, stdin=PIPE, shell=True)
-
-            if command.writein:
-                # write writein to stdin
-                process.stdin.write(command.writein.encode())
-                process.stdin.flush()
-            process.stdin.close()
-
-            output_reader = OutputReader(
-                outfileread,
-                errfileread,
-                logger=command.output_logger
-            )
+    @property
+    def session(self):
+        if self._session is None:
+            self._session = ShellSession()
+        return self._session
 
-            # wait for exit code
-            exit_code = process.wait()
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+            self._session = None
 
-            # flush data
-            outfile.flush()
-            errfile.flush()
+    def _timeout(self, command):
+        return self.settings.timeout if command.timeout is None else command.timeout
 
-            output, error = output_reader.output()
+    def _lines(self, command):
+        logger.debug("Execute command: '{command}'".format(command=command))
+
+        # command executed while output of another one is streamed from the session gets its own process
+        if self.settings.session and not self.session.streaming():
+            return self.session.lines(command, timeout=self._timeout(command))
+        else:
+            return self._process_lines(command)
+
+    def execute_command(self, command):
+        output, error = [], []
+        lines = self._lines(command)
+        while True:
+            try:
+                stream, line = next(lines)
+            except StopIteration as e:
+                exit_code = e.value
+                break
+            except TimeoutExpired as e:
+                raise CommandTimeoutError(command, e.timeout, '\n'.join(error), '\n'.join(output)) from None
+            (output if stream == OUTPUT else error).append(line)
 
-        remove(outtemppath)
-        remove(errtemppath)
+        output = '\n'.join(output)
+        error = '\n'.join(error)
 
         if exit_code:
             raise CommandError(command, exit_code, error, output)
         return output
 
+    def execute_command_stream(self, command):
+        error = deque(maxlen=self.output_tail)
+        lines = self._lines(command)
+        while True:
+            try:
+                stream, line = next(lines)
+            except StopIteration as e:
+                return e.value, '\n'.join(error)
+            except TimeoutExpired as e:
+                raise CommandTimeoutError(command, e.timeout, '\n'.join(error)) from None
+
+            if stream == OUTPUT:
+                yield line
+            else:
+                error.append(line)
+
+    def _popen(self, command):
+        # every command runs in its own process group, so all its processes could be killed at once
+        local_context = command.local_context()
+        if local_context is None:
+            return Popen(str(command), stdout=PIPE, stderr=PIPE, stdin=PIPE, shell=True, start_new_session=True)
+
+        # fast path - directories and environment are passed to the process directly
+        cwd, env = local_context
+        if command.argv:
+            return Popen(
+                command.argv, stdout=PIPE, stderr=PIPE, stdin=PIPE, cwd=cwd, env=env, start_new_session=True
+            )
+        return Popen(
+            command.base, stdout=PIPE, stderr=PIPE, stdin=PIPE, shell=True, cwd=cwd, env=env, start_new_session=True
+        )
+
+    @staticmethod
+    def _slot(command, default_priority):
+        if governor.governor is None:
+            return nullcontext()
+        return governor.governor.slot(command, default_priority=default_priority)
+
+    def _process_lines(self, command):
+        # queries are answered before provisioning waiting for the same program
+        default_priority = governor.PRIORITY_INTERACTIVE if command.idempotent else governor.PRIORITY_NORMAL
+        with self._slot(command, default_priority):
+            return (yield from self._spawned_lines(command))
+
+    def _spawned_lines(self, command):
+        timeout = self._timeout(command)
+        deadline = None if timeout is None else monotonic() + timeout
+        process = self._popen(command)
+
+        output_reader = OutputReader(
+            process.stdout,
+            process.stderr,
+            stdin=process.stdin,
+            writein=command.writein,
+            logger=command.output_logger,
+            timeout=timeout,
+            process=process
+        )
+        try:
+            yield from output_reader.lines()
+        finally:
+            # iteration could be abandoned or timed out
+            if not output_reader.finished:
+                kill_process_group(process)
+            if not process.stdin.closed:
+                process.stdin.close()
+            process.stdout.close()
+            process.stderr.close()
+
+        # wait for exit code, the command could close its output before it finishes
+        try:
+            return process.wait(None if deadline is None else max(deadline - monotonic(), 0))
+        except TimeoutExpired:
+            kill_process_group(process)
+            raise TimeoutExpired(command, timeout) from None
+
+    @staticmethod
+    def _read_error(stderr, error):
+        for line in iter(stderr.readline, b''):
+            error.append(line.decode('utf-8', errors='replace').rstrip('\n'))
+
+    @contextmanager
+    def pipe_command(self, command):
+        logger.debug("Pipe command: '{command}'".format(command=command))
+
+        with self._slot(command, governor.PRIORITY_BULK):
+            with self._pipe(command) as process:
+                yield process
+
+    @contextmanager
+    def _pipe(self, command):
+        process = self._popen(command)
+        # error is read concurrently, so the command is never blocked by full stderr pipe
+        error = deque(maxlen=self.output_tail)
+        error_reader = Thread(target=self._read_error, args=(process.stderr, error), daemon=True)
+        error_reader.start()
+
+        discarded = False
+        failure = None
+        try:
+            yield process
+            if not process.stdin.closed:
+                process.stdin.close()
+            if process.stdout.closed or process.stdout.read(1):
+                discarded = True
+                kill_process_group(process)
+        except Exception as e:
+            # the command could have failed before (ie. it stopped reading its input or it produced no output),
+            # then its failure is the reason
+            failure = e
+            try:
+                process.wait(timeout=PIPE_FAILURE_TIMEOUT)
+            except TimeoutExpired:
+                kill_process_group(process)
+        except BaseException:
+            kill_process_group(process)
+            raise
+        finally:
+            for stream in (process.stdin, process.stdout):
+                try:
+                    stream.close()
+                except BrokenPipeError:
+                    pass
+            exit_code = process.wait()
+            error_reader.join()
+            process.stderr.close()
+
+        if exit_code > 0 and not discarded:
+            raise CommandError(command, exit_code, '\n'.join(error)) from failure
+        elif failure is not None:
+            raise failure
+
     def send_file(self, source, target):
         if source == target:
             return
@@ -68,55 +249,303 @@ class LocalExecutor(Executor):
             yield fo
 
 
-class OutputReader(object):
-    thread_pool = ThreadPool(processes=2)
+class LineBuffer(object):
+    """
+    Splits chunks of bytes read from a pipe into decoded lines.
+    """
+    def __init__(self):
+        self._pending = b''
 
-    def __init__(self, stdout, stderr, logger=None):
-        self._stdout_output = []
-        self._stderr_output = []
+    def feed(self, data):
+        """
+        :param data: chunk of bytes
+        :return: list of complete lines found in all chunks fed so far
+        """
+        self._pending += data
+        *lines, self._pending = self._pending.split(b'\n')
+        return [line.decode('utf-8') for line in lines]
 
-        self.terminated = False
+    def flush(self):
+        pending, self._pending = self._pending, b''
+        if pending:
+            return [pending.decode('utf-8')]
+        return []
 
-        self._stdout_reader = self.thread_pool.apply_async(
-            self._reader,
-            args=(stdout,),
-            kwds=dict(logger=logger)
-        )
 
-        self._stderr_reader = self.thread_pool.apply_async(
-            self._reader,
-            args=(stderr,)
-        )
-
-    def _reader(self, output, logger=None):
-        output_lines = []
-        while True:
-            try:
-                if self.terminated:
-                    output.flush()
-
-                lines = output.readlines()
-            except ValueError:  # closed file
-                break
-
-            if not lines:
-                if self.terminated:
-                    break
-
-                sleep(0.1)
-                continue
-
-            for line in lines:
-                output_line = line.decode('utf-8').rstrip('\n')
-                output_lines.append(output_line)
-                if logger:
-                    logger.debug(output_line)
-
-        return '\n'.join(output_lines)
+class OutputReader(object):
+    """
+    Reads stdout and stderr of a process straight from its pipes and feeds its stdin with writein.
+
+    Lines are passed to the logger as soon as they arrive. If token is set, reading stops at sentinel lines
+    starting with the token (instead of at the end of streams) and the exit code is parsed from stdout sentinel.
+    If process is set, reading stops when the process has exited and its buffered output is read (a background
+    child of the process could hold the streams open much longer).
+    """
+    def __init__(self, stdout, stderr, stdin=None, writein=None, logger=None, token=None, timeout=None,
+                 process=None):
+        self.stdout = stdout
+        self.stderr = stderr
+        self.stdin = stdin
+        self.writein = writein.encode() if writein else b''
+        self.logger = logger
+        self.token = token
+        self.timeout = timeout
+        self.process = process
+        self.exit_code = None
+        self.finished = False
+        self._buffers = {
+            stdout: LineBuffer(),
+            stderr: LineBuffer()
+        }
+        # empty lines are held back - the last one before the sentinel belongs to the frame
+        self._held_empty = {stdout: 0, stderr: 0}
+
+    def _write(self, selector):
+        try:
+            written = write(self.stdin.fileno(), self.writein[:PIPE_CHUNK_SIZE])
+        except BrokenPipeError:
+            written = len(self.writein)
+        self.writein = self.writein[written:]
+        if not self.writein:
+            selector.unregister(self.stdin)
+            self.stdin.close()
+
+    def _read(self, stream):
+        """
+        :return: lines read from stream and False if there is nothing more to read from stream
+        :rtype: tuple
+        """
+        return self._split(stream, read(stream.fileno(), PIPE_CHUNK_SIZE))
+
+    def _split(self, stream, data):
+        """
+        :param data: chunk of bytes read from stream, empty at the end of stream
+        """
+        line_buffer = self._buffers[stream]
+        lines = []
+
+        for line in line_buffer.feed(data) if data else line_buffer.flush():
+            if self.token and line.startswith(self.token):
+                if stream is self.stdout:
+                    self.exit_code = int(line[len(self.token):])
+                lines.extend([''] * (self._held_empty[stream] - 1))
+                self._held_empty[stream] = 0
+                return lines, False
+            elif not line:
+                self._held_empty[stream] += 1
+            else:
+                lines.extend([''] * self._held_empty[stream])
+                self._held_empty[stream] = 0
+                lines.append(line)
+
+        if not data:
+            lines.extend([''] * self._held_empty[stream])
+            return lines, False
+        return lines, True
+
+    def lines(self):
+        """
+        Generator of lines of stdout and stderr in order of their arrival.
+
+        TimeoutExpired is raised (after pending incomplete lines) if streams are not finished in timeout.
+
+        :return: tuples (OUTPUT or ERROR, line)
+        """
+        deadline = None if self.timeout is None else monotonic() + self.timeout
+        with DefaultSelector() as selector:
+            active = {self.stdout, self.stderr}
+            for stream in active:
+                selector.register(stream, EVENT_READ)
+
+            if self.stdin is not None:
+                if self.writein:
+                    set_blocking(self.stdin.fileno(), False)
+                    selector.register(self.stdin, EVENT_WRITE)
+                else:
+                    self.stdin.close()
+
+            exited = False
+            while active:
+                if deadline is None:
+                    remaining = None
+                else:
+                    remaining = deadline - monotonic()
+                    if remaining <= 0:
+                        yield from self._flush()
+                        raise TimeoutExpired(None, self.timeout)
+
+                if exited:
+                    # only output which is already buffered is read
+                    remaining = 0
+                elif self.process is not None:
+                    remaining = EXIT_POLL_INTERVAL if remaining is None else min(remaining, EXIT_POLL_INTERVAL)
+                events = selector.select(remaining)
+
+                if not events and self.process is not None:
+                    if exited:
+                        # streams are held open by somebody else, they are finished as if they were closed
+                        for stream in active:
+                            yield from self._yield(stream, self._split(stream, b'')[0])
+                        break
+                    exited = self.process.poll() is not None
+
+                for key, _ in events:
+                    stream = key.fileobj
+                    if stream is self.stdin:
+                        self._write(selector)
+                        continue
+
+                    lines, readable = self._read(stream)
+                    yield from self._yield(stream, lines)
+
+                    if not readable:
+                        selector.unregister(stream)
+                        active.discard(stream)
+
+            if self.stdin is not None and not self.stdin.closed:
+                selector.unregister(self.stdin)
+                self.stdin.close()
+
+        self.finished = True
+
+    def _yield(self, stream, lines):
+        for line in lines:
+            if stream is self.stdout:
+                if self.logger:
+                    self.logger.debug(line)
+                yield OUTPUT, line
+            else:
+                yield ERROR, line
+
+    def _flush(self):
+        for stream, kind in ((self.stdout, OUTPUT), (self.stderr, ERROR)):
+            for line in self._buffers[stream].flush():
+                yield kind, line
 
     def output(self):
-        self.terminated = True
-        return self._stdout_reader.get(), self._stderr_reader.get()
-
-
+        """
+        :return: output and error
+        :rtype: tuple
+        """
+        output, error = [], []
+        for stream, line in self.lines():
+            (output if stream == OUTPUT else error).append(line)
+        return '\n'.join(output), '\n'.join(error)
+
+
+class ShellSession(object):
+    """
+    Long-lived shell process which executes commands one after another.
+
+    Every command runs in its own subshell (so 'cd', 'export' or 'exit' do not leak into following commands)
+    and is framed by sentinels printed to stdout (with the exit code) and to stderr.
+    """
+    shell = '/bin/sh'
+
+    def __init__(self):
+        self._process = None
+        self._lock = Lock()
+        # thread iterating output of a command, the lock is held across yields
+        self._owner = None
+
+    def streaming(self):
+        """
+        :return: True if the current thread is iterating output of a command of this session
+        """
+        return self._owner == get_ident()
+
+    def _start(self):
+        self._process = Popen([self.shell], stdin=PIPE, stdout=PIPE, stderr=PIPE, start_new_session=True)
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+    def _close(self, kill=False):
+        if self._process is None:
+            return
+        if kill:
+            kill_process_group(self._process)
+        try:
+            self._process.stdin.close()
+        except BrokenPipeError:
+            pass
+        self._process.wait()
+        self._process.stdout.close()
+        self._process.stderr.close()
+        self._process = None
+
+    def _frame(self, command, token):
+        if command.writein:
+            stdin = 'printf %s {writein} | '.format(writein=quote(command.writein))
+            redirect = ''
+        else:
+            stdin = ''
+            redirect = ' < /dev/null'
+
+        return (
+            '{stdin}( eval {command}\n){redirect}\n'
+            "printf '\\n{token} %d\\n' $?\n"
+            "printf '\\n{token}\\n' >&2\n"
+        ).format(
+            stdin=stdin,
+            command=quote(str(command)),
+            redirect=redirect,
+            token=token
+        )
 
+    def lines(self, command, timeout=None):
+        """
+        Generator of lines of stdout and stderr of command, see OutputReader.lines. The whole session is killed
+        if the command times out.
+
+        :param command: command to execute
+        :type command: codev.core.executor.Command
+        :param timeout: timeout in seconds
+        :return: exit code (as a value of StopIteration)
+        """
+        if self.streaming():
+            # the lock is not reentrant, so it would wait for itself
+            raise RuntimeError('Shell session is already streaming output of another command in this thread.')
+
+        with self._lock:
+            self._owner = get_ident()
+            try:
+                return (yield from self._locked_lines(command, timeout))
+            finally:
+                self._owner = None
+
+    def _locked_lines(self, command, timeout):
+        # called with the lock acquired
+        if self._process is None or self._process.poll() is not None:
+            self._start()
+
+        token = 'codev-{uuid}'.format(uuid=uuid4().hex)
+        try:
+            self._process.stdin.write(self._frame(command, token).encode())
+            self._process.stdin.flush()
+        except BrokenPipeError:
+            pass
+
+        output_reader = OutputReader(
+            self._process.stdout,
+            self._process.stderr,
+            logger=command.output_logger,
+            token=token,
+            timeout=timeout
+        )
+        try:
+            yield from output_reader.lines()
+        finally:
+            if not output_reader.finished:
+                # iteration has been abandoned, the rest of output is unknown
+                self._close(kill=True)
+
+        if output_reader.exit_code is None:
+            # shell has been terminated
+            self._process.wait()
+            exit_code = self._process.returncode or 1
+            self._close()
+            return exit_code
+
+        return output_reader.exit_code
@@ -0,0 +1,345 @@
+import atexit
+from collections import deque
+from contextlib import contextmanager
+from io import TextIOWrapper
+from logging import getLogger
+from os.path import expanduser
+from select import select
+from subprocess import TimeoutExpired
+from threading import BoundedSemaphore, Lock, Thread
+from time import monotonic
+
+try:
+    import paramiko
+except ImportError:
+    paramiko = None
+
+from codev.core.executor import CommandError
+
+from .local import ERROR, OUTPUT, PIPE_CHUNK_SIZE, PIPE_FAILURE_TIMEOUT, LineBuffer, LocalExecutor, \
+    LocalExecutorSettings
+
+logger = getLogger(__name__)
+
+# the longest time of waiting for data without checking the state of channel
+POLL_INTERVAL = 0.5
+
+HOST_KEY_POLICIES = ('reject', 'warning', 'auto_add')
+
+
+class ParamikoExecutorSettings(LocalExecutorSettings):
+    @property
+    def hostname(self):
+        return self.data.get('hostname', 'localhost')
+
+    @property
+    def port(self):
+        return self.data.get('port', 22)
+
+    @property
+    def username(self):
+        return self.data.get('username', None)
+
+    @property
+    def key_filename(self):
+        """
+        :return: private key, keys from ssh-agent and ~/.ssh are used otherwise
+        """
+        return self.data.get('key_filename', None)
+
+    @property
+    def host_key_policy(self):
+        """
+        :return: what to do with unknown host keys - 'reject', 'warning' or 'auto_add'
+        """
+        return self.data.get('host_key_policy', 'reject')
+
+    @property
+    def pool_size(self):
+        """
+        :return: maximal number of concurrently open channels (sshd allows 10 sessions per connection by default)
+        """
+        return self.data.get('pool_size', 10)
+
+    @property
+    def connect_timeout(self):
+        return self.data.get('connect_timeout', 60)
+
+
+class SSHConnection(object):
+    """
+    One SSH transport per destination shared by all commands, every command runs in its own channel.
+    """
+    def __init__(self, hostname, port, username, key_filename, host_key_policy, pool_size, connect_timeout):
+        if paramiko is None:
+            raise ValueError("Executor 'paramiko' requires 'paramiko' package.")
+        if host_key_policy not in HOST_KEY_POLICIES:
+            raise ValueError("Host key policy '{policy}' is not supported, use one of: {policies}.".format(
+                policy=host_key_policy, policies=', '.join(HOST_KEY_POLICIES)
+            ))
+
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.key_filename = key_filename
+        self.host_key_policy = host_key_policy
+        self.connect_timeout = connect_timeout
+        self._channels = BoundedSemaphore(pool_size)
+        self._client = None
+        self._sftp = None
+        self._lock = Lock()
+
+    def _connect(self):
+        logger.debug("Connect to '{hostname}:{port}'.".format(hostname=self.hostname, port=self.port))
+        client = paramiko.SSHClient()
+        client.load_system_host_keys()
+        client.set_missing_host_key_policy({
+            'reject': paramiko.RejectPolicy,
+            'warning': paramiko.WarningPolicy,
+            'auto_add': paramiko.AutoAddPolicy,
+        }[self.host_key_policy]())
+        client.connect(
+            self.hostname,
+            port=self.port,
+            username=self.username,
+            key_filename=self.key_filename,
+            timeout=self.connect_timeout,
+            auth_timeout=self.connect_timeout
+        )
+        client.get_transport().set_keepalive(30)
+        return client
+
+    def transport(self):
+        with self._lock:
+            if self._client is None or not self._client.get_transport().is_active():
+                self._close()
+                self._client = self._connect()
+            return self._client.get_transport()
+
+    @contextmanager
+    def channel(self, command):
+        """
+        Channel executing command, concurrent channels are limited by pool size.
+        """
+        with self._channels:
+            channel = self.transport().open_session(timeout=self.connect_timeout)
+            try:
+                channel.exec_command(str(command))
+                yield channel
+            finally:
+                channel.close()
+
+    def sftp(self):
+        transport = self.transport()
+        with self._lock:
+            if self._sftp is None or self._sftp.get_channel().get_transport() is not transport:
+                self._sftp = paramiko.SFTPClient.from_transport(transport)
+            return self._sftp
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+    def _close(self):
+        if self._sftp is not None:
+            self._sftp.close()
+            self._sftp = None
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+
+_connections = {}
+_connections_lock = Lock()
+
+
+def connection(settings):
+    """
+    :return: connection for the destination of settings
+    :rtype: SSHConnection
+    """
+    key = settings.username, settings.hostname, settings.port
+    with _connections_lock:
+        if key not in _connections:
+            if not _connections:
+                atexit.register(close_connections)
+            _connections[key] = SSHConnection(
+                settings.hostname,
+                settings.port,
+                settings.username,
+                settings.key_filename,
+                settings.host_key_policy,
+                settings.pool_size,
+                settings.connect_timeout
+            )
+        return _connections[key]
+
+
+def close_connections():
+    with _connections_lock:
+        for ssh_connection in _connections.values():
+            ssh_connection.close()
+        _connections.clear()
+
+
+class ChannelInput(object):
+    """
+    Binary stdin of channel, closing sends EOF.
+    """
+    def __init__(self, channel):
+        self.channel = channel
+        self.closed = False
+
+    def write(self, data):
+        self.channel.sendall(data)
+        return len(data)
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.channel.shutdown_write()
+
+
+class ChannelPipe(object):
+    """
+    Pipes of command executed in channel, the same interface as Popen has (see BareExecutor.pipe_command).
+    """
+    def __init__(self, channel):
+        self.stdin = ChannelInput(channel)
+        self.stdout = channel.makefile('rb')
+
+
+def _remote_path(remote_path):
+    # SFTP paths are relative to home directory
+    if remote_path == '~':
+        return '.'
+    return remote_path[2:] if remote_path.startswith('~/') else remote_path
+
+
+class ParamikoExecutor(LocalExecutor):
+    """
+    SSH executor in process (paramiko) - commands are executed in channels of one transport,
+    files are transferred by SFTP.
+    """
+    provider_name = 'paramiko'
+    settings_class = ParamikoExecutorSettings
+
+    @property
+    def connection(self):
+        return connection(self.settings)
+
+    def close(self):
+        self.connection.close()
+
+    @staticmethod
+    def _write(channel, writein):
+        try:
+            channel.sendall(writein.encode())
+            channel.shutdown_write()
+        except (OSError, EOFError):
+            # command does not read its input
+            pass
+
+    def _lines(self, command):
+        logger.debug("Execute command: '{command}'".format(command=command))
+
+        timeout = self._timeout(command)
+        deadline = None if timeout is None else monotonic() + timeout
+        buffers = {OUTPUT: LineBuffer(), ERROR: LineBuffer()}
+
+        with self.connection.channel(command) as channel:
+            if command.writein:
+                Thread(target=self._write, args=(channel, command.writein), daemon=True).start()
+            else:
+                channel.shutdown_write()
+
+            while True:
+                # all data are received before EOF
+                eof_received = channel.eof_received
+                received = False
+                for stream, ready, receive in (
+                        (OUTPUT, channel.recv_ready, channel.recv),
+                        (ERROR, channel.recv_stderr_ready, channel.recv_stderr)):
+                    if ready():
+                        received = True
+                        for line in buffers[stream].feed(receive(PIPE_CHUNK_SIZE)):
+                            if stream == OUTPUT and command.output_logger:
+                                command.output_logger.debug(line)
+                            yield stream, line
+
+                if received:
+                    continue
+                if eof_received:
+                    break
+
+                remaining = POLL_INTERVAL if deadline is None else min(deadline - monotonic(), POLL_INTERVAL)
+                if remaining <= 0:
+                    # remote processes get SIGHUP when the channel is closed (if sshd gives them a terminal)
+                    yield from self._flush(buffers)
+                    raise TimeoutExpired(None, timeout)
+                select([channel], [], [], remaining)
+
+            yield from self._flush(buffers)
+            remaining = None if deadline is None else max(deadline - monotonic(), 0)
+            if not channel.status_event.wait(remaining):
+                raise TimeoutExpired(None, timeout)
+            return channel.recv_exit_status()
+
+    @staticmethod
+    def _flush(buffers):
+        for stream in (OUTPUT, ERROR):
+            for line in buffers[stream].flush():
+                yield stream, line
+
+    @staticmethod
+    def _read_error(channel, error):
+        line_buffer = LineBuffer()
+        while True:
+            data = channel.recv_stderr(PIPE_CHUNK_SIZE)
+            error.extend(line_buffer.feed(data) if data else line_buffer.flush())
+            if not data:
+                return
+
+    @contextmanager
+    def pipe_command(self, command):
+        logger.debug("Pipe command: '{command}'".format(command=command))
+
+        with self.connection.channel(command) as channel:
+            error = deque(maxlen=self.output_tail)
+            error_reader = Thread(target=self._read_error, args=(channel, error), daemon=True)
+            error_reader.start()
+            pipe = ChannelPipe(channel)
+
+            discarded = False
+            failure = None
+            try:
+                yield pipe
+                pipe.stdin.close()
+                if pipe.stdout.read(1):
+                    discarded = True
+            except Exception as e:
+                failure = e
+            finally:
+                try:
+                    pipe.stdin.close()
+                except (OSError, EOFError):
+                    pass
+                finished = channel.status_event.wait(PIPE_FAILURE_TIMEOUT if discarded or failure else None)
+                # unfinished command is terminated by closing of the channel
+                exit_code = channel.recv_exit_status() if finished else None
+                if finished:
+                    error_reader.join()
+
+            if exit_code and exit_code > 0 and not discarded:
+                raise CommandError(command, exit_code, '\n'.join(error)) from failure
+            elif failure is not None:
+                raise failure
+
+    def send_file(self, source, target):
+        self.connection.sftp().put(expanduser(source), _remote_path(target))
+
+    @contextmanager
+    def open_file(self, remote_path):
+        with self.connection.sftp().open(_remote_path(remote_path), 'rb') as fo:
+            fo.prefetch()
+            yield TextIOWrapper(fo, encoding='utf-8')
@@ -1,10 +1,31 @@
-from codev.core.executor import Command
-from .local import LocalExecutor
-from codev.core.settings import BaseSettings
-from tempfile import NamedTemporaryFile
+import atexit
+from contextlib import contextmanager
+from logging import getLogger
+from os import remove
+from os.path import exists, expanduser, join
+from shlex import quote
+from shutil import rmtree
+from subprocess import DEVNULL, CalledProcessError, TimeoutExpired, call, check_call
+from tempfile import mkdtemp
+from threading import Lock
 
+from codev.core.executor import CommandError, CommandTimeoutError
 
-class SSHExecutorSettings(BaseSettings):
+from .local import LocalExecutor, LocalExecutorSettings
+
+logger = getLogger(__name__)
+
+# exit code of ssh if the connection fails
+SSH_ERROR_EXIT_CODE = 255
+
+# timeout of ssh control commands (check, exit) in seconds
+CONTROL_TIMEOUT = 10
+
+# timeout of starting of master connection (including authentication) in seconds
+CONNECT_TIMEOUT = 60
+
+
+class SSHExecutorSettings(LocalExecutorSettings):
     @property
     def hostname(self):
         return self.data.get('hostname', 'localhost')
@@ -17,47 +38,207 @@ class SSHExecutorSettings(BaseSettings):
     def username(self):
         return self.data.get('username', None)
 
+    @property
+    def multiplexing(self):
+        """
+        :return: commands share one connection (ControlMaster)
+        """
+        return self.data.get('multiplexing', True)
+
+    @property
+    def control_persist(self):
+        """
+        :return: seconds for which the idle master connection is kept
+        """
+        return self.data.get('control_persist', 600)
+
     # @property
     # def password(self):
     #     return self.data.get('password', None)
 
 
+class ControlMaster(object):
+    """
+    Master connection (ssh ControlMaster) shared by all ssh processes connecting to the same destination.
+
+    It is started lazily by the first command, it is closed at exit.
+    """
+    _directory = None
+
+    def __init__(self, username, hostname, port, control_persist):
+        self.destination = '{username}@{hostname}'.format(username=username, hostname=hostname)
+        self.port = port
+        self.control_persist = control_persist
+        self.path = join(self.directory(), '{destination}:{port}'.format(destination=self.destination, port=port))
+        self.disabled = False
+        self._lock = Lock()
+
+    @classmethod
+    def directory(cls):
+        # sockets are private, ssh refuses too long paths, so it is a short temporary directory
+        if cls._directory is None:
+            cls._directory = mkdtemp(prefix='codev-ssh-')
+        return cls._directory
+
+    @property
+    def options(self):
+        return '-o ControlPath={path} -o ControlMaster=no'.format(path=quote(self.path))
+
+    def _control(self, operation):
+        return call(
+            ['ssh', '-o', 'ControlPath={path}'.format(path=self.path), '-O', operation, '-p', str(self.port),
+             self.destination],
+            stdin=DEVNULL, stdout=DEVNULL, stderr=DEVNULL, timeout=CONTROL_TIMEOUT
+        )
+
+    def ensure(self):
+        """
+        Start master connection if it is not running.
+
+        :return: True if the master connection could be used
+        """
+        if self.disabled:
+            return False
+        if exists(self.path):
+            return True
+
+        with self._lock:
+            if not exists(self.path) and not self.disabled:
+                self.start()
+        return not self.disabled
+
+    def start(self):
+        logger.debug("Start master connection to '{destination}'.".format(destination=self.destination))
+        try:
+            check_call(
+                [
+                    'ssh', '-A', '-M', '-N', '-f',
+                    '-o', 'ControlPath={path}'.format(path=self.path),
+                    '-o', 'ControlPersist={persist}'.format(persist=self.control_persist),
+                    '-p', str(self.port), self.destination
+                ],
+                stdin=DEVNULL, stdout=DEVNULL, stderr=DEVNULL, timeout=CONNECT_TIMEOUT
+            )
+        except (CalledProcessError, TimeoutExpired, OSError) as e:
+            # commands connect on their own
+            logger.warning("Master connection to '{destination}' failed: {error}".format(
+                destination=self.destination, error=e
+            ))
+            self.disabled = True
+
+    def check(self):
+        """
+        Health check of the master connection, stale socket is removed (the next command starts a new master).
+
+        :return: True if the master connection is alive
+        """
+        try:
+            alive = self._control('check') == 0
+        except TimeoutExpired:
+            alive = False
+
+        if not alive and exists(self.path):
+            logger.debug("Master connection to '{destination}' is dead.".format(destination=self.destination))
+            try:
+                remove(self.path)
+            except FileNotFoundError:
+                pass
+        return alive
+
+    def close(self):
+        if exists(self.path):
+            try:
+                self._control('exit')
+            except TimeoutExpired:
+                pass
+
+
+_control_masters = {}
+_control_masters_lock = Lock()
+
+
+def control_master(username, hostname, port, control_persist):
+    """
+    :return: master connection for the destination
+    :rtype: ControlMaster
+    """
+    key = username, hostname, port
+    with _control_masters_lock:
+        if key not in _control_masters:
+            if not _control_masters:
+                atexit.register(close_control_masters)
+            _control_masters[key] = ControlMaster(username, hostname, port, control_persist)
+        return _control_masters[key]
+
+
+def close_control_masters():
+    with _control_masters_lock:
+        for master in _control_masters.values():
+            master.close()
+        _control_masters.clear()
+        if ControlMaster._directory is not None:
+            rmtree(ControlMaster._directory, ignore_errors=True)
+            ControlMaster._directory = None
+
+
 class SSHExecutor(LocalExecutor):
     provider_name = 'ssh'
     settings_class = SSHExecutorSettings
 
-    def execute_command(self, command):
-        command = command.wrap(
-            'ssh -A {username}@{hostname} -p {port} -- {{command}}'.format(
+    @property
+    def control_master(self):
+        if not self.settings.multiplexing:
+            return None
+        return control_master(
+            self.settings.username, self.settings.hostname, self.settings.port, self.settings.control_persist
+        )
+
+    def _ssh_command(self, command):
+        master = self.control_master
+        return command.wrap(
+            'ssh -A {options}{username}@{hostname} -p {port} -- {{quoted_command}}'.format(
+                options=master.options + ' ' if master is not None and master.ensure() else '',
+                username=self.settings.username,
+                hostname=self.settings.hostname,
+                port=self.settings.port
+            ),
+            simple=True,
+            # the master connection is an option of the command, the host is the same
+            target='ssh {username}@{hostname} -p {port}'.format(
                 username=self.settings.username,
                 hostname=self.settings.hostname,
                 port=self.settings.port
             )
         )
-        super().execute_command(command)
 
-    def send_file(self, source, target):
-        command = Command('scp -p {port} {source} {username}@{hostname}:{target}'.format(
-            username=self.settings.username,
-            hostname=self.settings.hostname,
-            port=self.settings.port,
-            source=source,
-            target=target
-        ))
+    def _check_connection(self, error):
+        # remote command could exit with the same code, so the master connection is only checked
+        if error.exit_code == SSH_ERROR_EXIT_CODE and not isinstance(error, CommandTimeoutError):
+            master = self.control_master
+            if master is not None:
+                master.check()
+
+    def execute_command(self, command):
+        try:
+            return super().execute_command(self._ssh_command(command))
+        except CommandError as e:
+            self._check_connection(e)
+            raise
+
+    def execute_command_stream(self, command):
+        exit_code, error = yield from super().execute_command_stream(self._ssh_command(command))
+        if exit_code == SSH_ERROR_EXIT_CODE:
+            self._check_connection(CommandError(command, exit_code, error))
+        return exit_code, error
+
+    def pipe_command(self, command):
+        return super().pipe_command(self._ssh_command(command))
 
-        super().execute_command(command)
+    def send_file(self, source, target):
+        with open(expanduser(source), 'rb') as source_file:
+            self.send_stream(source_file, target)
 
+    @contextmanager
     def open_file(self, remote_path):
-        with NamedTemporaryFile() as fo:
-            command = Command(
-                'scp -p {port} {username}@{hostname}:{remote_path} {target} '.format(
-                    username=self.settings.username,
-                    hostname=self.settings.hostname,
-                    port=self.settings.port,
-                    remote_path=remote_path,
-                    target=fo.name
-                )
-            )
-            super().execute_command(command)
+        with self.open_stream(remote_path, binary=False) as fo:
             yield fo
-
@@ -1,10 +1,10 @@
-from uuid import uuid1
-
 import re
+from collections import OrderedDict
 from time import sleep
 from contextlib import contextmanager
 from logging import getLogger
 from os import path
+from shlex import quote
 
 from codev.core.settings import BaseSettings
 from codev.core.machines import MachinesProvider, BaseMachine
@@ -12,6 +12,17 @@ from codev.core.executor import BackgroundExecutor, CommandError, CommandError
 
 logger = getLogger(__name__)
 
+# environment of commands executed in container
+LXC_ENV = OrderedDict((
+    ('HOME', '/root'),
+    ('LANG', 'C.UTF-8'),
+    ('LC_ALL', 'C.UTF-8'),
+))
+
+# PATH of commands executed by 'lxc-attach'
+LXC_PATH = '/usr/local/sbin:/usr/local/bin:/usr/sbin:/usr/bin:/sbin:/bin'
+
+
 class LXCBaseMachine(BaseMachine):
     def exists(self):
         try:
@@ -108,7 +119,7 @@ class LXCMachine(LXCBaseMachine):
         ))
 
     def _get_architecture(self):
-        architecture = self.executor.execute('uname -m')
+        architecture = self.executor.execute('uname -m', idempotent=True)
         if architecture == 'x86_64':
             architecture = 'amd64'
         return architecture
@@ -124,7 +135,7 @@ class LXCMachine(LXCBaseMachine):
 
         if ip:
             template_dir = 'static'
-            self.executor.send_file(
+            self.executor.send_file_cached(
                 '{directory}/templates/{template_dir}/network_interfaces'.format(
                     directory=path.dirname(__file__),
                     template_dir=template_dir
@@ -226,55 +237,56 @@ class LXCMachine(LXCBaseMachine):
                     sleep(3)
         return self.__gateway
 
+    def _sanitize_path(self, remote_path):
+        # files are accessed through root of container, relative paths are relative to current directory
+        remote_path = path.join(*self.directories, remote_path)
+        if remote_path == '~' or remote_path.startswith('~/'):
+            remote_path = LXC_ENV['HOME'] + remote_path[1:]
+        return path.normpath(path.join(LXC_ENV['HOME'], remote_path))
+
     @contextmanager
     def open_file(self, remote_path):
-        tempfile = '/tmp/codev.{ident}.tempfile'.format(ident=self.ident)
-
         remote_path = self._sanitize_path(remote_path)
 
-        self.executor.execute('lxc-usernsexec -- cp {container_root}{remote_path} {tempfile}'.format(
-            tempfile=tempfile,
-            remote_path=remote_path,
-            container_root=self.container_root
-        ))
-        try:
-            with self.executor.open_file(tempfile) as fo:
-                yield fo
-        finally:
-            self.executor.execute('lxc-usernsexec -- rm {tempfile}'.format(tempfile=tempfile))
+        with self.executor.read_command(
+            'lxc-usernsexec -- cat {container_root}{remote_path}'.format(
+                remote_path=remote_path,
+                container_root=self.container_root
+            ),
+            binary=False
+        ) as fo:
+            yield fo
 
     def send_file(self, source, target):
-        tempfile = '/tmp/{filename}.tmp'.format(filename=uuid1())
-        self.executor.send_file(source, tempfile)
         target = self._sanitize_path(target)
 
-        self.executor.execute('lxc-usernsexec -- cp {tempfile} {container_root}{target}'.format(
-            tempfile=tempfile,
-            target=target,
-            container_root=self.container_root
-        ))
-        self.executor.execute('rm {tempfile}'.format(tempfile=tempfile))
-
-    def execute(self, command, env=None, logger=None, writein=None):
-        if env is None:
-            env = {}
-        env.update({
-            'HOME': '/root',
-            'LANG': 'C.UTF-8',
-            'LC_ALL':  'C.UTF-8'
-        })
-
-        with self.executor.change_directory(self.working_dir):
-            return self.executor.execute_wrapper(
-                'lxc-attach {env} -n {container_name} -- {{command}}'.format(
-                    container_name=self.ident,
-                    env=' '.join('-v {var}={value}'.format(var=var, value=value) for var, value in env.items())
+        with open(path.expanduser(source), 'rb') as source_file:
+            self.executor.write_command(
+                'lxc-usernsexec -- tee {container_root}{target} > /dev/null'.format(
+                    target=target,
+                    container_root=self.container_root
                 ),
-                command,
-                logger=logger,
-                writein=writein
+                source_file
             )
 
+    def wrap_command(self, command):
+        # environment and virtualenv are set up by 'lxc-attach', it has no option for working directory
+        command, cwd, env = command.split_context(home=LXC_ENV['HOME'], path=LXC_PATH)
+        if cwd:
+            command = command.change_directory(quote(cwd))
+        command = command.wrap(
+            'lxc-attach {env} -n {container_name} -- {{command}}'.format(
+                container_name=self.ident,
+                env=' '.join(
+                    '-v {name}={value}'.format(name=name, value=quote(value))
+                    for name, value in OrderedDict(LXC_ENV, **env).items()
+                ).replace('{', '{{').replace('}', '}}')
+            ),
+            simple=True,
+            target='lxc-attach -n {container_name}'.format(container_name=self.ident)
+        )
+        return super().wrap_command(command)
+
     def share(self, source, target, bidirectional=False):
         share_target = '{share_directory}/{target}'.format(
             share_directory=self.share_directory,
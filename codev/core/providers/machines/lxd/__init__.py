@@ -1,9 +1,11 @@
 import json
 import re
+from collections import OrderedDict
 from time import sleep
 from contextlib import contextmanager
 from logging import getLogger
 from os import path
+from shlex import quote
 
 from codev.core.settings import BaseSettings
 from codev.core.machines import BaseMachine, Machine
@@ -11,21 +13,58 @@ from codev.core.executor import BackgroundExecutor, CommandError
 
 logger = getLogger(__name__)
 
+# environment of commands executed in container
+LXD_ENV = OrderedDict((
+    ('HOME', '/root'),
+    ('LANG', 'C.UTF-8'),
+    ('LC_ALL', 'C.UTF-8'),
+))
+
+# PATH of commands executed by 'lxc exec'
+LXD_PATH = '/usr/local/sbin:/usr/local/bin:/usr/sbin:/usr/bin:/sbin:/bin'
+
 
 class LXDBaseMachine(BaseMachine):
     @property
     def _container_name(self):
         return self.ident.as_file()
 
+    def _sanitize_path(self, remote_path):
+        # 'lxc file' requires absolute paths, relative ones are relative to current directory
+        remote_path = path.join(*self.directories, remote_path)
+        if remote_path == '~' or remote_path.startswith('~/'):
+            remote_path = LXD_ENV['HOME'] + remote_path[1:]
+        return path.normpath(path.join(LXD_ENV['HOME'], remote_path))
+
+    def wrap_command(self, command):
+        # directories, environment and virtualenv are set up by 'lxc exec', so no shell is needed for them
+        command, cwd, env = command.split_context(home=LXD_ENV['HOME'], path=LXD_PATH)
+        options = ['--cwd {cwd}'.format(cwd=quote(cwd))] if cwd else []
+        options.extend(
+            '--env {name}={value}'.format(name=name, value=quote(value))
+            for name, value in OrderedDict(LXD_ENV, **env).items()
+        )
+        command = command.wrap(
+            'lxc exec {options} {container_name} -- {{command}}'.format(
+                options=' '.join(options).replace('{', '{{').replace('}', '}}'),
+                container_name=self._container_name
+            ),
+            simple=True,
+            target='lxc exec {container_name}'.format(container_name=self._container_name)
+        )
+        return super().wrap_command(command)
+
     def exists(self):
         output = self.executor.execute(
             'lxc list -cn --format=json ^{container_name}$'.format(
                 container_name=self._container_name
-            )
+            ),
+            idempotent=True
         )
         return bool(json.loads(output))
 
     def is_started(self):
+        # polled by _wait_for_start, so it is never cached
         output = self.executor.execute(
             'lxc info {container_name}'.format(
                 container_name=self._container_name
@@ -49,6 +88,31 @@ class LXDBaseMachine(BaseMachine):
         else:
             raise ValueError('Bad state: {}'.format(state))
 
+    @contextmanager
+    def open_file(self, remote_path):
+        remote_path = self._sanitize_path(remote_path)
+        # file is streamed to stdout of 'lxc file pull'
+        with self.executor.read_command(
+            'lxc file pull {container_name}/{remote_path} -'.format(
+                container_name=self._container_name,
+                remote_path=remote_path
+            ),
+            binary=False
+        ) as fo:
+            yield fo
+
+    def send_file(self, source, target):
+        target = self._sanitize_path(target)
+        # file is streamed from stdin of 'lxc file push'
+        with open(path.expanduser(source), 'rb') as source_file:
+            self.executor.write_command(
+                'lxc file push --uid=0 --gid=0 - {container_name}/{target}'.format(
+                    container_name=self._container_name,
+                    target=target
+                ),
+                source_file
+            )
+
     def _wait_for_start(self):
         while not self.is_started():
             sleep(0.5)
@@ -194,8 +258,9 @@ class LXDMachine(LXDBaseMachine):
 
     @property
     def ip(self):
+        # polled by is_started, so it is never cached
         output = self.executor.execute('lxc info {container_name}'.format(
-            container_name=self.container_name,
+            container_name=self._container_name,
         ))
         for line in output.splitlines():
             r = re.match('^\s+eth0:\s+inet\s+([0-9\.]+)\s+\w+$', line)
@@ -220,54 +285,6 @@ class LXDMachine(LXDBaseMachine):
                     sleep(3)
         return self.__gateway
 
-    @contextmanager
-    def open_file(self, remote_path):
-        tempfile = '/tmp/codev.{container_name}.tempfile'.format(container_name=self.container_name)
-        remote_path = self._sanitize_path(remote_path)
-        self.executor.execute(
-            'lxc file pull {container_name}/{remote_path} {tempfile}'.format(
-                container_name=self.container_name,
-                remote_path=remote_path,
-                tempfile=tempfile
-            )
-        )
-        try:
-            with self.executor.open_file(tempfile) as fo:
-                yield fo
-        finally:
-            self.executor.execute('rm {tempfile}'.format(tempfile=tempfile))
-
-    def send_file(self, source, target):
-        target = self._sanitize_path(target)
-
-        self.executor.execute(
-            'lxc file push --uid=0 --gid=0 {source} {container_name}/{target}'.format(
-                source=source,
-                container_name=self.container_name,
-                target=target
-            )
-        )
-
-    def execute(self, command, env=None, logger=None, writein=None):
-        if env is None:
-            env = {}
-        env.update({
-            'HOME': '/root',
-            'LANG': 'C.UTF-8',
-            'LC_ALL':  'C.UTF-8'
-        })
-
-        with self.executor.change_directory(self.working_dir):
-            return self.executor.execute_wrapper(
-                'lxc exec {env} {container_name} -- {{command}}'.format(
-                    container_name=self.container_name,
-                    env=' '.join('--env {var}={value}'.format(var=var, value=value) for var, value in env.items())
-                ),
-                command,
-                logger=logger,
-                writein=writein
-            )
-
     def share(self, source, target, bidirectional=False):
         share_target = '{share_directory}/{target}'.format(
             share_directory=self.share_directory,
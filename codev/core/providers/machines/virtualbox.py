@@ -54,9 +54,10 @@ class VirtualboxBaseMachine(BaseMachine):
         return SSHExecutor(settings_data={'hostname': self._ip, 'username': 'root'})
 
     def exists(self):
-        return '"{vm_name}"'.format(vm_name=self.vm_name) in self.executor.execute('VBoxManage list vms').split()
+        return '"{vm_name}"'.format(vm_name=self.vm_name) in self.executor.execute('VBoxManage list vms', idempotent=True).split()
 
     def is_started(self):
+        # polled while the machine is installed, so it is never cached
         output = self.executor.execute("VBoxManage list runningvms")
         return bool(re.search('^\"{vm_name}\"\s+.*'.format(vm_name=self.vm_name), output, re.MULTILINE))
 
@@ -338,58 +339,51 @@ class VirtualboxBaseMachine(BaseMachine):
         return iface
 
     def _create_vm(self, ostype, hdd, memory, share, hostonly_iface):
-        # create VM
-        self.executor.execute(
+        hdd_dir = '.share/codev/virtualbox'
+        medium = '{hdd_dir}/{ident}.vdi'.format(
+            ident=self.ident.as_file(),
+            hdd_dir=hdd_dir
+        )
+
+        # all steps are sent at once, batch stops at the first failed step
+        self.executor.execute_many([
+            # create VM
             'VBoxManage createvm --name "{vm_name}" --ostype "{ostype}" --register'.format(
                 vm_name=self.vm_name, ostype=ostype
-            )
-        )
+            ),
 
-        # setup VM + ifaces
-        self.executor.execute(
+            # setup VM + ifaces
             'VBoxManage modifyvm "{vm_name}" --memory {memory} --acpi on --vram 16 --boot1 dvd --nic1 nat --nictype1 Am79C973 --nic2 hostonly --nictype2 Am79C970A --hostonlyadapter2 {hostonly_iface}'.format(
                 vm_name=self.vm_name,
                 memory=memory,
                 hostonly_iface=hostonly_iface
-            )
-        )
+            ),
 
-        hdd_dir = '.share/codev/virtualbox'
-        medium = '{hdd_dir}/{ident}.vdi'.format(
-            ident=self.ident.as_file(),
-            hdd_dir=hdd_dir
-        )
-        # create storage
-        self.executor.execute(
+            # create storage
+            # if error appears, delete {name}.vdi and "runvboxmanage closemedium disk {name}.vdi"
             'VBoxManage createhd --filename {medium} --size {hdd}'.format(
                 medium=medium, hdd=hdd
-            )
-        )
-        # if error appears, delete {name}.vdi and "runvboxmanage closemedium disk {name}.vdi"
+            ),
 
-        # create SATA
-        self.executor.execute('VBoxManage storagectl "{vm_name}" --name "SATA" --add sata --portcount 1'.format(vm_name=self.vm_name))
+            # create SATA
+            'VBoxManage storagectl "{vm_name}" --name "SATA" --add sata --portcount 1'.format(vm_name=self.vm_name),
 
-        # create IDE
-        self.executor.execute('VBoxManage storagectl "{vm_name}" --name "IDE" --add ide'.format(vm_name=self.vm_name))
+            # create IDE
+            'VBoxManage storagectl "{vm_name}" --name "IDE" --add ide'.format(vm_name=self.vm_name),
 
-        # attach storage to SATA
-        self.executor.execute(
+            # attach storage to SATA
             'VBoxManage storageattach "{vm_name}" --storagectl "SATA" --port 0 --device 0 --type hdd --medium {medium}'.format(
                 vm_name=self.vm_name,
                 medium=medium
-            )
-        )
-
-        #create shared points
-        for share_name, share_directory in share.items():
-            self.executor.execute(
-                'VBoxManage sharedfolder add "{vm_name}" --name "{share_name}" --hostpath "{share_directory}"'.format(
-                    vm_name=self.vm_name,
-                    share_name=share_name,
-                    share_directory=share_directory
-                )
-            )
+            ),
+        ] + [
+            # create shared points
+            'VBoxManage sharedfolder add "{vm_name}" --name "{share_name}" --hostpath "{share_directory}"'.format(
+                vm_name=self.vm_name,
+                share_name=share_name,
+                share_directory=share_directory
+            ) for share_name, share_directory in share.items()
+        ], check=True)
 
     def _install_vm(self, install_iso):
         # attach install iso
@@ -1,4 +1,5 @@
 from contextlib import contextmanager
+from os import path
 
 from codev.core.machines import BaseMachine
 from codev.core.settings import SettingsError, BaseSettings
@@ -10,18 +11,28 @@ class DirectoryBaseMachine(BaseMachine):
         return '~/.share/codev/virtualenv/{ident}/'.format(ident=self.ident.as_file())
 
     def exists(self):
-        return self.executor.exists_directory(self._get_base_dir())
+        return self.directories_exist()
+
+    def directories_exist(self, *directories):
+        """
+        Base directory and the directories in it are probed in one round trip.
+
+        :param directories: directories which have to exist in base directory too
+        """
+        base_dir = self._get_base_dir()
+        paths = [base_dir] + [path.join(base_dir, directory) for directory in directories]
+        return all(stat.type == 'directory' for stat in self.executor.stat_paths(paths).values())
 
     def create(self):
         self.executor.execute(
             'mkdir -p {}'.format(self._get_base_dir())
         )
 
-    def execute_command(self, command):
+    def wrap_command(self, command):
         command = command.change_directory(
             self._get_base_dir()
         )
-        return super().execute_command(command)
+        return super().wrap_command(command)
 
     @contextmanager
     def open_file(self, remote_path):
@@ -48,7 +59,7 @@ class VirtualenvBaseMachine(BaseMachine):
     executor_class_forward = ['ident']
 
     def exists(self):
-        return self.executor.exists() and self.executor.exists_directory('env')
+        return self.executor.directories_exist('env')
 
     def create(self):
         self.executor.create()
@@ -64,8 +75,6 @@ class VirtualenvBaseMachine(BaseMachine):
     def destroy(self):
         self.executor.execute('rm -rf env')
 
-    def execute_command(self, command):
-        command = command.wrap(
-            'source env/bin/activate && {command}'
-        )
-        return super().execute_command(command)
+    def wrap_command(self, command):
+        command = command.activate_virtualenv('env')
+        return super().wrap_command(command)
@@ -1,6 +1,3 @@
-import shutil
-from uuid import uuid1
-
 from codev.core.source import Source
 
 
@@ -8,19 +5,8 @@ class ActualSource(Source):
     provider_name = 'actual'
 
     def install(self, executor):
-        filename = uuid1()
-        archive = shutil.make_archive('/tmp/{filename}'.format(filename=filename), 'gztar')
-
-        remote_archive = '/tmp/{filename}.tar.gz'.format(filename=filename)
-
-        executor.send_file(archive, remote_archive)
-
-        # install gunzip
         # TODO requirements
         # executor.install_packages('gzip')
 
-        executor.execute(
-            'tar -xzf {archive}'.format(
-                archive=remote_archive
-            )
-        )
+        # actual directory is streamed straight into 'tar' of executor
+        executor.send_tree('.', '.')
@@ -1,3 +1,4 @@
+from codev.core.executor import Command, CommandError
 from codev.core.settings import BaseSettings
 from codev.core.source import Source
 
@@ -24,19 +25,33 @@ class GitSource(Source):
     settings_class = GitSourceSettings
 
     def parse_version(self, executor):
+        version = self.option
+
+        # independent queries in one round trip
+        queries = ['git remote', 'git branch -r', 'git tag']
+        if version:
+            queries.append('git log -F {commit} -n 1 --pretty=oneline'.format(commit=version))
+        queries = [Command(query, idempotent=True) for query in queries]
+
+        results = executor.execute_many(queries)
+
+        for query, result in zip(queries[:3], results):
+            if result.exit_code:
+                raise CommandError(query, result.exit_code, result.error, result.output)
+
+        remotes_result, branches_result, tags_result = results[:3]
+
         def find_branch(remote, branch):
-            branches = executor.execute('git branch -r').splitlines()
+            branches = branches_result.output.splitlines()
             return '{remote}/{branch}'.format(remote=remote, branch=branch) in branches
 
         def find_tag(tag):
-            return tag in executor.execute('git tag').splitlines()
+            return tag in tags_result.output.splitlines()
 
         def find_commit(commit):
-            return executor.check_execute('git log -F {commit} -n 1 --pretty=oneline'.format(commit=commit))
-
-        version = self.option
+            return not results[3].exit_code
 
-        remotes = executor.execute('git remote').splitlines()
+        remotes = remotes_result.output.splitlines()
 
         if self.settings.remote:
             if self.settings.remote not in remotes:
@@ -50,7 +65,7 @@ class GitSource(Source):
         if self.settings.url:
             self.repository_url = self.settings.url
         else:
-            self.repository_url = executor.execute('git remote get-url {remote}'.format(remote=remote))
+            self.repository_url = executor.execute('git remote get-url {remote}'.format(remote=remote), idempotent=True)
 
         branch, tag, commit = None, None, None
 
@@ -0,0 +1,329 @@
+import atexit
+import gzip
+import json
+import re
+from base64 import b64decode, b64encode
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from io import BufferedReader, BytesIO, RawIOBase, StringIO
+from logging import getLogger
+from threading import Lock
+from time import perf_counter, sleep
+
+from .executor import BareExecutor, CommandError, HasExecutor
+
+logger = getLogger(__name__)
+
+# random tokens (sentinels of batches, see CommandBatch, delimiters of background launchers) differ in every run
+TOKEN_PATTERN = re.compile(r'codev-[0-9a-f]{32}')
+TOKEN_PLACEHOLDER = 'codev-{token}'
+
+
+def open_trace(trace_path, mode='r'):
+    """
+    :param trace_path: trace is gzipped if the path ends with '.gz'
+    """
+    if trace_path.endswith('.gz'):
+        return gzip.open(trace_path, mode + 't', encoding='utf-8')
+    return open(trace_path, mode, encoding='utf-8')
+
+
+def _placeholder(index):
+    # the first placeholder is the same as in traces with one token per command
+    return TOKEN_PLACEHOLDER if index == 0 else 'codev-{{token{index}}}'.format(index=index)
+
+
+def _normalize(text):
+    """
+    :return: text with tokens replaced by placeholders and the tokens (in order of the first occurrence)
+    """
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text):
+        if token not in tokens:
+            tokens.append(token)
+    for index, token in enumerate(tokens):
+        text = text.replace(token, _placeholder(index))
+    return text, tokens
+
+
+def _hide_tokens(text, tokens):
+    for index, token in enumerate(tokens):
+        text = text.replace(token, _placeholder(index))
+    return text
+
+
+def _restore_tokens(text, tokens):
+    for index, token in enumerate(tokens):
+        text = text.replace(_placeholder(index), token)
+    return text
+
+
+class ReplayError(Exception):
+    pass
+
+
+class RecordedInput(object):
+    """
+    Binary stdin of piped command, only the size of written data is recorded.
+    """
+    def __init__(self, stdin):
+        self._stdin = stdin
+        self.size = 0
+
+    @property
+    def closed(self):
+        return self._stdin.closed
+
+    def write(self, data):
+        self.size += len(data)
+        return self._stdin.write(data)
+
+    def flush(self):
+        if hasattr(self._stdin, 'flush'):
+            self._stdin.flush()
+
+    def close(self):
+        self._stdin.close()
+
+
+class RecordedOutput(RawIOBase):
+    """
+    Binary stdout of piped command, all data read by the consumer are recorded.
+    """
+    def __init__(self, stdout):
+        super().__init__()
+        self._stdout = stdout
+        self.data = bytearray()
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        read = getattr(self._stdout, 'read1', self._stdout.read)
+        data = read(len(buffer))
+        buffer[:len(data)] = data
+        self.data.extend(data)
+        return len(data)
+
+
+class RecordedPipe(object):
+    def __init__(self, pipe):
+        self.stdin = RecordedInput(pipe.stdin)
+        self.output = RecordedOutput(pipe.stdout)
+        self.stdout = BufferedReader(self.output)
+
+
+class ReplayedInput(object):
+    """
+    Binary stdin of replayed piped command, data are discarded.
+    """
+    closed = False
+
+    def write(self, data):
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class ReplayedPipe(object):
+    def __init__(self, output):
+        self.stdin = ReplayedInput()
+        self.stdout = BytesIO(output)
+
+
+class RecordingExecutor(HasExecutor, BareExecutor):
+    """
+    Records every command (with its input, output, error, exit code and duration) executed by the executor
+    and every transferred file to JSON lines trace, see ReplayExecutor.
+    """
+    def __init__(self, *args, trace_path, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.trace_path = trace_path
+        self._trace = open_trace(trace_path, 'w')
+        self._lock = Lock()
+        atexit.register(self.close)
+
+    def _record(self, entry):
+        with self._lock:
+            if self._trace.closed:
+                return
+            self._trace.write(json.dumps(entry, separators=(',', ':')))
+            self._trace.write('\n')
+
+    def _record_command(self, command, start, exit_code, output, error):
+        command_str, tokens = _normalize(str(command))
+        output = _hide_tokens(output, tokens)
+        self._record(dict(
+            type='execute',
+            command=command_str,
+            writein=command.writein,
+            exit_code=exit_code,
+            output=output,
+            error=error,
+            duration=perf_counter() - start
+        ))
+
+    def execute_command(self, command):
+        start = perf_counter()
+        try:
+            output = self.executor.execute_command(command)
+        except CommandError as e:
+            self._record_command(command, start, e.exit_code, e.output or '', e.error or '')
+            raise
+        self._record_command(command, start, 0, output, '')
+        return output
+
+    def execute_command_stream(self, command):
+        start = perf_counter()
+        lines = []
+        stream = self.executor.execute_command_stream(command)
+        while True:
+            try:
+                line = next(stream)
+            except StopIteration as e:
+                exit_code, error = e.value
+                break
+            lines.append(line)
+            yield line
+
+        self._record_command(command, start, exit_code, '\n'.join(lines), error)
+        return exit_code, error
+
+    @contextmanager
+    def pipe_command(self, command):
+        # data read from the command are recorded, written data are not (only their size)
+        start = perf_counter()
+        pipe = None
+        exit_code, error = 0, ''
+        try:
+            with self.executor.pipe_command(command) as process:
+                pipe = RecordedPipe(process)
+                yield pipe
+        except CommandError as e:
+            exit_code, error = e.exit_code, e.error or ''
+            raise
+        finally:
+            self._record(dict(
+                type='pipe',
+                command=_normalize(str(command))[0],
+                input_size=pipe.stdin.size if pipe else 0,
+                output=b64encode(bytes(pipe.output.data) if pipe else b'').decode('ascii'),
+                exit_code=exit_code,
+                error=error,
+                duration=perf_counter() - start
+            ))
+
+    @contextmanager
+    def open_file(self, remote_path):
+        start = perf_counter()
+        with self.executor.open_file(remote_path) as fo:
+            content = fo.read()
+        self._record(dict(type='open_file', path=remote_path, content=content, duration=perf_counter() - start))
+        yield StringIO(content)
+
+    def send_file(self, source, target):
+        start = perf_counter()
+        result = self.executor.send_file(source, target)
+        self._record(dict(type='send_file', source=source, target=target, duration=perf_counter() - start))
+        return result
+
+    def close(self):
+        with self._lock:
+            self._trace.close()
+
+
+class ReplayExecutor(BareExecutor):
+    """
+    Serves responses recorded by RecordingExecutor without executing anything.
+
+    Responses of the same command are served in the recorded order. Commands are served at full speed
+    or with recorded durations divided by speed.
+    """
+    def __init__(self, *args, trace_path, speed=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.trace_path = trace_path
+        self.speed = speed
+        self._entries = defaultdict(deque)
+        self._lock = Lock()
+
+        with open_trace(trace_path) as trace:
+            for line in trace:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._entries[self._key(entry)].append(entry)
+
+    @staticmethod
+    def _key(entry):
+        if entry['type'] == 'execute':
+            return entry['type'], entry['command'], entry['writein']
+        elif entry['type'] == 'pipe':
+            return entry['type'], entry['command']
+        elif entry['type'] == 'open_file':
+            return entry['type'], entry['path']
+        else:
+            return entry['type'], entry['source'], entry['target']
+
+    def _replay(self, entry):
+        key = self._key(entry)
+        with self._lock:
+            try:
+                entry = self._entries[key].popleft()
+            except IndexError:
+                raise ReplayError("Entry {key} is not recorded in trace '{trace_path}'.".format(
+                    key=key, trace_path=self.trace_path
+                ))
+
+        if self.speed:
+            sleep(entry['duration'] / self.speed)
+        return entry
+
+    def _replay_command(self, command):
+        command_str, tokens = _normalize(str(command))
+        entry = self._replay(dict(type='execute', command=command_str, writein=command.writein))
+        return entry['exit_code'], _restore_tokens(entry['output'], tokens), entry['error']
+
+    def execute_command(self, command):
+        exit_code, output, error = self._replay_command(command)
+        if command.output_logger:
+            for line in output.splitlines():
+                command.output_logger.debug(line)
+        if exit_code:
+            raise CommandError(command, exit_code, error, output)
+        return output
+
+    def execute_command_stream(self, command):
+        exit_code, output, error = self._replay_command(command)
+        yield from output.splitlines()
+        return exit_code, error
+
+    @contextmanager
+    def pipe_command(self, command):
+        entry = self._replay(dict(type='pipe', command=_normalize(str(command))[0]))
+        yield ReplayedPipe(b64decode(entry['output']))
+        if entry['exit_code'] > 0:
+            raise CommandError(command, entry['exit_code'], entry['error'])
+
+    @contextmanager
+    def open_file(self, remote_path):
+        entry = self._replay(dict(type='open_file', path=remote_path))
+        yield StringIO(entry['content'])
+
+    def send_file(self, source, target):
+        self._replay(dict(type='send_file', source=source, target=target))
+
+
+def traced_executor(executor, debug_settings):
+    """
+    :return: executor replaced by ReplayExecutor or wrapped by RecordingExecutor according to debug settings
+    """
+    if debug_settings.replay:
+        logger.debug("Replaying commands from '{trace}'.".format(trace=debug_settings.replay))
+        return ReplayExecutor(trace_path=debug_settings.replay, speed=debug_settings.replay_speed)
+    elif debug_settings.record:
+        logger.debug("Recording commands to '{trace}'.".format(trace=debug_settings.record))
+        return RecordingExecutor(executor=executor, trace_path=debug_settings.record)
+    return executor
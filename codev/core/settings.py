@@ -44,6 +44,32 @@ class ProviderSettings(BaseSettings):
         return self.data.get('settings', {})
 
 
+class ExecutorSettings(ProviderSettings):
+    @property
+    def cache(self):
+        """
+        :return: options of CachingExecutor (ttl, size) or None if caching is disabled
+        """
+        cache = self.data.get('cache', False)
+        if cache is True:
+            return {}
+        return cache or None
+
+    @property
+    def governor(self):
+        """
+        :return: options of governor (limits of concurrent processes per program, default limit)
+            or None if processes are not limited
+        """
+        governor = self.data.get('governor')
+        if not governor:
+            return None
+        return {
+            'limits': governor.get('limits', {}),
+            'default_limit': governor.get('default')
+        }
+
+
 # FIXME refactorize all from here
 
 
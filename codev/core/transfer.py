@@ -0,0 +1,104 @@
+from hashlib import sha1, sha256
+from logging import getLogger
+from os import stat
+from os.path import expanduser
+from threading import Lock
+
+from .utils import shell_path
+
+logger = getLogger(__name__)
+
+# remote index of sent files, lines: <key of target> <sha256> <size> <mtime>
+INDEX_PATH = '~/.cache/codev/transfers'
+
+HASH_CHUNK_SIZE = 1048576
+
+
+class TransferStats(object):
+    """
+    Files and bytes sent or avoided by send_file_cached.
+    """
+    def __init__(self):
+        self.files_sent = 0
+        self.files_avoided = 0
+        self.bytes_sent = 0
+        self.bytes_avoided = 0
+        self._lock = Lock()
+
+    def add(self, size, avoided):
+        with self._lock:
+            if avoided:
+                self.files_avoided += 1
+                self.bytes_avoided += size
+            else:
+                self.files_sent += 1
+                self.bytes_sent += size
+
+    def __str__(self):
+        return (
+            '{files_sent} files ({bytes_sent} bytes) transferred, '
+            '{files_avoided} files ({bytes_avoided} bytes) avoided'
+        ).format(**self.__dict__)
+
+
+transfer_stats = TransferStats()
+
+_checksums = {}
+
+
+def file_checksum(filepath):
+    """
+    :return: sha256 of local file, checksums are remembered until the file is changed
+    """
+    file_stat = stat(filepath)
+    key = filepath, file_stat.st_size, file_stat.st_mtime_ns
+    if key not in _checksums:
+        file_hash = sha256()
+        with open(filepath, 'rb') as fo:
+            for chunk in iter(lambda: fo.read(HASH_CHUNK_SIZE), b''):
+                file_hash.update(chunk)
+        _checksums[key] = file_hash.hexdigest()
+    return _checksums[key]
+
+
+def send_file_cached(executor, source, target, index_path=None):
+    """
+    Send file only if the target differs from the source.
+
+    Target is unchanged if its size and mtime are the same as recorded in the remote index when the file
+    with the same checksum was sent. So the remote file is never read and unchanged files cost one round trip.
+
+    :param target: path of target (it is the key in the index, so it should be absolute)
+    :param index_path: remote index, default is INDEX_PATH
+    :return: True if the file has been sent
+    """
+    source = expanduser(source)
+    checksum = file_checksum(source)
+    size = stat(source).st_size
+    key = sha1(target.encode()).hexdigest()
+    quoted_target, quoted_index = shell_path(target), shell_path(index_path or INDEX_PATH)
+
+    probe = executor.execute(
+        "stat -L -c '%s %Y' -- {target} 2>/dev/null || echo; "
+        "grep -- '^{key} ' {index} 2>/dev/null | tail -n 1; true".format(
+            target=quoted_target, key=key, index=quoted_index
+        )
+    ).split('\n')
+    target_stat, indexed = (probe + ['', ''])[:2]
+
+    if target_stat and indexed and indexed.split()[1:] == [checksum] + target_stat.split():
+        logger.debug("File '{source}' is already in '{target}'.".format(source=source, target=target))
+        transfer_stats.add(size, avoided=True)
+        return False
+
+    executor.send_file(source, target)
+    executor.execute(
+        'mkdir -p "$(dirname {index})" && '
+        "{{ grep -v -- '^{key} ' {index} 2>/dev/null; "
+        "printf '%s %s %s\\n' {key} {checksum} \"$(stat -L -c '%s %Y' -- {target})\"; }} > {index}.$$ && "
+        'mv {index}.$$ {index}'.format(
+            index=quoted_index, key=key, checksum=checksum, target=quoted_target
+        )
+    )
+    transfer_stats.add(size, avoided=False)
+    return True
@@ -0,0 +1,110 @@
+import tarfile
+from collections import namedtuple
+from contextlib import contextmanager
+from fnmatch import fnmatch
+from os.path import basename
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+TreeCodec = namedtuple('TreeCodec', ['tar_mode', 'extract_command', 'create_command'])
+
+# extract_command and create_command are executed remotely
+CODECS = {
+    'none': TreeCodec('', 'tar -x -C {directory}', 'tar -c -C {directory} .'),
+    'gzip': TreeCodec('gz', 'tar -xz -C {directory}', 'tar -cz -C {directory} .'),
+    'zstd': TreeCodec('', 'zstd -dc | tar -x -C {directory}', 'tar -c -C {directory} . | zstd -c'),
+}
+
+
+def get_codec(name):
+    try:
+        codec = CODECS[name]
+    except KeyError:
+        raise ValueError("Codec '{name}' is not supported, use one of: {codecs}.".format(
+            name=name, codecs=', '.join(sorted(CODECS))
+        ))
+    if name == 'zstd' and zstandard is None:
+        raise ValueError("Codec 'zstd' requires 'zstandard' package.")
+    return codec
+
+
+def selected(name, is_directory=False, include=None, exclude=None):
+    """
+    Patterns (fnmatch) are matched against the relative path and the base name. Excluded directories are
+    skipped with their content, include patterns are applied only to files.
+
+    :param name: path relative to the root of the tree
+    """
+    def matches(patterns):
+        return any(fnmatch(name, pattern) or fnmatch(basename(name), pattern) for pattern in patterns)
+
+    if exclude and matches(exclude):
+        return False
+    if include and not is_directory and not matches(include):
+        return False
+    return True
+
+
+def _relative_name(name):
+    return name[2:] if name.startswith('./') else name
+
+
+@contextmanager
+def _compressed(fileobj, codec_name, mode):
+    if codec_name != 'zstd':
+        yield fileobj
+    elif mode == 'w':
+        with zstandard.ZstdCompressor().stream_writer(fileobj, closefd=False) as writer:
+            yield writer
+    else:
+        with zstandard.ZstdDecompressor().stream_reader(fileobj, closefd=False) as reader:
+            yield reader
+
+
+def write_tree(fileobj, local_dir, codec_name='gzip', include=None, exclude=None):
+    """
+    Write tar stream of local directory to binary file-like object.
+    """
+    def tar_filter(tarinfo):
+        name = _relative_name(tarinfo.name)
+        if name in ('.', ''):
+            return tarinfo
+        if selected(name, tarinfo.isdir(), include=include, exclude=exclude):
+            return tarinfo
+        return None
+
+    codec = get_codec(codec_name)
+    with _compressed(fileobj, codec_name, 'w') as stream:
+        with tarfile.open(fileobj=stream, mode='w|' + codec.tar_mode) as tar:
+            tar.add(local_dir, arcname='.', filter=tar_filter)
+
+
+def read_tree(fileobj, local_dir, codec_name='gzip', include=None, exclude=None):
+    """
+    Extract tar stream from binary file-like object to local directory.
+
+    :return: number of extracted members
+    """
+    codec = get_codec(codec_name)
+    extract_kwargs = {'filter': 'data'} if hasattr(tarfile, 'data_filter') else {}
+    excluded_directories = []
+    extracted = 0
+
+    with _compressed(fileobj, codec_name, 'r') as stream:
+        with tarfile.open(fileobj=stream, mode='r|' + codec.tar_mode) as tar:
+            for member in tar:
+                name = _relative_name(member.name)
+                if name in ('.', ''):
+                    continue
+                if any(name.startswith(directory + '/') for directory in excluded_directories):
+                    continue
+                if not selected(name, member.isdir(), include=include, exclude=exclude):
+                    if member.isdir():
+                        excluded_directories.append(name)
+                    continue
+                tar.extract(member, local_dir, **extract_kwargs)
+                extracted += 1
+    return extracted
@@ -1,3 +1,6 @@
+from shlex import quote
+
+
 def parse_options(inp):
     parsed = inp.split(':', 1)
     name = parsed[0]
@@ -34,3 +37,14 @@ class HasIdent(object):
 class Status(dict):
     def __getattr__(self, item):
         return self[item]
+
+
+def shell_path(filepath):
+    """
+    :return: quoted path, leading '~' is still expanded by shell
+    """
+    if filepath == '~':
+        return '"$HOME"'
+    elif filepath.startswith('~/'):
+        return '"$HOME"/{filepath}'.format(filepath=quote(filepath[2:]))
+    return quote(filepath)
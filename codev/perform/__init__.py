@@ -1,8 +1,10 @@
 from logging import getLogger
 
-from codev.core import Codev
+from codev.core import Codev, governor, metrics
+from codev.core.cache import CachingExecutor
 from codev.core.debug import DebugSettings
 from codev.core.providers.executors.local import LocalExecutor
+from codev.core.replay import traced_executor
 from codev.perform.configuration import ConfigurationPerform
 from codev.perform.task import Task
 from .log import logging_config
@@ -25,10 +27,17 @@ class CodevPerform(Codev):
             **kwargs
     ):
         logging_config(DebugSettings.settings.loglevel)
+        if DebugSettings.settings.metrics:
+            metrics.enable(DebugSettings.settings.metrics)
 
         super().__init__(*args, **kwargs)
 
-        self.executor = LocalExecutor()
+        if self.configuration.settings.executor.governor is not None:
+            governor.configure(**self.configuration.settings.executor.governor)
+        self.executor = LocalExecutor(settings_data=self.configuration.settings.executor.settings_data)
+        if self.configuration.settings.executor.cache is not None:
+            self.executor = CachingExecutor(executor=self.executor, **self.configuration.settings.executor.cache)
+        self.executor = traced_executor(self.executor, DebugSettings.settings)
         self.infrastructure = self.configuration.get_infrastructure(self.executor)
 
     def run(self, input_vars):
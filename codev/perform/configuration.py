@@ -1,5 +1,5 @@
 from codev.core.configuration import ConfigurationSettings, Configuration
-from codev.core.settings import DictSettings, TaskSettings
+from codev.core.settings import DictSettings, ExecutorSettings, TaskSettings
 from codev.perform.infrastructure import Infrastructure
 
 
@@ -16,6 +16,10 @@ class ConfigurationPerformSettings(ConfigurationSettings):
     def infrastructure(self):
         return self.data.get('infrastructure', {})
 
+    @property
+    def executor(self):
+        return ExecutorSettings(self.data.get('executor', {}))
+
 
 class ConfigurationPerform(Configuration):
     settings_class = ConfigurationPerformSettings
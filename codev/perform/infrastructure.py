@@ -1,8 +1,9 @@
+from asyncio import run
 from logging import getLogger
 
 from codev.core import HasSettings
 from codev.core.executor import HasExecutor
-from codev.core.machines import Machine
+from codev.core.machines import AsyncMachineAdapter, Machine, start_or_create_machines
 from codev.core.settings import ProviderSettings, BaseSettings
 from codev.core.utils import Ident
 
@@ -47,8 +48,8 @@ class Infrastructure(HasSettings, HasExecutor):
 
     def create(self):
         logger.info('Creating infrastructure...')
-        for machine in self.machines:
-            machine.start_or_create()
+        # machines are started or created concurrently, each one in a thread of the loop
+        run(start_or_create_machines([AsyncMachineAdapter(machine) for machine in self.machines]))
 
     @property
     def machines(self):
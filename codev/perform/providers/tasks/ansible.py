@@ -4,6 +4,7 @@ import json
 import os.path
 from logging import getLogger
 
+from codev.core.fanout import FanOutExecutor
 from codev.core.source import Source
 from codev.core.providers.machines import VirtualenvBaseMachine
 from codev.core.installer import Installer
@@ -51,6 +52,13 @@ class AnsibleTaskSettings(BaseSettings):
     def source(self):
         return ProviderSettings(self.data.get('source', {}))
 
+    @property
+    def concurrency(self):
+        """
+        :return: maximal number of machines prepared concurrently
+        """
+        return self.data.get('concurrency', 10)
+
 
 class AnsibleTask(Task):
     provider_name = 'ansible'
@@ -85,8 +93,12 @@ class AnsibleTask(Task):
             for group in machine.groups:
                 inventory.add_section(group)
                 inventory.set(group, machine.ident.as_hostname(), '')
-            # ansible node additional requirements
-            Installer(executor=machine).install_packages('python')
+
+        # ansible node additional requirements
+        FanOutExecutor(infrastructure.machines, concurrency=self.settings.concurrency).map(
+            lambda machine: Installer(executor=machine).install_packages('python'),
+            command='install python'
+        )
 
         inventory_directory = '/tmp/codev.ansible.inventory'
         if not os.path.exists(inventory_directory):
@@ -170,7 +182,8 @@ class AnsibleTask(Task):
 
             machine_idents = [machine.ident for machine in infrastructure.machines]
 
-            self.virtualenv.execute('{env_vars}ansible-playbook -v -i {inventory} {playbook} --limit={limit} {extra_vars}{vault_password_file}'.format(
+            # verbose output of playbook can be huge, it is streamed instead of being collected
+            playbook_output = self.virtualenv.execute_stream('{env_vars}ansible-playbook -v -i {inventory} {playbook} --limit={limit} {extra_vars}{vault_password_file}'.format(
                 inventory=inventory_directory,
                 playbook=self.settings.playbook,
                 limit=','.join(machine_idents),
@@ -179,5 +192,7 @@ class AnsibleTask(Task):
                 vault_password_file=vault_password_file
 
             ), writein=writein)
+            for line in playbook_output:
+                logger.debug(line)
 
         return True
@@ -15,6 +15,11 @@ REQUIRES = [
     'colorama==0.3.7',
 ]
 
+EXTRAS_REQUIRE = {
+    'zstd': ['zstandard'],
+    'paramiko': ['paramiko'],
+}
+
 cmdclass = {}
 ext_modules = []
 
@@ -39,6 +44,7 @@ setup(
         'Programming Language :: Python :: 3',
     ],
     install_requires=REQUIRES,
+    extras_require=EXTRAS_REQUIRE,
     cmdclass=cmdclass,
     ext_modules=ext_modules
 )
@@ -0,0 +1,110 @@
+from asyncio import gather, run
+from time import perf_counter
+
+import pytest
+
+from codev.core.async_executor import AsyncExecutorAdapter, AsyncProxyExecutor, SyncExecutor
+from codev.core.executor import CommandError
+from codev.core.machines import AsyncBaseMachine, AsyncMachineAdapter, BaseMachine, start_or_create_machines
+from codev.core.providers.executors.async_local import AsyncLocalExecutor
+from codev.core.providers.executors.local import LocalExecutor
+from codev.core.utils import Ident
+from .executor import TestExecutor
+
+
+class TestAsyncLocalExecutor:
+    @classmethod
+    def setup_class(cls):
+        cls.executor = AsyncLocalExecutor()
+
+    def test_output(self):
+        assert run(self.executor.execute('echo test')) == 'test'
+
+    def test_writein(self):
+        assert run(self.executor.execute('cat', writein='line 1\nline 2\n')) == 'line 1\nline 2'
+
+    def test_error(self):
+        with pytest.raises(CommandError) as excinfo:
+            run(self.executor.execute('echo output; echo error >&2; exit 3'))
+        assert excinfo.value.exit_code == 3
+        assert excinfo.value.output == 'output'
+        assert excinfo.value.error == 'error'
+
+    def test_concurrent(self):
+        async def concurrent():
+            return await gather(*(self.executor.execute('sleep 0.2; echo {i}'.format(i=i)) for i in range(10)))
+
+        start = perf_counter()
+        assert run(concurrent()) == [str(i) for i in range(10)]
+        assert perf_counter() - start < 1
+
+    def test_proxy_change_directory(self):
+        proxy_executor = AsyncProxyExecutor(executor=self.executor)
+        with proxy_executor.change_directory('/'):
+            assert run(proxy_executor.execute('pwd')) == '/'
+
+
+class TestAdapters:
+    def test_sync_executor(self):
+        sync_executor = SyncExecutor(executor=AsyncLocalExecutor())
+        assert sync_executor.execute('echo test') == 'test'
+        assert not sync_executor.check_execute('false')
+
+    def test_async_executor_adapter(self):
+        async_executor = AsyncExecutorAdapter(executor=TestExecutor())
+        assert run(async_executor.execute('cat /dev/null')) == 'cat /dev/null'
+
+
+class TestAsyncMachine:
+    @classmethod
+    def setup_class(cls):
+        class TestMachine(AsyncBaseMachine):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                self.created = False
+                self.started = False
+
+            async def exists(self):
+                return self.created
+
+            async def create(self):
+                await self.execute('sleep 0.2')
+                self.created = True
+
+            async def is_started(self):
+                return self.started
+
+            async def start(self):
+                self.started = True
+                await self.wait_for_start(interval=0.01)
+
+        cls.TestMachine = TestMachine
+
+    def test_start_or_create_machines(self):
+        machines = [
+            self.TestMachine(executor=AsyncLocalExecutor(), ident=Ident('machine', i)) for i in range(10)
+        ]
+        start = perf_counter()
+        assert run(start_or_create_machines(machines)) == [True] * 10
+        assert perf_counter() - start < 1
+        assert all(machine.started for machine in machines)
+        assert run(start_or_create_machines(machines)) == [False] * 10
+
+    def test_start_or_create_sync_machines(self):
+        class SyncMachine(BaseMachine):
+            created = False
+
+            def exists(self):
+                return self.created
+
+            def create(self):
+                self.execute('sleep 0.2')
+                self.created = True
+
+            def is_started(self):
+                return True
+
+        machines = [SyncMachine(executor=LocalExecutor(), ident=Ident('machine', i)) for i in range(10)]
+        start = perf_counter()
+        assert run(start_or_create_machines([AsyncMachineAdapter(machine) for machine in machines])) == [True] * 10
+        assert perf_counter() - start < 1
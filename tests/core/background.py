@@ -0,0 +1,149 @@
+from glob import glob
+from os import environ
+from shutil import which
+from time import monotonic, sleep
+
+import pytest
+
+from codev.core.executor import BackgroundExecutor, CommandError, CommandTimeoutError, ProxyExecutor
+from codev.core.providers.executors.local import LocalExecutor
+
+
+def running_commands():
+    commands = []
+    for cmdline in glob('/proc/[0-9]*/cmdline'):
+        try:
+            with open(cmdline) as cmdline_file:
+                commands.append(cmdline_file.read().replace('\x00', ' ').strip())
+        except (FileNotFoundError, ProcessLookupError):
+            pass
+    return commands
+
+
+class TestBackgroundExecutor:
+
+    def setup_method(self):
+        self.executor = BackgroundExecutor(executor=ProxyExecutor(executor=LocalExecutor()))
+
+    def test_execute(self):
+        assert self.executor.execute('echo background') == 'background'
+
+    def test_error(self):
+        with pytest.raises(CommandError):
+            self.executor.execute('false')
+
+    def test_timeout(self):
+        with pytest.raises(CommandTimeoutError) as excinfo:
+            self.executor.execute('echo started; sleep 30', timeout=0.5)
+        assert excinfo.value.command == 'echo started; sleep 30'
+        assert excinfo.value.output == 'started'
+        assert self.executor.execute('echo again') == 'again'
+
+    def test_timeout_kills_command(self):
+        with pytest.raises(CommandTimeoutError):
+            self.executor.execute('sleep 31.5', timeout=0.5)
+        sleep(0.2)
+        assert 'sleep 31.5' not in running_commands()
+
+    def test_follow(self):
+        lines = []
+
+        class Logger(object):
+            def debug(self, line):
+                lines.append(line)
+
+        assert self.executor.execute('seq 3; sleep 0.3; echo last', logger=Logger()) == '1\n2\n3\nlast'
+        assert lines == ['1', '2', '3', 'last']
+
+    def test_follow_unsupported(self, tmpdir, monkeypatch):
+        # tail without --pid, output is polled while the command runs
+        tail = tmpdir.join('tail')
+        tail.write(
+            '#!/bin/sh\n'
+            'case "$1" in --pid=*) echo "unknown option" >&2; exit 1;; esac\n'
+            'exec {tail} "$@"\n'.format(tail=which('tail'))
+        )
+        tail.chmod(0o755)
+        monkeypatch.setenv('PATH', '{directory}:{path}'.format(directory=tmpdir, path=environ['PATH']))
+        logged = []
+
+        class Logger(object):
+            def debug(self, line):
+                logged.append(monotonic())
+
+        # stream of remote command is open until all its processes close it
+        executor = BackgroundExecutor(executor=PipedExecutor(executor=LocalExecutor()))
+        start = monotonic()
+        assert executor.execute('echo first; sleep 1.5; echo last', logger=Logger()) == 'first\nlast'
+        assert logged[0] - start < 1
+
+    def test_poll(self):
+        executor = BackgroundExecutor(executor=LocalExecutor(), settings_data={'follow': False})
+        assert executor.execute('seq 3; sleep 0.3; echo last') == '1\n2\n3\nlast'
+
+    def test_poll_partial_lines(self):
+        lines = []
+
+        class Logger(object):
+            def debug(self, line):
+                lines.append(line)
+
+        executor = BackgroundExecutor(executor=LocalExecutor(), settings_data={'follow': False})
+        output = executor.execute(
+            'echo first; printf "pa"; sleep 0.6; printf "rt\\n\\n"; sleep 0.6; printf "žluť"', logger=Logger()
+        )
+        assert output == 'first\npart\n\nžluť'
+        assert lines == ['first', 'part', '', 'žluť']
+
+    def test_exit(self):
+        with pytest.raises(CommandError) as excinfo:
+            self.executor.execute('echo output; exit 3')
+        assert excinfo.value.exit_code == 3
+        assert excinfo.value.output == 'output'
+
+    def test_writein(self):
+        assert self.executor.execute('cat', writein='input\n') == 'input'
+
+    def test_running(self):
+        assert self.executor.execute('sleep 30', wait=False) == self.executor.ident
+        try:
+            with pytest.raises(CommandError) as excinfo:
+                self.executor.execute('true')
+            assert excinfo.value.error == 'Another process is running.'
+        finally:
+            self.executor.kill()
+
+    @pytest.mark.parametrize('method', ['kill', 'stop'])
+    def test_kill(self, method):
+        self.executor.execute('sleep 42.5; echo x', wait=False)
+        sleep(0.2)
+        assert 'sleep 42.5' in running_commands()
+        assert getattr(self.executor, method)()
+        sleep(0.2)
+        # the whole process group is signalled
+        assert 'sleep 42.5' not in running_commands()
+
+    def test_round_trips(self):
+        executor = CountingExecutor()
+        assert BackgroundExecutor(executor=executor).execute('echo test') == 'test'
+        # launch, check and collect
+        assert executor.calls == 3
+
+
+class CountingExecutor(LocalExecutor):
+    calls = 0
+
+    def execute_command(self, command):
+        self.calls += 1
+        return super().execute_command(command)
+
+
+class PipedExecutor(ProxyExecutor):
+    """
+    Output goes through a pipe which is open until all processes close it (as a stream of ssh),
+    the exit code of the command is passed around the pipe.
+    """
+    def wrap_command(self, command):
+        return command.wrap(
+            'exec 4>&1; status=$({{ {{ {command} 3>&-; echo $? >&3; }} | cat >&4; }} 3>&1); exit $status'
+        )
@@ -0,0 +1,116 @@
+from time import monotonic, sleep
+
+import pytest
+
+from codev.core.cache import CachingExecutor
+from codev.core.executor import BareExecutor, CommandError, ProxyExecutor
+from codev.core.providers.machines.lxd import LXDMachine
+from codev.core.utils import Ident
+
+
+class CountingExecutor(BareExecutor):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.executed = []
+
+    def execute_command(self, command):
+        self.executed.append(str(command))
+        if str(command).startswith('false'):
+            raise CommandError(command, 1, 'failed', 'partial')
+        return str(command)
+
+
+class HostExecutor(BareExecutor):
+    """
+    Host with a container which is running since ready time.
+    """
+    def __init__(self, *args, ready, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.ready = ready
+        self.executed = []
+
+    def execute_command(self, command):
+        self.executed.append(str(command))
+        if str(command).startswith('lxc info'):
+            if monotonic() < self.ready:
+                return 'Status: Stopped'
+            return 'Status: Running\n  eth0:\tinet\t10.0.0.2\teth0'
+        return ''
+
+
+class MachineExecutor(ProxyExecutor):
+
+    def wrap_command(self, command):
+        return command.wrap('machine {command}')
+
+
+class TestCachingExecutor:
+
+    def setup_method(self):
+        self.counting_executor = CountingExecutor()
+        self.caching_executor = CachingExecutor(executor=self.counting_executor)
+
+    def test_idempotent(self):
+        assert self.caching_executor.execute('uname -m', idempotent=True) == 'uname -m'
+        assert self.caching_executor.execute('uname -m', idempotent=True) == 'uname -m'
+        assert self.counting_executor.executed == ['uname -m']
+        assert self.caching_executor.cache.stats['hits'] == 1
+
+    def test_not_idempotent(self):
+        self.caching_executor.execute('touch file')
+        self.caching_executor.execute('touch file')
+        assert len(self.counting_executor.executed) == 2
+
+    def test_failure(self):
+        for _ in range(2):
+            with pytest.raises(CommandError) as excinfo:
+                self.caching_executor.execute('false', idempotent=True)
+            assert excinfo.value.exit_code == 1
+            assert excinfo.value.error == 'failed'
+            assert excinfo.value.output == 'partial'
+        assert self.counting_executor.executed == ['false']
+
+    def test_invalidate(self):
+        machine_executor = MachineExecutor(executor=self.caching_executor)
+        machine_executor.execute('ls', idempotent=True)
+        self.caching_executor.execute('ls', idempotent=True)
+
+        # non idempotent command invalidates only its own target
+        self.caching_executor.execute('touch file')
+        self.caching_executor.execute('ls', idempotent=True)
+        machine_executor.execute('ls', idempotent=True)
+
+        assert self.counting_executor.executed == ['machine bash -c "ls"', 'ls', 'touch file', 'ls']
+
+    def test_ttl(self):
+        caching_executor = CachingExecutor(executor=self.counting_executor, ttl=0.01)
+        caching_executor.execute('ls', idempotent=True)
+        sleep(0.02)
+        caching_executor.execute('ls', idempotent=True)
+        assert len(self.counting_executor.executed) == 2
+
+    def test_size(self):
+        caching_executor = CachingExecutor(executor=self.counting_executor, size=2)
+        for command in ['ls a', 'ls b', 'ls a', 'ls c', 'ls a', 'ls b']:
+            caching_executor.execute(command, idempotent=True)
+        assert self.counting_executor.executed == ['ls a', 'ls b', 'ls c', 'ls b']
+        assert caching_executor.cache.stats['evictions'] == 2
+
+    def test_polled_status(self):
+        host_executor = HostExecutor(ready=monotonic() + 0.3)
+        machine = LXDMachine(executor=CachingExecutor(executor=host_executor, ttl=5), ident=Ident('project', 'machine'))
+        start = monotonic()
+        machine.start()
+        assert monotonic() - start < 2
+        assert host_executor.executed.count('lxc info project_machine') > 2
+
+    def test_machine_target(self):
+        # directory and environment passed to 'lxc exec' do not make another target of the same container
+        machine = LXDMachine(executor=self.caching_executor, ident=Ident('project', 'machine'))
+        machine.execute('dpkg-query -l', idempotent=True)
+        with machine.change_directory('/srv'):
+            machine.execute('apt-get install -y git')
+        machine.execute('dpkg-query -l', idempotent=True)
+        assert len(self.counting_executor.executed) == 3
+        assert self.caching_executor.cache.stats['invalidations'] == 1
@@ -1,4 +1,4 @@
-from codev.core.executor import BareExecutor, ProxyExecutor
+from codev.core.executor import BareExecutor, Command, ProxyExecutor
 
 
 class TestExecutor(BareExecutor):
@@ -59,6 +59,15 @@ class TestBasic(BaseTestExecutor):
 
         assert return_command == 'cd {} && {}'.format(directory2, command)
 
+    def test_stream(self):
+        directory = 'home'
+        command = 'cat /dev/null'
+
+        with self.test_proxy_executor.change_directory(directory):
+            stream = self.test_proxy_executor.execute_stream(command)
+            assert list(stream) == ['cd {directory} && {command}'.format(directory=directory, command=command)]
+        assert stream.exit_code == 0
+
 
 class TestBasicInheritance(BaseTestExecutor):
     @classmethod
@@ -176,4 +185,101 @@ class TestAdvancedInheritance(BaseTestExecutor):
 
 
         cls.test_proxy_executor = TestProxyExecutor(executor=cls.test_executor)
-        cls.test_inherited_proxy_executor = TestSecondInheritedProxyExecutor(executor=cls.test_executor)
\ No newline at end of file
+        cls.test_inherited_proxy_executor = TestSecondInheritedProxyExecutor(executor=cls.test_executor)
+
+
+class TestWrapInheritance(BaseTestExecutor):
+    @classmethod
+    def setup_class(cls):
+        super().setup_class()
+
+        class TestProxyExecutor(ProxyExecutor):
+            def wrap_command(self, command):
+                command = command.wrap('wrap {command} && another')
+                return super().wrap_command(command)
+
+        class TestInheritedProxyExecutor(ProxyExecutor):
+            executor_class = TestProxyExecutor
+
+            def wrap_command(self, command):
+                command = command.wrap('wrap2 {command} && another2')
+                return super().wrap_command(command)
+
+        cls.test_inherited_proxy_executor = TestInheritedProxyExecutor(executor=cls.test_executor)
+
+    def test_basic_inherited(self):
+        command = 'cat /dev/null'
+        return_command = self.test_inherited_proxy_executor.execute(command)
+        assert return_command == 'wrap bash -c "wrap2 bash -c \\"{command}\\" && another2" && another'.format(command=command)
+
+    def test_stream_inherited(self):
+        command = 'cat /dev/null'
+        return_command = list(self.test_inherited_proxy_executor.execute_stream(command))
+        assert return_command == ['wrap bash -c "wrap2 bash -c \\"{command}\\" && another2" && another'.format(command=command)]
+
+
+class TestCommand:
+    def test_argv(self):
+        assert str(Command(['echo', 'a b', '$HOME'])) == "echo 'a b' '$HOME'"
+
+    def test_immutable(self):
+        command = Command('cat /dev/null')
+        command.change_directory('home').wrap('wrap {command}')
+        assert str(command) == 'cat /dev/null'
+
+    def test_collapsed_contexts(self):
+        command = Command('cat /dev/null').change_directory('home').prefix('. env/bin/activate').set_env({'A': 'a b'})
+        assert str(command) == "export A='a b' && . env/bin/activate && cd home && cat /dev/null"
+
+    def test_collapsed_contexts_wrapped(self):
+        command = Command('cat /dev/null', cwd='test').change_directory('home').prefix('. env/bin/activate')
+        command = command.wrap('wrap {command}').change_directory('root')
+        assert str(command) == 'cd root && wrap bash -c ". env/bin/activate && cd home && cd test && cat /dev/null"'
+        assert command.wrappers == ('wrap {command}',)
+
+    def test_quoted_wrap(self):
+        command = Command('echo $HOME').wrap('ssh host -- {quoted_command}')
+        assert str(command) == 'ssh host -- \'bash -c "echo \\$HOME"\''
+
+    def test_local_context(self):
+        command = Command('cat /dev/null').activate_virtualenv('env').change_directory('/tmp').set_env({'A': 'a'})
+        assert command.local_context() is None
+
+        command = Command('cat /dev/null').set_env({'A': 'a'}).change_directory('/tmp')
+        cwd, env = command.local_context()
+        assert cwd == '/tmp'
+        assert env['A'] == 'a'
+
+        command = Command('cat /dev/null').change_directory('/tmp').wrap('wrap {command}')
+        assert command.local_context() is None
+
+    def test_simple_wrap(self):
+        assert str(Command(['echo', 'a b']).wrap('ssh host -- {quoted_command}', simple=True)) == \
+            'ssh host -- \'echo \'"\'"\'a b\'"\'"\'\''
+        command = Command('echo $HOME').wrap('lxc exec c -- {command}', simple=True).wrap(
+            'ssh host -- {quoted_command}', simple=True
+        )
+        # the only shell is the innermost one
+        assert str(command) == 'ssh host -- \'lxc exec c -- bash -c "echo \\$HOME"\''
+
+    def test_split_context(self):
+        command = Command('python -V').activate_virtualenv('env').change_directory('project').set_env({'A': 'a'})
+        split_command, cwd, env = command.split_context(home='/root', path='/bin')
+        assert str(split_command) == 'python -V'
+        assert cwd == '/root/project'
+        assert env == {'A': 'a', 'VIRTUAL_ENV': '/root/project/env', 'PATH': '/root/project/env/bin:/bin'}
+
+        command = Command('ls').change_directory('~/project').change_directory('/tmp')
+        assert command.split_context(home='/root')[1] == '/root/project'
+
+    def test_split_context_unresolved(self):
+        # layers inside of wrapper and layers which need shell stay in the command
+        command = Command('ls').change_directory('/tmp').wrap('sudo {command}').prefix('true').change_directory('/a')
+        split_command, cwd, env = command.split_context()
+        assert str(split_command) == 'true && sudo bash -c "cd /tmp && ls"'
+        assert cwd == '/a'
+
+        command = Command('ls').change_directory('$HOME/project')
+        assert command.split_context(home='/root') == (command, None, {})
+        command = Command('ls').change_directory('~/project')
+        assert command.split_context() == (command, None, {})
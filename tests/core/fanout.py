@@ -0,0 +1,108 @@
+from threading import Lock
+from time import sleep
+
+import pytest
+
+from codev.core.executor import BareExecutor, CommandError, ProxyExecutor
+from codev.core.fanout import FanOutCancelled, FanOutError, FanOutExecutor
+from codev.core.providers.executors.local import LocalExecutor
+
+
+class SlowExecutor(BareExecutor):
+    running = 0
+    max_running = 0
+    lock = Lock()
+
+    def __init__(self, name, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.name = name
+
+    def execute_command(self, command):
+        with self.lock:
+            SlowExecutor.running += 1
+            SlowExecutor.max_running = max(SlowExecutor.running, SlowExecutor.max_running)
+        try:
+            sleep(0.05)
+            if self.name == 'failing':
+                raise CommandError(command, 2, 'failed')
+            return '{name}: {command}'.format(name=self.name, command=command)
+        finally:
+            with self.lock:
+                SlowExecutor.running -= 1
+
+
+class CountingExecutor(ProxyExecutor):
+    executed = 0
+
+    def execute(self, *args, **kwargs):
+        self.executed += 1
+        return super().execute(*args, **kwargs)
+
+
+class TestFanOutExecutor:
+
+    def setup_method(self):
+        SlowExecutor.max_running = 0
+
+    def test_execute(self):
+        targets = [SlowExecutor(str(index)) for index in range(4)]
+        results = FanOutExecutor(targets).execute_all('ls')
+        assert [result.result for result in results] == ['0: ls', '1: ls', '2: ls', '3: ls']
+        assert [result.target for result in results] == targets
+        assert SlowExecutor.max_running == 4
+
+    def test_output(self):
+        targets = [SlowExecutor(str(index)) for index in range(2)]
+        assert FanOutExecutor(targets).execute('ls') == '0: ls\n1: ls'
+
+    def test_target_execute(self):
+        targets = [CountingExecutor(executor=SlowExecutor(str(index))) for index in range(2)]
+        FanOutExecutor(targets).execute_all('ls')
+        assert [target.executed for target in targets] == [1, 1]
+
+    def test_concurrency(self):
+        targets = [SlowExecutor(str(index)) for index in range(4)]
+        FanOutExecutor(targets, concurrency=2).execute('ls')
+        assert SlowExecutor.max_running == 2
+
+    def test_directory(self):
+        targets = [ProxyExecutor(executor=SlowExecutor(str(index))) for index in range(2)]
+        with targets[0].change_directory('/tmp'):
+            results = FanOutExecutor(targets).execute_all('ls')
+        assert [result.result for result in results] == ['0: cd /tmp && ls', '1: ls']
+
+    def test_collect_all(self):
+        targets = [SlowExecutor('failing'), SlowExecutor('0'), SlowExecutor('1')]
+        with pytest.raises(FanOutError) as excinfo:
+            FanOutExecutor(targets, concurrency=1).execute('ls')
+        assert excinfo.value.exit_code == 2
+        assert [result.result for result in excinfo.value.results] == [None, '0: ls', '1: ls']
+        assert [result.target for result in excinfo.value.failed] == targets[:1]
+
+    def test_fail_fast(self):
+        targets = [SlowExecutor('failing'), SlowExecutor('0'), SlowExecutor('1'), SlowExecutor('2')]
+        with pytest.raises(FanOutError) as excinfo:
+            FanOutExecutor(targets, concurrency=1, fail_fast=True).execute('ls')
+        errors = [type(result.error) for result in excinfo.value.results]
+        # the next target could be already started by the worker
+        assert errors[0] == CommandError
+        assert errors[2:] == [FanOutCancelled, FanOutCancelled]
+
+    def test_files(self, tmpdir):
+        source = tmpdir.join('source')
+        source.write('content')
+        targets = [ProxyExecutor(executor=LocalExecutor()) for _ in range(2)]
+        for index, target in enumerate(targets):
+            target.create_directory(str(tmpdir.join(str(index))))
+
+        FanOutExecutor(targets[:1]).send_file(str(source), str(tmpdir.join('0', 'target')))
+        FanOutExecutor(targets[1:]).send_file(str(source), str(tmpdir.join('1', 'target')))
+        with FanOutExecutor(targets).open_file(str(tmpdir.join('0', 'target'))) as results:
+            assert [result.result.read() for result in results] == ['content', 'content']
+
+    def test_execute_many(self):
+        targets = [ProxyExecutor(executor=LocalExecutor()) for _ in range(2)]
+        results = FanOutExecutor(targets).execute_many(['echo a', 'echo b'])
+        assert [[command_result.output for command_result in result.result] for result in results] == [
+            ['a', 'b'], ['a', 'b']
+        ]
@@ -0,0 +1,109 @@
+from threading import Lock, Thread
+from time import sleep
+
+from codev.core import governor
+from codev.core.executor import Command, ProxyExecutor
+from codev.core.providers.executors.local import LocalExecutor
+
+
+def test_program():
+    assert governor.program(Command('lxc exec machine -- ls')) == 'lxc'
+    assert governor.program(Command('LANG=C /usr/bin/VBoxManage list vms')) == 'VBoxManage'
+
+    command = Command('ls').wrap('ssh -p 22 host {command}').wrap('lxc exec machine -- {command}')
+    assert governor.program(command) == 'lxc'
+
+
+class TestGovernor:
+
+    def setup_method(self):
+        self.governor = governor.Governor(limits={'lxc': 2}, default_limit=None)
+        self.running = 0
+        self.max_running = 0
+        self.lock = Lock()
+
+    def run(self, command_str, delay=0.05):
+        with self.governor.slot(Command(command_str)):
+            with self.lock:
+                self.running += 1
+                self.max_running = max(self.running, self.max_running)
+            sleep(delay)
+            with self.lock:
+                self.running -= 1
+
+    def run_concurrently(self, command_str, count):
+        threads = [Thread(target=self.run, args=(command_str,)) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def test_limit(self):
+        self.run_concurrently('lxc list', 5)
+        assert self.max_running == 2
+
+        stats = self.governor.stats()['lxc']
+        assert stats['acquired'] == 5
+        assert stats['waited'] >= 3
+        assert stats['max_queued'] >= 3
+        assert stats['running'] == 0 and stats['queued'] == 0
+
+    def test_unlimited(self):
+        self.run_concurrently('ls', 3)
+        assert self.max_running == 3
+        assert 'ls' not in self.governor.stats()
+
+    def test_priority(self):
+        self.governor.limits['lxc'] = 1
+        order = []
+
+        def run(name, priority):
+            with governor.priority(priority):
+                with self.governor.slot(Command('lxc {name}'.format(name=name))):
+                    order.append(name)
+
+        blocking = Thread(target=self.run, args=('lxc launch', 0.2))
+        blocking.start()
+        sleep(0.05)
+
+        threads = []
+        for name, priority in (
+                ('bulk', governor.PRIORITY_BULK),
+                ('normal', governor.PRIORITY_NORMAL),
+                ('interactive', governor.PRIORITY_INTERACTIVE)):
+            thread = Thread(target=run, args=(name, priority))
+            thread.start()
+            threads.append(thread)
+            sleep(0.02)
+
+        for thread in [blocking] + threads:
+            thread.join()
+        assert order == ['interactive', 'normal', 'bulk']
+
+
+class TestLocalExecutor:
+
+    def teardown_method(self):
+        governor.disable()
+
+    def test_execute(self):
+        governor_ = governor.configure(limits={'sleep': 1})
+        executor = ProxyExecutor(executor=LocalExecutor())
+
+        threads = [Thread(target=executor.execute, args=('sleep 0.05',)) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stats = governor_.stats()['sleep']
+        assert stats['acquired'] == 3
+        assert stats['waited'] == 2
+
+    def test_stream(self, tmpdir):
+        governor_ = governor.configure(default_limit=1)
+        executor = ProxyExecutor(executor=LocalExecutor())
+
+        with open(__file__, 'rb') as source:
+            executor.send_stream(source, str(tmpdir.join('target')))
+        assert governor_.stats()['cat']['acquired'] == 1
@@ -0,0 +1,82 @@
+import pytest
+
+from codev.core.executor import CommandError, CommandTimeoutError, ProxyExecutor
+from codev.core.jobs import JOB_FAILED, JOB_FINISHED, JOB_KILLED, JOB_QUEUED, JOB_RUNNING, JobManager
+from codev.core.providers.executors.local import LocalExecutor
+
+
+class TestJobManager:
+
+    def setup_method(self):
+        self.executor = ProxyExecutor(executor=LocalExecutor())
+        self.manager = JobManager(executor=self.executor, limit=2)
+
+    def teardown_method(self):
+        self.manager.clean()
+
+    def test_execute(self):
+        job_id = self.manager.submit('echo job')
+        assert self.manager.wait(job_id) == 'job'
+        assert self.manager.status(job_id).status == JOB_FINISHED
+        assert self.manager.status(job_id).offset == len('job\n')
+
+    def test_error(self):
+        job_id = self.manager.submit('echo output; exit 3')
+        with pytest.raises(CommandError) as excinfo:
+            self.manager.wait(job_id)
+        assert excinfo.value.exit_code == 3
+        assert excinfo.value.output == 'output'
+        assert self.manager.status(job_id).status == JOB_FAILED
+
+    def test_side_by_side(self):
+        job_ids = [self.manager.submit('sleep 0.3; echo {index}'.format(index=index)) for index in range(4)]
+        # over the limit
+        assert [self.manager.status(job_id).status for job_id in job_ids] == \
+            [JOB_RUNNING, JOB_RUNNING, JOB_QUEUED, JOB_QUEUED]
+
+        assert list(self.manager.wait_all().values()) == ['0', '1', '2', '3']
+        statuses = [self.manager.status(job_id) for job_id in job_ids]
+        # queued jobs are started in order of submission, after a running job has finished
+        assert statuses[2].started <= statuses[3].started
+        assert min(statuses[0].finished, statuses[1].finished) <= statuses[2].started
+
+    def test_kill(self):
+        running = self.manager.submit('sleep 30')
+        self.manager.submit('sleep 30')
+        queued = self.manager.submit('echo queued')
+
+        assert self.manager.kill(queued)
+        assert self.manager.status(queued).status == JOB_KILLED
+        with pytest.raises(CommandError):
+            self.manager.wait(queued)
+        assert self.manager.kill(running)
+        with pytest.raises(CommandError):
+            self.manager.wait(running)
+        assert self.manager.status(running).status == JOB_KILLED
+        # other managers do not see the killed job as running
+        assert JobManager(executor=self.executor, ident=self.manager.ident).table()[running].status == JOB_KILLED
+
+        for status in self.manager.jobs():
+            self.manager.kill(status.job_id)
+
+    def test_table(self):
+        job_id = self.manager.submit('exit 2')
+        with pytest.raises(CommandError):
+            self.manager.wait(job_id)
+
+        # job table is persistent, so other managers of the same ident see the job
+        status = JobManager(executor=self.executor, ident=self.manager.ident).table()[job_id]
+        assert status.status == JOB_FAILED
+        assert status.exit_code == 2
+        assert status.started <= status.finished
+
+        job_id = self.manager.submit('echo job')
+        self.manager.wait(job_id)
+        assert self.manager.table()[job_id].offset == self.manager.status(job_id).offset
+
+    def test_timeout(self):
+        job_id = self.manager.submit('echo started; sleep 30', timeout=0.5)
+        with pytest.raises(CommandTimeoutError) as excinfo:
+            self.manager.wait(job_id)
+        assert excinfo.value.command == 'echo started; sleep 30'
+        assert excinfo.value.output == 'started'
@@ -0,0 +1,343 @@
+from time import monotonic, sleep
+
+import pytest
+
+from codev.core.executor import Command, CommandError, CommandResult, CommandTimeoutError, ProxyExecutor
+from codev.core.providers.executors.local import LocalExecutor
+
+
+def process_running(pid, wait=1.0):
+    deadline = monotonic() + wait
+    while monotonic() < deadline:
+        try:
+            with open('/proc/{pid}/stat'.format(pid=pid)) as stat_file:
+                # killed process could stay as a zombie if nobody reaps it
+                if stat_file.read().rsplit(')', 1)[1].split()[0] == 'Z':
+                    return False
+        except FileNotFoundError:
+            return False
+        sleep(0.01)
+    return True
+
+
+class BaseTestLocalExecutor:
+    """
+    Testing local executor (spawned process per command)
+    """
+    settings_data = {}
+
+    @classmethod
+    def setup_class(cls):
+        cls.executor = LocalExecutor(settings_data=cls.settings_data)
+
+    @classmethod
+    def teardown_class(cls):
+        cls.executor.close()
+
+    def test_output(self):
+        assert self.executor.execute('echo test') == 'test'
+
+    def test_output_trailing_newlines(self):
+        assert self.executor.execute('printf "a\\n\\nb"') == 'a\n\nb'
+        assert self.executor.execute('printf "a\\n\\n"') == 'a\n'
+        assert self.executor.execute('true') == ''
+
+    def test_writein(self):
+        assert self.executor.execute('cat', writein='line 1\nline 2\n') == 'line 1\nline 2'
+
+    def test_large_writein(self):
+        writein = 'x' * 1000000 + '\n'
+        assert self.executor.execute('cat', writein=writein) == writein[:-1]
+
+    def test_unread_writein(self):
+        assert self.executor.execute('true', writein='x' * 1000000) == ''
+
+    def test_large_output(self):
+        output = self.executor.execute('seq 100000; seq 100000 >&2')
+        assert output.splitlines() == [str(i) for i in range(1, 100001)]
+
+    def test_output_logger(self):
+        class Logger:
+            lines = []
+
+            def debug(self, line):
+                self.lines.append(line)
+
+        logger = Logger()
+        self.executor.execute('echo a; echo b >&2; echo c', output_logger=logger)
+        assert logger.lines == ['a', 'c']
+
+    def test_error(self):
+        with pytest.raises(CommandError) as excinfo:
+            self.executor.execute('echo output; echo error >&2; exit 3')
+        assert excinfo.value.exit_code == 3
+        assert excinfo.value.output == 'output'
+        assert excinfo.value.error == 'error'
+
+    def test_check_execute(self):
+        assert self.executor.check_execute('true')
+        assert not self.executor.check_execute('false')
+
+    def test_quoting(self):
+        assert self.executor.execute('echo \'a"$HOME\' "b\'"') == 'a"$HOME b\''
+
+    def test_stream(self):
+        stream = self.executor.execute_stream('seq 5; echo error >&2')
+        assert list(stream) == ['1', '2', '3', '4', '5']
+        assert stream.exit_code == 0
+
+    def test_stream_error_tail(self):
+        stream = self.executor.execute_stream('seq 1000; echo error >&2; exit 2', tail=3)
+        with pytest.raises(CommandError) as excinfo:
+            for _ in stream:
+                pass
+        assert excinfo.value.exit_code == 2
+        assert excinfo.value.output == '998\n999\n1000'
+        assert excinfo.value.error == 'error'
+
+    def test_stream_abandoned(self):
+        for line in self.executor.execute_stream('seq 1000000'):
+            if line == '10':
+                break
+        assert self.executor.execute('echo alive') == 'alive'
+
+    def test_execute_many(self):
+        results = self.executor.execute_many([
+            'echo output',
+            'printf "a\\n\\n"',
+            'echo error >&2; exit 3',
+            Command('cat', writein='line'),
+            'if then',
+            'true',
+        ])
+        assert results[:4] == [
+            CommandResult(0, 'output', ''),
+            CommandResult(0, 'a\n', ''),
+            CommandResult(3, '', 'error'),
+            CommandResult(0, 'line', ''),
+        ]
+        assert results[4].exit_code == 2
+        assert results[5] == CommandResult(0, '', '')
+
+    def test_execute_many_check(self):
+        with pytest.raises(CommandError) as excinfo:
+            self.executor.execute_many(['true', 'echo error >&2; false', 'echo never'], check=True)
+        assert str(excinfo.value.command) == 'echo error >&2; false'
+        assert excinfo.value.error == 'error'
+
+    def test_execute_many_change_directory(self):
+        proxy_executor = ProxyExecutor(executor=self.executor)
+        with proxy_executor.change_directory('/'):
+            assert proxy_executor.execute_many(['pwd', 'pwd']) == [CommandResult(0, '/', '')] * 2
+
+    def test_stat_paths(self, tmp_path):
+        (tmp_path / 'file name').write_text('content')
+        (tmp_path / 'directory').mkdir()
+
+        proxy_executor = ProxyExecutor(executor=self.executor)
+        with proxy_executor.change_directory(str(tmp_path)):
+            stats = proxy_executor.stat_paths(['file name', 'directory', 'missing'], checksum=True)
+
+        assert stats['file name'].type == 'file'
+        assert stats['file name'].size == 7
+        assert stats['file name'].checksum == 'ed7002b439e9ac845f22357d822bac1444730fbdb6016d3ec9432297b9ec9f73'
+        assert stats['directory'].type == 'directory'
+        assert stats['directory'].checksum is None
+        assert not stats['missing'].exists
+        assert self.executor.stat_paths(['~'])['~'].type == 'directory'
+
+    def test_send_stream(self, tmp_path):
+        target = tmp_path / 'target file'
+        content = bytes(range(256)) * 20000
+
+        assert self.executor.send_stream(content, str(target)) == len(content)
+        assert target.read_bytes() == content
+
+        with open(str(target), 'rb') as source:
+            self.executor.send_stream(source, str(tmp_path / 'copy'))
+        assert (tmp_path / 'copy').read_bytes() == content
+
+        self.executor.send_stream('text', str(target))
+        assert target.read_text() == 'text'
+
+    def test_send_stream_error(self, tmp_path):
+        with pytest.raises(CommandError):
+            self.executor.send_stream(b'x' * 10000000, str(tmp_path / 'missing' / 'target'))
+
+    def test_open_stream(self, tmp_path):
+        source = tmp_path / 'source'
+        source.write_bytes(b'line 1\nline 2\n' * 100000)
+
+        with self.executor.open_stream(str(source)) as fo:
+            assert fo.read() == source.read_bytes()
+
+        with self.executor.open_stream(str(source), binary=False) as fo:
+            assert fo.readline() == 'line 1\n'
+
+        with pytest.raises(CommandError):
+            with self.executor.open_stream(str(tmp_path / 'missing')) as fo:
+                fo.read()
+
+    def test_open_stream_change_directory(self, tmp_path):
+        (tmp_path / 'source').write_text('content')
+        proxy_executor = ProxyExecutor(executor=self.executor)
+        with proxy_executor.change_directory(str(tmp_path)):
+            with proxy_executor.open_stream('source') as fo:
+                assert fo.read() == b'content'
+
+    @staticmethod
+    def create_tree(root):
+        (root / 'sub' / 'deep').mkdir(parents=True)
+        (root / 'skipped').mkdir()
+        (root / 'a.py').write_text('a')
+        (root / 'b.txt').write_text('b')
+        (root / 'sub' / 'c.py').write_text('c')
+        (root / 'sub' / 'deep' / 'd.py').write_text('d')
+        (root / 'skipped' / 'e.py').write_text('e')
+
+    @staticmethod
+    def files(root):
+        return sorted(str(path.relative_to(root)) for path in root.rglob('*') if path.is_file())
+
+    @pytest.mark.parametrize('codec', ['none', 'gzip', 'zstd'])
+    def test_send_tree(self, tmp_path, codec):
+        if codec == 'zstd':
+            pytest.importorskip('zstandard')
+        self.create_tree(tmp_path / 'source')
+
+        self.executor.send_tree(str(tmp_path / 'source'), str(tmp_path / 'target'), codec=codec)
+        assert self.files(tmp_path / 'target') == self.files(tmp_path / 'source')
+
+        self.executor.fetch_tree(str(tmp_path / 'target'), str(tmp_path / 'fetched'), codec=codec)
+        assert self.files(tmp_path / 'fetched') == self.files(tmp_path / 'source')
+        assert (tmp_path / 'fetched' / 'sub' / 'deep' / 'd.py').read_text() == 'd'
+
+    def test_send_tree_filters(self, tmp_path):
+        self.create_tree(tmp_path / 'source')
+        proxy_executor = ProxyExecutor(executor=self.executor)
+        with proxy_executor.change_directory(str(tmp_path)):
+            proxy_executor.send_tree(str(tmp_path / 'source'), 'target', include=['*.py'], exclude=['skipped'])
+        assert self.files(tmp_path / 'target') == ['a.py', 'sub/c.py', 'sub/deep/d.py']
+
+        self.executor.fetch_tree(str(tmp_path / 'source'), str(tmp_path / 'fetched'), exclude=['sub/deep', '*.txt'])
+        assert self.files(tmp_path / 'fetched') == ['a.py', 'skipped/e.py', 'sub/c.py']
+
+    def test_fetch_tree_error(self, tmp_path):
+        with pytest.raises(CommandError):
+            self.executor.fetch_tree(str(tmp_path / 'missing'), str(tmp_path / 'fetched'))
+
+    def test_independent_commands(self):
+        cwd = self.executor.execute('pwd')
+        self.executor.execute('cd / && export CODEV_TEST=1')
+        assert self.executor.execute('pwd') == cwd
+        assert self.executor.execute('echo ${CODEV_TEST:-unset}') == 'unset'
+
+    def test_exit(self):
+        with pytest.raises(CommandError):
+            self.executor.execute('exit 4')
+        assert self.executor.execute('echo alive') == 'alive'
+
+    def test_timeout(self, tmp_path):
+        pid_file = tmp_path / 'pid'
+        start = monotonic()
+        with pytest.raises(CommandTimeoutError) as excinfo:
+            self.executor.execute(
+                'sleep 30 & echo $! > {pid_file}; echo started; printf partial >&2; wait'.format(pid_file=pid_file),
+                timeout=0.5
+            )
+        assert monotonic() - start < 5
+        assert excinfo.value.exit_code == 124
+        assert excinfo.value.timeout == 0.5
+        assert excinfo.value.output == 'started'
+        assert excinfo.value.error == 'partial'
+        # the whole process group is killed
+        assert not process_running(int(pid_file.read_text()))
+        assert self.executor.execute('echo alive', timeout=1) == 'alive'
+
+    def test_timeout_stream(self):
+        with pytest.raises(CommandTimeoutError) as excinfo:
+            for _ in self.executor.execute_stream('seq 3; sleep 30', timeout=0.5):
+                pass
+        assert excinfo.value.output == '1\n2\n3'
+
+    def test_timeout_check_execute(self):
+        with pytest.raises(CommandTimeoutError):
+            self.executor.check_execute('sleep 30', timeout=0.2)
+
+    @pytest.mark.parametrize('command', ['exec sleep 30 >/dev/null 2>&1', 'exec 1>&- 2>&-; sleep 30'])
+    def test_timeout_closed_output(self, command):
+        start = monotonic()
+        with pytest.raises(CommandTimeoutError):
+            self.executor.execute(command, timeout=0.5)
+        assert monotonic() - start < 5
+
+    def test_background_child(self):
+        # child holding the output does not delay the result, output buffered before the exit is not lost
+        start = monotonic()
+        assert self.executor.execute('sleep 3 & printf "started\\npartial"') == 'started\npartial'
+        assert monotonic() - start < 2
+
+
+class TestLocalExecutor(BaseTestLocalExecutor):
+
+    def test_local_context(self, tmp_path):
+        virtualenv = tmp_path / 'env'
+        (virtualenv / 'bin').mkdir(parents=True)
+        # activation script is not sourced in the fast path
+        (virtualenv / 'bin' / 'activate').write_text('exit 1\n')
+
+        command = Command('echo $VIRTUAL_ENV; pwd').activate_virtualenv('env').change_directory(str(tmp_path))
+        assert self.executor.execute_command(command) == '{virtualenv}\n{directory}'.format(
+            virtualenv=virtualenv,
+            directory=tmp_path
+        )
+
+    def test_local_context_argv(self, tmp_path):
+        command = Command(['pwd']).change_directory(str(tmp_path))
+        assert self.executor.execute_command(command) == str(tmp_path)
+
+    def test_local_context_fallback(self):
+        command = Command('pwd').change_directory('$HOME')
+        with pytest.raises(CommandError):
+            self.executor.execute_command(Command('pwd').change_directory('/nonexistent'))
+        assert self.executor.execute_command(command) == self.executor.execute('echo $HOME')
+
+    def test_timeout_settings(self):
+        executor = LocalExecutor(settings_data={'timeout': 0.2})
+        with pytest.raises(CommandTimeoutError):
+            executor.execute('sleep 30')
+        # per-call timeout overrides the default
+        assert executor.execute('sleep 0.3; echo slow', timeout=5) == 'slow'
+
+
+class TestLocalExecutorSession(BaseTestLocalExecutor):
+    """
+    Testing local executor with one long-lived shell process
+    """
+    settings_data = {'session': True}
+
+    def test_same_process(self):
+        pid = self.executor.execute('echo $$')
+        assert self.executor.execute('echo $$') == pid
+
+    def test_syntax_error(self):
+        with pytest.raises(CommandError) as excinfo:
+            self.executor.execute('if then')
+        assert excinfo.value.exit_code == 2
+        assert self.executor.execute('echo alive') == 'alive'
+
+    def test_nested(self):
+        # command executed while output of another one is streamed runs in its own process
+        pid = self.executor.execute('echo $$')
+        lines = [(line, self.executor.execute('echo $$')) for line in self.executor.execute_stream('echo 1; echo 2')]
+        assert [line for line, _ in lines] == ['1', '2']
+        assert all(nested_pid != pid for _, nested_pid in lines)
+        assert self.executor.execute('echo $$') == pid
+
+    def test_nested_session(self):
+        session = self.executor.session
+        lines = session.lines(Command('echo 1'))
+        next(lines)
+        with pytest.raises(RuntimeError):
+            next(session.lines(Command('echo 2')))
+        lines.close()
@@ -0,0 +1,35 @@
+from codev.core.executor import BareExecutor, Command
+from codev.core.providers.machines.lxd import LXDMachine
+from codev.core.utils import Ident
+
+
+class TestExecutor(BareExecutor):
+
+    def execute_command(self, command):
+        return str(command)
+
+
+class TestLXDMachine:
+
+    def setup_method(self):
+        self.machine = LXDMachine(executor=TestExecutor(), ident=Ident('project', 'machine'))
+
+    def test_execute(self):
+        # commands run in the container without a shell
+        assert self.machine.execute(['ls', '-l']) == \
+            'lxc exec --env HOME=/root --env LANG=C.UTF-8 --env LC_ALL=C.UTF-8 project_machine -- ls -l'
+
+    def test_context(self):
+        with self.machine.change_directory('repository'):
+            output = self.machine.execute_command(
+                self.machine.process_command(Command('echo $HOME', env={'A': 'a b'}))
+            )
+        assert output == \
+            'lxc exec --cwd /root/repository --env HOME=/root --env LANG=C.UTF-8 --env LC_ALL=C.UTF-8 ' \
+            '--env A=\'a b\' project_machine -- bash -c "echo \\$HOME"'
+
+    def test_files(self):
+        with self.machine.change_directory('repository'):
+            assert self.machine._sanitize_path('.codev') == '/root/repository/.codev'
+        assert self.machine._sanitize_path('~/.ssh') == '/root/.ssh'
+        assert self.machine._sanitize_path('/etc/hosts') == '/etc/hosts'
@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+from codev.core import metrics
+from codev.core.executor import BareExecutor, CommandError, ProxyExecutor
+
+
+class TestExecutor(BareExecutor):
+
+    def execute_command(self, command):
+        if str(command).startswith('false'):
+            raise CommandError(command, 1, 'failed')
+        return str(command)
+
+
+def run_commands(executor):
+    executor.execute('ls')
+    with pytest.raises(CommandError):
+        executor.execute('false')
+
+
+class TestMetrics:
+
+    def setup_method(self):
+        self.recorder = metrics.enable()
+        self.executor = ProxyExecutor(executor=TestExecutor())
+
+    def teardown_method(self):
+        metrics.disable()
+
+    def test_records(self):
+        run_commands(self.executor)
+        ls, false = self.recorder.records
+        assert ls['command'] == 'ls'
+        assert ls['chain'] == ['ProxyExecutor', 'TestExecutor']
+        assert ls['exit_code'] == 0
+        assert ls['output_size'] == 2
+        assert ls['call_site'] == '{}:run_commands'.format(__name__)
+        assert false['exit_code'] == 1
+
+    def test_histogram(self):
+        run_commands(self.executor)
+        histogram, = self.recorder.as_dict()['histograms']
+        assert histogram['provider'] == 'ProxyExecutor'
+        assert histogram['count'] == 2
+        assert histogram['errors'] == 1
+        assert histogram['buckets']['+Inf'] == 2
+
+    def test_export(self, tmpdir):
+        run_commands(self.executor)
+
+        json_path = str(tmpdir.join('metrics.json'))
+        self.recorder.export(json_path)
+        with open(json_path) as json_file:
+            assert len(json.load(json_file)['records']) == 2
+
+        prometheus_path = str(tmpdir.join('metrics.prom'))
+        self.recorder.export(prometheus_path)
+        with open(prometheus_path) as prometheus_file:
+            prometheus = prometheus_file.read()
+        assert 'codev_command_duration_seconds_count{{provider="ProxyExecutor",call_site="{}:run_commands"}} 2'.format(
+            __name__
+        ) in prometheus
+
+    def test_disabled(self):
+        metrics.disable()
+        run_commands(self.executor)
+        assert not self.recorder.records
@@ -0,0 +1,180 @@
+import os
+import socket
+from subprocess import PIPE, Popen
+from threading import Thread
+
+import pytest
+
+paramiko = pytest.importorskip('paramiko')
+
+from codev.core.executor import CommandError, CommandTimeoutError, ProxyExecutor
+from codev.core.providers.executors import paramiko_ssh
+from codev.core.providers.executors.paramiko_ssh import ParamikoExecutor
+
+
+class LocalSFTPHandle(paramiko.SFTPHandle):
+    def stat(self):
+        return paramiko.SFTPAttributes.from_stat(os.fstat(self.readfile.fileno()))
+
+
+class LocalSFTPServer(paramiko.SFTPServerInterface):
+    """
+    SFTP server serving local files.
+    """
+    def open(self, path, flags, attr):
+        fd = os.open(path, flags, 0o644)
+        fo = os.fdopen(fd, 'wb' if flags & (os.O_WRONLY | os.O_RDWR) else 'rb')
+        handle = LocalSFTPHandle(flags)
+        handle.readfile = fo
+        handle.writefile = fo
+        return handle
+
+    def stat(self, path):
+        return paramiko.SFTPAttributes.from_stat(os.stat(path))
+
+    lstat = stat
+
+
+class LocalServer(paramiko.ServerInterface):
+    """
+    SSH server stand-in executing commands locally, every key is accepted.
+    """
+    def get_allowed_auths(self, username):
+        return 'publickey'
+
+    def check_auth_publickey(self, username, key):
+        return paramiko.AUTH_SUCCESSFUL
+
+    def check_channel_request(self, kind, chanid):
+        return paramiko.OPEN_SUCCEEDED
+
+    def check_channel_exec_request(self, channel, command):
+        Thread(target=self._execute, args=(channel, command.decode()), daemon=True).start()
+        return True
+
+    @staticmethod
+    def _feed(channel, stdin):
+        try:
+            for data in iter(lambda: channel.recv(65536), b''):
+                stdin.write(data)
+            stdin.close()
+        except (BrokenPipeError, OSError):
+            pass
+
+    @staticmethod
+    def _pump(stdout, send):
+        for data in iter(lambda: stdout.read1(65536), b''):
+            send(data)
+
+    def _execute(self, channel, command):
+        process = Popen(['bash', '-c', command], stdin=PIPE, stdout=PIPE, stderr=PIPE)
+        Thread(target=self._feed, args=(channel, process.stdin), daemon=True).start()
+        error_pump = Thread(target=self._pump, args=(process.stderr, channel.sendall_stderr), daemon=True)
+        error_pump.start()
+        try:
+            self._pump(process.stdout, channel.sendall)
+            error_pump.join()
+            channel.send_exit_status(process.wait())
+            channel.close()
+        except OSError:
+            # client has closed the channel
+            process.kill()
+
+
+@pytest.fixture(scope='module')
+def ssh_server(tmp_path_factory):
+    host_key = paramiko.RSAKey.generate(2048)
+    client_key = paramiko.RSAKey.generate(2048)
+    key_filename = str(tmp_path_factory.mktemp('keys') / 'id_rsa')
+    client_key.write_private_key_file(key_filename)
+
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(10)
+
+    def serve():
+        while True:
+            try:
+                sock, _ = listener.accept()
+            except OSError:
+                return
+            transport = paramiko.Transport(sock)
+            transport.add_server_key(host_key)
+            transport.set_subsystem_handler('sftp', paramiko.SFTPServer, LocalSFTPServer)
+            transport.start_server(server=LocalServer())
+
+    Thread(target=serve, daemon=True).start()
+    yield {
+        'hostname': '127.0.0.1',
+        'port': listener.getsockname()[1],
+        'username': 'codev',
+        'key_filename': key_filename,
+        'host_key_policy': 'auto_add',
+    }
+    paramiko_ssh.close_connections()
+    listener.close()
+
+
+class TestParamikoExecutor:
+
+    @pytest.fixture(autouse=True)
+    def executor(self, ssh_server):
+        self.executor = ParamikoExecutor(settings_data=ssh_server)
+
+    def test_output(self):
+        assert self.executor.execute('echo test') == 'test'
+        assert self.executor.execute('printf "a\\n\\nb"') == 'a\n\nb'
+
+    def test_writein(self):
+        writein = 'x' * 1000000 + '\n'
+        assert self.executor.execute('cat', writein=writein) == writein[:-1]
+
+    def test_error(self):
+        with pytest.raises(CommandError) as excinfo:
+            self.executor.execute('echo out; echo err >&2; exit 3')
+        assert excinfo.value.exit_code == 3
+        assert excinfo.value.output == 'out'
+        assert excinfo.value.error == 'err'
+
+    def test_stream(self):
+        assert list(self.executor.execute_stream('seq 3')) == ['1', '2', '3']
+
+    def test_timeout(self):
+        with pytest.raises(CommandTimeoutError) as excinfo:
+            self.executor.execute('echo started; sleep 5', timeout=0.5)
+        assert excinfo.value.output == 'started'
+
+    def test_shared_transport(self, ssh_server):
+        transport = self.executor.connection.transport()
+        assert ParamikoExecutor(settings_data=ssh_server).connection.transport() is transport
+
+    def test_concurrent_commands(self, ssh_server):
+        executor = ParamikoExecutor(settings_data=dict(ssh_server, pool_size=2))
+        results = []
+        threads = [
+            Thread(target=lambda index=index: results.append(executor.execute('echo {index}'.format(index=index))))
+            for index in range(6)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert sorted(results) == [str(index) for index in range(6)]
+
+    def test_send_stream(self, tmp_path):
+        target = tmp_path / 'target'
+        executor = ProxyExecutor(executor=self.executor)
+        assert executor.send_stream(b'x' * 3000000, str(target)) == 3000000
+        with executor.open_stream(str(target)) as stream:
+            assert stream.read() == b'x' * 3000000
+
+    def test_send_stream_error(self, tmp_path):
+        with pytest.raises(CommandError):
+            self.executor.send_stream(b'content', str(tmp_path / 'missing' / 'target'))
+
+    def test_files(self, tmp_path):
+        source = tmp_path / 'source'
+        source.write_text('content\n')
+        self.executor.send_file(str(source), str(tmp_path / 'target'))
+        with self.executor.open_file(str(tmp_path / 'target')) as fo:
+            assert fo.read() == 'content\n'
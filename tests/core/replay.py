@@ -0,0 +1,107 @@
+import pytest
+
+from codev.core.executor import BackgroundExecutor, CommandError, ProxyExecutor
+from codev.core.jobs import JobManager
+from codev.core.providers.executors.local import LocalExecutor
+from codev.core.replay import RecordingExecutor, ReplayError, ReplayExecutor
+
+
+def run_commands(executor, tmpdir):
+    results = [
+        executor.execute('echo first'),
+        executor.execute('cat', writein='input'),
+        executor.execute_many(['echo one', 'echo two >&2; exit 3']),
+        list(executor.execute_stream('printf "a\\nb\\n"')),
+    ]
+    with pytest.raises(CommandError) as excinfo:
+        executor.execute('echo output; echo error >&2; exit 2')
+    results.append((excinfo.value.exit_code, excinfo.value.output, excinfo.value.error))
+
+    source = str(tmpdir.join('source'))
+    with open(source, 'w') as source_file:
+        source_file.write('content')
+    target = str(tmpdir.join('target'))
+    executor.send_file(source, target)
+    with executor.open_file(target) as target_file:
+        results.append(target_file.read())
+    return results
+
+
+class TestReplay:
+
+    def record(self, tmpdir, trace_name):
+        trace_path = str(tmpdir.join(trace_name))
+        recording_executor = RecordingExecutor(executor=LocalExecutor(), trace_path=trace_path)
+        results = run_commands(ProxyExecutor(executor=recording_executor), tmpdir)
+        recording_executor.close()
+        return trace_path, results
+
+    def test_replay(self, tmpdir):
+        trace_path, results = self.record(tmpdir, 'trace.jsonl')
+        assert results[-1] == 'content'
+
+        tmpdir.join('target').remove()
+        replay_executor = ReplayExecutor(trace_path=trace_path)
+        assert run_commands(ProxyExecutor(executor=replay_executor), tmpdir) == results
+        assert not tmpdir.join('target').exists()
+
+    def test_gzip(self, tmpdir):
+        trace_path, results = self.record(tmpdir, 'trace.jsonl.gz')
+        replay_executor = ReplayExecutor(trace_path=trace_path)
+        assert run_commands(ProxyExecutor(executor=replay_executor), tmpdir) == results
+
+    def test_not_recorded(self, tmpdir):
+        trace_path, results = self.record(tmpdir, 'trace.jsonl')
+        replay_executor = ReplayExecutor(trace_path=trace_path)
+        replay_executor.execute('echo first')
+        with pytest.raises(ReplayError):
+            replay_executor.execute('echo first')
+        with pytest.raises(ReplayError):
+            replay_executor.execute('echo other')
+
+    def test_pipes(self, tmpdir):
+        def run_pipes(executor):
+            source = tmpdir.mkdir('source')
+            source.join('file').write('tree')
+            executor.send_stream(b'x' * 100000, str(tmpdir.join('stream')))
+            with executor.open_stream(str(tmpdir.join('stream'))) as stream:
+                content = stream.read()
+            executor.send_tree(str(source), str(tmpdir.join('tree')))
+            with pytest.raises(CommandError):
+                executor.send_stream(b'content', str(tmpdir.join('missing', 'stream')))
+            source.remove()
+            return content
+
+        trace_path = str(tmpdir.join('trace.jsonl'))
+        recording_executor = RecordingExecutor(executor=LocalExecutor(), trace_path=trace_path)
+        assert run_pipes(ProxyExecutor(executor=recording_executor)) == b'x' * 100000
+        recording_executor.close()
+
+        tmpdir.join('stream').remove()
+        assert run_pipes(ProxyExecutor(executor=ReplayExecutor(trace_path=trace_path))) == b'x' * 100000
+        assert not tmpdir.join('stream').exists()
+
+    def test_background(self, tmpdir):
+        trace_path = str(tmpdir.join('trace.jsonl'))
+        recording_executor = RecordingExecutor(executor=LocalExecutor(), trace_path=trace_path)
+        assert BackgroundExecutor(executor=recording_executor, ident='replay').execute('echo bg') == 'bg'
+        recording_executor.close()
+
+        replay_executor = ReplayExecutor(trace_path=trace_path)
+        assert BackgroundExecutor(executor=replay_executor, ident='replay').execute('echo bg') == 'bg'
+
+    def test_jobs(self, tmpdir):
+        def run_job(executor):
+            manager = JobManager(executor=executor)
+            try:
+                return manager.wait(manager.submit('echo job'))
+            finally:
+                manager.clean()
+
+        trace_path = str(tmpdir.join('trace.jsonl'))
+        recording_executor = RecordingExecutor(executor=LocalExecutor(), trace_path=trace_path)
+        assert run_job(recording_executor) == 'job'
+        recording_executor.close()
+
+        # ident of manager and job id differ in every run
+        assert run_job(ReplayExecutor(trace_path=trace_path)) == 'job'
@@ -0,0 +1,91 @@
+from os import environ, pathsep
+from os.path import exists
+
+import pytest
+
+from codev.core.executor import CommandError
+from codev.core.providers.executors import ssh
+from codev.core.providers.executors.ssh import SSHExecutor
+
+# fake ssh: master connection is a socket file, commands are executed locally, invocations are logged
+FAKE_SSH = r'''#!/bin/bash
+echo "$@" >> "$(dirname "$0")/ssh.log"
+control_path=
+master=
+operation=
+while [ $# -gt 0 ]; do
+    case "$1" in
+        -o) [[ "$2" == ControlPath=* ]] && control_path="${2#ControlPath=}"; shift 2 ;;
+        -p) shift 2 ;;
+        -M) master=1; shift ;;
+        -O) operation="$2"; shift 2 ;;
+        --) shift; exec bash -c "$*" ;;
+        *) shift ;;
+    esac
+done
+if [ -n "$master" ]; then
+    touch "$control_path"
+elif [ "$operation" = check ]; then
+    [ -e "$control_path" ] || exit 255
+elif [ "$operation" = exit ]; then
+    rm -f "$control_path"
+fi
+'''
+
+
+@pytest.fixture
+def fake_ssh(tmp_path, monkeypatch):
+    script = tmp_path / 'ssh'
+    script.write_text(FAKE_SSH)
+    script.chmod(0o755)
+    monkeypatch.setenv('PATH', '{directory}{pathsep}{path}'.format(
+        directory=tmp_path, pathsep=pathsep, path=environ['PATH']
+    ))
+    yield tmp_path / 'ssh.log'
+    ssh.close_control_masters()
+
+
+def invocations(log):
+    return log.read_text().splitlines()
+
+
+class TestSSHExecutor:
+
+    def test_multiplexing(self, fake_ssh):
+        executor = SSHExecutor(settings_data={'hostname': 'host', 'username': 'user'})
+        assert executor.execute('echo a') == 'a'
+        assert executor.execute('echo b') == 'b'
+
+        master, first, second = invocations(fake_ssh)
+        assert '-M -N -f' in master
+        assert 'ControlPersist=600' in master
+        assert 'ControlMaster=no' in first and 'user@host' in first
+        assert exists(executor.control_master.path)
+
+        # the same destination shares the master connection
+        assert SSHExecutor(settings_data={'hostname': 'host', 'username': 'user'}).control_master is \
+            executor.control_master
+
+    def test_close(self, fake_ssh):
+        executor = SSHExecutor(settings_data={'hostname': 'host'})
+        executor.execute('true')
+        path = executor.control_master.path
+
+        ssh.close_control_masters()
+        assert '-O exit' in invocations(fake_ssh)[-1]
+        assert not exists(path)
+
+    def test_health_check(self, fake_ssh):
+        executor = SSHExecutor(settings_data={'hostname': 'host'})
+        executor.execute('true')
+
+        with pytest.raises(CommandError):
+            executor.execute('exit 255')
+        assert '-O check' in invocations(fake_ssh)[-1]
+        # the master connection is alive, so it is kept
+        assert exists(executor.control_master.path)
+
+    def test_without_multiplexing(self, fake_ssh):
+        executor = SSHExecutor(settings_data={'hostname': 'host', 'multiplexing': False})
+        assert executor.execute('echo a') == 'a'
+        assert invocations(fake_ssh) == ['-A None@host -p 22 -- bash -c "echo a"']
@@ -0,0 +1,47 @@
+from os import utime
+
+from codev.core import transfer
+from codev.core.executor import ProxyExecutor
+from codev.core.providers.executors.local import LocalExecutor
+
+
+class TestSendFileCached:
+
+    def setup_method(self):
+        self.executor = ProxyExecutor(executor=LocalExecutor())
+        self.stats = transfer.transfer_stats = transfer.TransferStats()
+
+    def test_skip_unchanged(self, tmp_path):
+        source, target, index = tmp_path / 'source', tmp_path / 'target dir' / 'target', tmp_path / 'index'
+        source.write_text('content')
+        target.parent.mkdir()
+
+        assert transfer.send_file_cached(self.executor, str(source), str(target), index_path=str(index))
+        assert target.read_text() == 'content'
+        assert not transfer.send_file_cached(self.executor, str(source), str(target), index_path=str(index))
+        assert (self.stats.files_sent, self.stats.bytes_sent) == (1, 7)
+        assert (self.stats.files_avoided, self.stats.bytes_avoided) == (1, 7)
+
+        # changed source
+        source.write_text('changed')
+        assert transfer.send_file_cached(self.executor, str(source), str(target), index_path=str(index))
+        assert target.read_text() == 'changed'
+
+        # changed target
+        target.write_text('modified')
+        utime(str(target), (0, 0))
+        assert transfer.send_file_cached(self.executor, str(source), str(target), index_path=str(index))
+        assert target.read_text() == 'changed'
+
+        # removed target
+        target.unlink()
+        assert transfer.send_file_cached(self.executor, str(source), str(target), index_path=str(index))
+        assert len(index.read_text().splitlines()) == 1
+
+    def test_executor_method(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(transfer, 'INDEX_PATH', str(tmp_path / 'index'))
+        source = tmp_path / 'source'
+        source.write_text('content')
+        target = str(tmp_path / 'target')
+        assert self.executor.send_file_cached(str(source), target)
+        assert not self.executor.send_file_cached(str(source), target)